@@ -0,0 +1,167 @@
+import argparse
+import random
+import time
+from fractions import Fraction
+
+
+class Rejection:
+    """Why a set can't have a solution: the rule that failed and a readable reason"""
+
+    def __init__(self, rule, reason):
+        self.rule = rule
+        self.reason = reason
+
+    def __repr__(self):
+        return f"Rejection(rule={self.rule!r}, reason={self.reason!r})"
+
+
+def _pairs(tiles):
+    return [(bytes(top), bytes(bottom)) for top, bottom in tiles]
+
+
+def check_start(pairs):
+    # the first domino of a solution has one half a prefix of the other
+    if not any(top.startswith(bottom) or bottom.startswith(top) for top, bottom in pairs):
+        return Rejection("no_start", "no domino has one half starting with the other")
+
+
+def check_end(pairs):
+    # the last domino ends both concatenations, so one half is a suffix of the other
+    if not any(top.endswith(bottom) or bottom.endswith(top) for top, bottom in pairs):
+        return Rejection("no_end", "no domino has one half ending with the other")
+
+
+def check_length(pairs):
+    # the top and bottom have to come out the same length; a domino with equal
+    # length halves only keeps them level if the halves are equal (a solution on its own)
+    if any(top == bottom for top, bottom in pairs):
+        return None
+    if all(len(top) >= len(bottom) for top, bottom in pairs):
+        return Rejection("length", "every domino's top is at least as long as its bottom")
+    if all(len(top) <= len(bottom) for top, bottom in pairs):
+        return Rejection("length", "every domino's bottom is at least as long as its top")
+
+
+def colour_balance(pairs):
+    """Per-domino colour surplus (top count - bottom count), one row per colour used"""
+    rows = []
+    for color in sorted(set(b''.join(top + bottom for top, bottom in pairs))):
+        row = [top.count(color) - bottom.count(color) for top, bottom in pairs]
+        if any(row):
+            rows.append(row)
+    return rows
+
+
+def check_colour_balance(pairs):
+    # a solution using domino i n_i times has sum n_i * surplus_i = 0 for every
+    # colour; any rational x >= 0 with sum x = 1 scales up to such counts, so
+    # the LP is exact for this condition
+    rows = colour_balance(pairs)
+    if not rows:
+        return None
+    rows.append([1] * len(pairs))
+    if not feasible(rows, [0] * (len(rows) - 1) + [1]):
+        return Rejection("colour_balance", "no mix of dominoes uses each colour equally often on top and bottom")
+
+
+def feasible(rows, rhs):
+    """Whether rows . x = rhs has a solution with x >= 0 (rhs >= 0)
+
+    Phase one of the simplex method in exact Fractions: minimise the sum of
+    one artificial variable per row, feasible iff that reaches zero. Bland's
+    rule picks the pivots so it can't cycle.
+    """
+    m, n = len(rows), len(rows[0])
+    table = []
+    for i, (row, b) in enumerate(zip(rows, rhs)):
+        table.append([Fraction(v) for v in row] + [Fraction(int(i == j)) for j in range(m)] + [Fraction(b)])
+    basis = [n + i for i in range(m)]
+    # reduced costs of the phase one objective, last entry is -(objective value)
+    cost = [-sum(t[j] for t in table) for j in range(n)] + [Fraction(0)] * m + [-sum(t[-1] for t in table)]
+
+    while True:
+        entering = next((j for j in range(n + m) if cost[j] < 0), None)
+        if entering is None:
+            return cost[-1] == 0
+        leave = None
+        for i, t in enumerate(table):
+            if t[entering] > 0:
+                ratio = t[-1] / t[entering]
+                if leave is None or ratio < best or (ratio == best and basis[i] < basis[leave]):
+                    leave, best = i, ratio
+        if leave is None:
+            # can't happen: the phase one objective is bounded below by zero
+            return cost[-1] == 0
+        pivot = table[leave]
+        scale = pivot[entering]
+        pivot[:] = [v / scale for v in pivot]
+        for t in table + [cost]:
+            if t is not pivot and t[entering]:
+                factor = t[entering]
+                t[:] = [a - factor * b for a, b in zip(t, pivot)]
+        basis[leave] = entering
+
+
+# rule name -> check, cheapest first; each is linear in the set size except the small LP
+RULES = {
+    "no_start": check_start,
+    "no_end": check_end,
+    "length": check_length,
+    "colour_balance": check_colour_balance,
+}
+
+
+def prefilter(tiles):
+    """The first rule showing the set has no solution, or None if it might have one
+
+    Only rules that hold for every solution are used, so a set that is
+    rejected is definitely unsolvable; passing says nothing either way.
+    """
+    pairs = _pairs(tiles)
+    for check in RULES.values():
+        rejection = check(pairs)
+        if rejection is not None:
+            return rejection
+    return None
+
+
+def main():
+    from domino import Domino
+    from solver import Solver
+
+    parser = argparse.ArgumentParser(description="How many random sets the pre-filter rejects, and the search it saves")
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--difficulty', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    Domino.difficulty = (args.difficulty, args.difficulty)
+    sets = [Domino.generate_tiles(10, rng) for i in range(args.count)]
+    solver = Solver(prefilter=False)
+
+    start = time.perf_counter()
+    verdicts = [prefilter(tiles) for tiles in sets]
+    filter_time = time.perf_counter() - start
+    rejected = {}
+    for verdict in verdicts:
+        if verdict is not None:
+            rejected[verdict.rule] = rejected.get(verdict.rule, 0) + 1
+
+    start = time.perf_counter()
+    results = [solver.solve(tiles) for tiles in sets]
+    search_time = time.perf_counter() - start
+    wrong = sum(1 for verdict, result in zip(verdicts, results) if verdict and result.solved)
+    saved = sum(result.elapsed for verdict, result in zip(verdicts, results) if verdict)
+
+    print(f"{args.count} random sets at level {args.difficulty}: "
+          f"{sum(rejected.values())} rejected in {filter_time:.3f}s")
+    for rule in RULES:
+        print(f"  {rule:15s} {rejected.get(rule, 0)}")
+    print(f"full search of every set: {search_time:.3f}s, of which {saved:.3f}s was on rejected sets")
+    if wrong:
+        print(f"ERROR: {wrong} rejected sets were solved")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+
+
+class Job:
+    """One call run on the background worker
+
+    The function gets a cancelled= keyword (a callable) to poll, so long
+    searches can stop early once the job is cancelled or superseded. Each
+    poll also gives up the GIL for a moment so the frame loop isn't kept
+    waiting behind a pure-Python search.
+    """
+
+    def __init__(self, key, fn, args, tag=None):
+        self.key = key
+        self.fn = fn
+        self.args = args
+        # anything the submitter wants back to check the result is still current
+        self.tag = tag
+        self.cancel_event = threading.Event()
+        self.result = None
+        self.error = None
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check(self):
+        time.sleep(0)
+        return self.cancel_event.is_set()
+
+    def run(self):
+        try:
+            self.result = self.fn(*self.args, cancelled=self.check)
+        except Exception as error:
+            self.error = error
+
+
+class BackgroundWorker:
+    """Runs jobs on a daemon thread so the frame loop never waits on them
+
+    Jobs are keyed by what they are for ("hint", "check", ...): submitting
+    a job cancels the pending or running job with the same key, so only
+    the latest request for each thing gets an answer. The game loop picks
+    up finished jobs with poll(), which never blocks; notify (if given) is
+    called from the worker thread after each job so a sleeping loop can
+    wake up. With inline=True jobs run straight away inside submit()
+    instead, for headless runs that have to be deterministic.
+    """
+
+    def __init__(self, notify=None, inline=False):
+        self.notify = notify
+        self.inline = inline
+        self.jobs = queue.Queue()
+        self.finished = queue.Queue()
+        # key -> latest job submitted for it
+        self.current = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def submit(self, key, fn, *args, tag=None):
+        job = Job(key, fn, args, tag)
+        if self.inline:
+            job.run()
+            self.finished.put(job)
+            return job
+        with self.lock:
+            old = self.current.get(key)
+            if old is not None:
+                old.cancel()
+            self.current[key] = job
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="background-worker", daemon=True)
+            self.thread.start()
+        self.jobs.put(job)
+        return job
+
+    def cancel(self, key):
+        with self.lock:
+            job = self.current.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def cancel_all(self):
+        with self.lock:
+            jobs = list(self.current.values())
+            self.current.clear()
+        for job in jobs:
+            job.cancel()
+
+    def busy(self, key=None):
+        """Whether a job (for key, or any job) is still waiting or running"""
+        with self.lock:
+            if key is None:
+                return bool(self.current)
+            return key in self.current
+
+    def poll(self):
+        """Finished jobs that weren't cancelled, without waiting"""
+        done = []
+        while True:
+            try:
+                job = self.finished.get_nowait()
+            except queue.Empty:
+                return done
+            if not job.cancelled:
+                done.append(job)
+
+    def stop(self):
+        self.cancel_all()
+        if self.thread is not None:
+            self.jobs.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            if job.cancelled:
+                continue
+            job.run()
+            with self.lock:
+                if self.current.get(job.key) is job:
+                    del self.current[job.key]
+            self.finished.put(job)
+            if self.notify is not None:
+                self.notify()
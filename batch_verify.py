@@ -0,0 +1,216 @@
+# Checks many candidate solutions at once
+# usage: python batch_verify.py [--count 1000000] [--length 6] [--seed 0]
+import argparse
+import random
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    # optional: without NumPy the same API runs one candidate at a time in plain Python
+    np = None
+
+# padding for candidate rows shorter than the widest one
+PAD = -1
+# candidate rows handled per vectorized pass, bounds the temporary arrays
+CHUNK = 1 << 16
+
+
+def _sides(tiles):
+    return [bytes(top) for top, bottom in tiles], [bytes(bottom) for top, bottom in tiles]
+
+
+class TileTable:
+    """Tiles as integer arrays, one row per tile
+
+    Each side is kept two ways: its codes end to end in one flat array
+    (with a start and length per tile) for gathering whole
+    concatenations, and packed into one integer, base colour count, for
+    concatenations short enough to fit in 64 bits. The last row is an
+    empty tile that PAD entries point at, so padding adds nothing.
+    """
+
+    def __init__(self, tiles):
+        tops, bottoms = _sides(tiles)
+        self.count = len(tops)
+        self.base = max(2, max((max(side, default=0) + 1 for side in tops + bottoms), default=2))
+        # squares whose packed value still fits in an unsigned 64 bit integer
+        self.max_packed = 1
+        while self.base ** (self.max_packed + 1) < 1 << 64:
+            self.max_packed += 1
+        self.top, self.top_start, self.top_length, self.top_scale, self.top_packed = self._encode(tops)
+        self.bottom, self.bottom_start, self.bottom_length, self.bottom_scale, self.bottom_packed = self._encode(bottoms)
+
+    def _encode(self, sides):
+        lengths = np.array([len(side) for side in sides] + [0], dtype=np.int64)
+        starts = np.cumsum(lengths) - lengths
+        # a side's packed value is appended to a running value v as v * scale + packed
+        scale = np.array([self.base ** len(side) % (1 << 64) for side in sides] + [1], dtype=np.uint64)
+        packed = np.array([_pack(side, self.base) % (1 << 64) for side in sides] + [0], dtype=np.uint64)
+        return np.frombuffer(b''.join(sides), dtype=np.uint8), starts, lengths, scale, packed
+
+
+def _pack(side, base):
+    value = 0
+    for code in side:
+        value = value * base + code
+    return value
+
+
+def _fold(table, columns):
+    """Length and packed value of both sides of each row's concatenation, one column at a time
+
+    Packed values wrap around for rows longer than table.max_packed.
+    """
+    top_length = np.zeros(columns.shape[1], dtype=np.int64)
+    bottom_length = np.zeros_like(top_length)
+    top = np.zeros(columns.shape[1], dtype=np.uint64)
+    bottom = np.zeros_like(top)
+    with np.errstate(over='ignore'):
+        for column in columns:
+            top_length += table.top_length[column]
+            bottom_length += table.bottom_length[column]
+            top = top * table.top_scale[column] + table.top_packed[column]
+            bottom = bottom * table.bottom_scale[column] + table.bottom_packed[column]
+    return top_length, bottom_length, top, bottom
+
+
+def _gather(codes, starts, lengths, rows):
+    """Concatenations of the tiles in each row, all rows end to end in one array"""
+    piece_lengths = lengths[rows].ravel()
+    piece_starts = starts[rows].ravel()
+    # where each piece lands in the output; output position p of a piece reads codes[p + shift]
+    out_starts = np.cumsum(piece_lengths) - piece_lengths
+    shift = np.repeat(piece_starts - out_starts, piece_lengths)
+    return codes[np.arange(len(shift)) + shift]
+
+
+def _match_rows(table, rows):
+    top_lengths, bottom_lengths, top, bottom = _fold(table, np.ascontiguousarray(rows.T))
+    result = (top_lengths == bottom_lengths) & (top_lengths > 0)
+    # equal length sides that fit in 64 bits match when their packed values do
+    short = top_lengths <= table.max_packed
+    result &= (top == bottom) | ~short
+    live = np.flatnonzero(result & ~short)
+    if not len(live):
+        return result
+    rows = rows[live]
+    # longer ones are compared square by square; equal lengths mean row i starts at the same offset in both
+    top = _gather(table.top, table.top_start, table.top_length, rows)
+    bottom = _gather(table.bottom, table.bottom_start, table.bottom_length, rows)
+    lengths = top_lengths[live]
+    mismatches = np.add.reduceat(top != bottom, np.cumsum(lengths) - lengths)
+    result[live] = mismatches == 0
+    return result
+
+
+def candidate_array(candidates):
+    """Candidate index sequences as one (n, width) int array, short rows padded with PAD"""
+    if isinstance(candidates, np.ndarray):
+        if not candidates.size:
+            # reshape can't work out a width from no squares at all
+            return np.full((len(candidates), 1), PAD, dtype=np.int64)
+        return candidates.reshape(len(candidates), -1).astype(np.int64, copy=False)
+    width = max((len(c) for c in candidates), default=0)
+    rows = np.full((len(candidates), max(width, 1)), PAD, dtype=np.int64)
+    for i, candidate in enumerate(candidates):
+        rows[i, :len(candidate)] = candidate
+    return rows
+
+
+def verify_many(tiles, candidates):
+    """For each candidate sequence of tile indices, whether it's a solution of tiles
+
+    candidates is a list of index lists or an (n, width) integer array
+    padded with PAD. With NumPy a whole chunk of candidates is checked
+    with a few array operations per column and the result is a bool
+    array; without it a list of bools comes back. An empty candidate is
+    never a solution.
+    """
+    if np is None:
+        return _verify_python(tiles, candidates)
+    if not len(candidates):
+        return np.zeros(0, dtype=bool)
+    table = TileTable(tiles)
+    rows = candidate_array(candidates)
+    if rows.size and (rows.min() < PAD or rows.max() >= table.count):
+        raise ValueError(f"tile index out of range for a set of {table.count}")
+    # PAD rows read the empty tile at the end of the table
+    rows = np.where(rows == PAD, table.count, rows)
+    result = np.empty(len(rows), dtype=bool)
+    for start in range(0, len(rows), CHUNK):
+        result[start:start + CHUNK] = _match_rows(table, rows[start:start + CHUNK])
+    return result
+
+
+def verify_each(tile_sets, solutions):
+    """Whether solutions[i] solves tile_sets[i], for many different sets in one batch
+
+    The sets go into one table and each solution's indices are shifted to
+    its own set's rows, so the whole batch is still a single gather.
+    """
+    if len(tile_sets) != len(solutions):
+        raise ValueError(f"{len(solutions)} solutions for {len(tile_sets)} sets")
+    if np is None:
+        return [_verify_python(tiles, [solution])[0] for tiles, solution in zip(tile_sets, solutions)]
+    if not len(solutions):
+        return np.zeros(0, dtype=bool)
+    tiles = [tile for tile_set in tile_sets for tile in tile_set]
+    offsets = np.cumsum([0] + [len(tile_set) for tile_set in tile_sets[:-1]], dtype=np.int64)
+    rows = candidate_array(solutions)
+    sizes = np.array([len(tile_set) for tile_set in tile_sets], dtype=np.int64)
+    if rows.size and (rows.min() < PAD or (rows >= sizes[:, None]).any()):
+        raise ValueError("tile index out of range for its set")
+    rows = np.where(rows == PAD, PAD, rows + offsets[:, None])
+    return verify_many(tiles, rows)
+
+
+def _verify_python(tiles, candidates):
+    tops, bottoms = _sides(tiles)
+    result = []
+    for candidate in candidates:
+        candidate = [i for i in candidate if i != PAD]
+        if any(not 0 <= i < len(tops) for i in candidate):
+            raise ValueError(f"tile index out of range for a set of {len(tops)}")
+        result.append(bool(candidate) and b''.join([tops[i] for i in candidate]) == b''.join([bottoms[i] for i in candidate]))
+    return result
+
+
+def main():
+    from generator import PuzzleGenerator
+
+    parser = argparse.ArgumentParser(description="Batch verification throughput on one seeded set")
+    parser.add_argument('--count', type=int, default=1000000, help="candidates to check")
+    parser.add_argument('--length', type=int, default=6, help="indices per random candidate")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    tiles, solution = PuzzleGenerator(seed=args.seed).generate((0, 0))
+    rng = random.Random(args.seed)
+    if np is not None:
+        width = max(args.length, len(solution))
+        rows = np.random.default_rng(args.seed).integers(0, len(tiles), size=(args.count, width))
+        rows[:, args.length:] = PAD
+        # every tenth candidate is the set's solution, the rest random
+        rows[::10] = list(solution) + [PAD] * (width - len(solution))
+        candidates = rows
+    else:
+        print("NumPy not installed, timing the plain Python fallback")
+        candidates = [solution if i % 10 == 0 else [rng.randrange(len(tiles)) for j in range(args.length)]
+                      for i in range(args.count)]
+
+    start = time.perf_counter()
+    result = verify_many(tiles, candidates)
+    elapsed = time.perf_counter() - start
+    print(f"{args.count} candidates in {elapsed:.3f}s: {args.count / elapsed:,.0f} checks/s, {sum(result)} solutions")
+
+    # spot check against the plain Python path
+    sample = rng.sample(range(args.count), min(args.count, 2000))
+    expected = _verify_python(tiles, [list(candidates[i]) for i in sample])
+    wrong = sum(1 for i, ok in zip(sample, expected) if bool(result[i]) != ok)
+    if wrong:
+        print(f"ERROR: {wrong} of {len(sample)} sampled results differ from the plain Python check")
+
+
+if __name__ == '__main__':
+    main()
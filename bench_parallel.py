@@ -0,0 +1,72 @@
+# Throughput benchmark for the parallel solver
+# usage: python bench_parallel.py [--states N] [--max-workers N] [--output results.json]
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import sys
+import time
+from solver import Solver
+from parallel_solver import ParallelSolver
+
+
+def hard_set(seed, size=10, low=1, high=4):
+    """Random two-colour set; few colours means many dominoes fit, so levels are wide"""
+    rng = random.Random(seed)
+    colors = ['RED', 'BLUE']
+    def side():
+        return [rng.choice(colors) for i in range(rng.randint(low, high))]
+    return [(side(), side()) for i in range(size)]
+
+
+def find_busy_set(states):
+    # pick a seeded set whose frontier is wide enough to hit the budget within a few levels
+    for seed in range(1000):
+        dominos = hard_set(seed)
+        result = Solver(max_depth=30, max_states=states).solve(dominos)
+        if result.status == "unknown" and result.states_explored >= states:
+            return seed, dominos
+    raise RuntimeError("no busy set found")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel solver throughput benchmark")
+    parser.add_argument('--states', type=int, default=200000)
+    parser.add_argument('--max-workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--output', default=None, help="write the rates as JSON here")
+    args = parser.parse_args()
+
+    if multiprocessing.cpu_count() < args.max_workers:
+        # more workers than cores only measures time slicing, not scaling
+        sys.exit(f"only {multiprocessing.cpu_count()} cores for up to {args.max_workers} workers; "
+                 f"run with --max-workers {multiprocessing.cpu_count()} or on a bigger machine")
+
+    seed, dominos = find_busy_set(args.states)
+    print(f"set seed {seed}, budget {args.states} states, {multiprocessing.cpu_count()} cores")
+
+    result = Solver(max_depth=1000, max_states=args.states).solve(dominos)
+    serial_rate = result.states_explored / result.elapsed
+    print(f"serial      {serial_rate:12.0f} states/s")
+    runs = []
+
+    workers = 1
+    while workers <= args.max_workers:
+        with ParallelSolver(workers=workers, max_depth=1000, max_states=args.states) as solver:
+            result = solver.solve(dominos)
+        rate = result.states_explored / result.elapsed
+        print(f"{workers:2d} workers {rate:12.0f} states/s  speedup {rate / serial_rate:5.2f}x")
+        runs.append({"workers": workers, "states_per_s": rate, "speedup": rate / serial_rate})
+        workers *= 2
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cores": multiprocessing.cpu_count(), "machine": platform.machine(),
+                       "python": platform.python_version(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "set_seed": seed, "states": args.states, "serial_states_per_s": serial_rate,
+                       "runs": runs}, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# Score store benchmark: batched writes and leaderboard queries on a large table
+# usage: python bench_scores.py [--rows 1000000] [--path bench_scores.db] [--queries 200] [--keep]
+import argparse
+import os
+import random
+import time
+from profiler import percentile
+from scores import MODES, ScoreStore, ScoreWriter
+
+LEVELS = range(8)
+
+
+def fill(path, rows, puzzles, seed):
+    """Submit rows random wins through a ScoreWriter, as the game would; returns submit and write timings"""
+    rng = random.Random(seed)
+    writer = ScoreWriter(path)
+    slowest = 0.0
+    start = time.perf_counter()
+    for i in range(rows):
+        t = time.perf_counter()
+        writer.submit(rng.choice(MODES), rng.choice(LEVELS), rng.choice(puzzles), rng.uniform(2.0, 600.0))
+        slowest = max(slowest, time.perf_counter() - t)
+    submitted = time.perf_counter() - start
+    writer.close()
+    written = time.perf_counter() - start
+    if writer.error:
+        raise writer.error
+    return submitted, written, slowest, writer.batches
+
+
+def time_queries(store, name, keys, queries, rng, indexed=True):
+    """p50/p99 ms of top-10 queries for random keys of one leaderboard"""
+    times = []
+    for i in range(queries):
+        key = rng.choice(keys)
+        t = time.perf_counter()
+        if indexed:
+            store.top(limit=10, **{name: key})
+        else:
+            # the same query made to skip the index, to show what it saves
+            list(store.db.execute(f"SELECT mode, level, puzzle, seconds, finished FROM scores NOT INDEXED "
+                                  f"WHERE {name} = ? ORDER BY seconds LIMIT 10", (key,)))
+        times.append((time.perf_counter() - t) * 1000)
+    return percentile(times, 0.5), percentile(times, 0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time batched score writes and indexed leaderboard queries")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--puzzles', type=int, default=5000, help="distinct puzzle IDs among the rows")
+    parser.add_argument('--path', default='bench_scores.db')
+    parser.add_argument('--queries', type=int, default=200, help="queries per leaderboard")
+    parser.add_argument('--scan-queries', type=int, default=3, help="unindexed queries per leaderboard, for comparison")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep', action='store_true', help="keep the database file afterwards")
+    args = parser.parse_args()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.path + suffix):
+            os.remove(args.path + suffix)
+    rng = random.Random(args.seed)
+    puzzles = [f"{rng.getrandbits(64):016x}" for i in range(args.puzzles)]
+
+    submitted, written, slowest, batches = fill(args.path, args.rows, puzzles, args.seed)
+    print(f"wrote {args.rows} scores in {written:.2f}s ({args.rows / written:,.0f}/s, {batches} batches); "
+          f"submit {submitted / args.rows * 1e6:.2f} us average, {slowest * 1000:.2f} ms slowest")
+
+    store = ScoreStore(args.path)
+    leaderboards = (("mode", list(MODES)), ("level", list(LEVELS)), ("puzzle", puzzles))
+    for name, keys in leaderboards:
+        plan = store.db.execute(f"EXPLAIN QUERY PLAN SELECT * FROM scores WHERE {name} = ? ORDER BY seconds LIMIT 10",
+                                (keys[0],)).fetchall()
+        p50, p99 = time_queries(store, name, keys, args.queries, rng)
+        line = f"top 10 by {name:6s}: p50 {p50:7.3f} ms  p99 {p99:7.3f} ms"
+        if args.scan_queries:
+            scan, scan_p99 = time_queries(store, name, keys, args.scan_queries, rng, indexed=False)
+            line += f"   without index p50 {scan:9.1f} ms ({scan / max(p50, 1e-6):,.0f}x)"
+        print(line)
+        print(f"  plan: {'; '.join(row[-1] for row in plan)}")
+    print(f"{store.count()} rows, {os.path.getsize(args.path) / 1e6:.1f} MB")
+    store.close()
+
+    if not args.keep:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.path + suffix):
+                os.remove(args.path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+# Benchmark suite: set generation, highlighting, win check, rendering and solving
+# usage: python benchmark.py [--output bench.json] [--save-baseline base.json] [--compare base.json]
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import batch_verify
+from domino import Domino
+from engine import GameEngine, SimulatedClock
+from generator import PuzzleGenerator
+from solver import Solver
+
+LEVELS = (0, 1, 2, 3)
+# working area lengths (dominoes) for the highlight, win check and render benchmarks
+LENGTHS = (0, 5, 20, 100)
+
+
+def measure(op, repeats=5, min_time=0.05):
+    """Seconds per call of op: the median and fastest of repeats timed runs
+
+    Each run calls op enough times to last about min_time, so fast
+    operations aren't swamped by timer resolution.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for i in range(number):
+            op()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 2 or number >= 1 << 20:
+            break
+        number *= 2
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    runs = []
+    for r in range(repeats):
+        start = time.perf_counter()
+        for i in range(number):
+            op()
+        runs.append((time.perf_counter() - start) / number)
+    return {"median_us": statistics.median(runs) * 1e6, "min_us": min(runs) * 1e6, "number": number, "repeats": repeats}
+
+
+def at_level(level):
+    """Sets Domino.difficulty (class state every generator reads) and returns the old value"""
+    old = Domino.difficulty
+    Domino.difficulty = (level, level)
+    return old
+
+
+def fill_working_area(engine, length):
+    """Lay the known solution end to end until the working area has length dominoes
+
+    Whole solutions leave top and bottom level, so the overhang stays live
+    and the highlights are non-trivial at every length.
+    """
+    solution = engine.known_solution or [0]
+    engine.working_area_dominos.set_tiles(engine.tiles)
+    for i in range(length):
+        index = solution[i % len(solution)]
+        engine.working_area_dominos.append(Domino(engine.tiles[index], index))
+    engine.reposition_working_area_dominos()
+    engine.update_highlights()
+
+
+def edit(engine):
+    # take the last domino out and put it back: one change to the working area
+    area = engine.working_area_dominos
+    if area:
+        last = area[len(area) - 1]
+        area.remove(last)
+        area.append(last)
+
+
+def bench_tiles(results, run, seed):
+    # a new set: the tiles for the level plus one Domino placement per tile
+    for level in LEVELS:
+        old = at_level(level)
+        rng = random.Random(seed)
+        def op():
+            tiles = Domino.generate_tiles(10, rng)
+            return [Domino(tile, i, 50 + i * 120, 100) for i, tile in enumerate(tiles)]
+        run(f"tiles/level={level}", op)
+        Domino.difficulty = old
+
+
+def bench_generate(results, run, seed):
+    # a set with a planted solution confirmed by the solver (what new games use without a bank)
+    for level in LEVELS:
+        generator = PuzzleGenerator(seed=seed)
+        rng = random.Random(seed)
+        run(f"generate/level={level}", lambda: generator.generate((level, level), rng))
+
+
+def bench_working_area(results, run, seed):
+    engine = GameEngine(seed=seed, clock=SimulatedClock(), background_jobs=False)
+    for length in LENGTHS:
+        fill_working_area(engine, length)
+        run(f"edit/n={length}", lambda: edit(engine))
+        def highlights():
+            edit(engine)
+            engine.update_highlights()
+        run(f"highlights/n={length}", highlights)
+        def win_check():
+            edit(engine)
+            # as much of the sequences as the game draws
+            engine.get_concatenated_sequences(50)
+            return engine.check_win_condition()
+        run(f"win_check/n={length}", win_check)
+    engine.close()
+
+
+def bench_render(results, run, seed):
+    try:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        import pygame
+        from game import Game
+    except ImportError as error:
+        print(f"skipping render benchmarks: {error}")
+        return
+    game = Game(seed=seed, background_jobs=False)
+    game.verbose = False
+    # draw into an off-screen surface of the window's size
+    game.screen = pygame.Surface((game.screen_width, game.screen_height))
+    for length in LENGTHS:
+        fill_working_area(game, length)
+        game.draw_frame()
+        # warm: everything comes out of the render cache
+        run(f"render/warm/n={length}", game.draw_frame)
+        def cold():
+            game.render.clear()
+            game.background = None
+            game.draw_frame()
+        run(f"render/cold/n={length}", cold)
+    game.close()
+    pygame.quit()
+
+
+def solver_corpus(seed, per_level=5):
+    """Fixed seeded sets: planted-solution sets at each level and as many plain random ones"""
+    corpus = []
+    generator = PuzzleGenerator(seed=seed)
+    rng = random.Random(seed)
+    for level in LEVELS[:3]:
+        old = at_level(level)
+        for i in range(per_level):
+            corpus.append(generator.generate((level, level), rng)[0])
+            corpus.append(Domino.generate_tiles(10, rng))
+        Domino.difficulty = old
+    return corpus
+
+
+def bench_solver(results, run, seed):
+    corpus = solver_corpus(seed)
+    solver = Solver(max_depth=12, max_states=20000)
+    explored = []
+    def op():
+        explored.append(sum(solver.solve(tiles).states_explored for tiles in corpus))
+    run("solve/corpus", op)
+    if "solve/corpus" not in results:
+        return
+    result = results["solve/corpus"]
+    result["sets"] = len(corpus)
+    result["states_per_s"] = explored[-1] / (result["median_us"] / 1e6)
+
+
+def bench_verify(results, run, seed, count=20000):
+    # candidate checks against one set: a tenth are its solution, the rest random (NumPy if installed)
+    tiles, solution = PuzzleGenerator(seed=seed).generate((1, 1))
+    rng = random.Random(seed)
+    candidates = [solution if i % 10 == 0 else [rng.randrange(len(tiles)) for j in range(len(solution))]
+                  for i in range(count)]
+    if batch_verify.np is not None:
+        candidates = batch_verify.candidate_array(candidates)
+    run("verify/batch", lambda: batch_verify.verify_many(tiles, candidates))
+    if "verify/batch" in results:
+        results["verify/batch"]["checks_per_s"] = count / (results["verify/batch"]["median_us"] / 1e6)
+        results["verify/batch"]["numpy"] = batch_verify.np is not None
+
+
+BENCHMARKS = {
+    "tiles": bench_tiles,
+    "generate": bench_generate,
+    "working_area": bench_working_area,
+    "render": bench_render,
+    "solver": bench_solver,
+    "verify": bench_verify,
+}
+
+
+def run_suite(groups, repeats, min_time, seed, name_filter=None):
+    results = {}
+
+    def run(name, op):
+        if name_filter and name_filter not in name:
+            return
+        results[name] = measure(op, repeats, min_time)
+        print(f"  {name:28s} {results[name]['median_us']:12.1f} us")
+
+    for group in groups:
+        print(f"{group}:")
+        BENCHMARKS[group](results, run, seed)
+    return results
+
+
+def metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": args.seed,
+        "repeats": args.repeats,
+        "min_time": args.min_time,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print each benchmark against the baseline; returns the names that got slower than threshold allows"""
+    regressions = []
+    print(f"\n{'benchmark':28s} {'baseline us':>12s} {'now us':>12s} {'ratio':>7s}")
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"{name:28s} {'-':>12s} {result['median_us']:12.1f}     new")
+            continue
+        ratio = result["median_us"] / max(old["median_us"], 1e-9)
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{name:28s} {old['median_us']:12.1f} {result['median_us']:12.1f} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the game's hot paths and compare against a baseline")
+    parser.add_argument('--group', action='append', choices=list(BENCHMARKS),
+                        help="benchmark group to run (repeatable, default all)")
+    parser.add_argument('--filter', default=None, help="only benchmarks whose name contains this")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05, help="seconds per timed run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="write the results as JSON here")
+    parser.add_argument('--save-baseline', default=None, metavar='PATH', help="also write the results as the baseline")
+    parser.add_argument('--compare', default=None, metavar='PATH', help="baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="flag a benchmark whose median is this fraction slower than the baseline's")
+    args = parser.parse_args()
+
+    results = run_suite(args.group or list(BENCHMARKS), args.repeats, args.min_time, args.seed, args.filter)
+    report = {"meta": metadata(args), "results": results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            print(f"wrote {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) more than {args.threshold:.0%} slower than {args.compare}: "
+                  + ", ".join(regressions))
+            sys.exit(1)
+        print(f"\nno regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+# Difficulty calibration: scores how hard generated sets are and builds the level table
+# usage: python calibrate.py [--sets 200] [--levels 12] [--workers N] [--output calibration.json]
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import time
+import zlib
+from collections import namedtuple
+from generator import PuzzleGenerator
+from solver import Solver, encode_pairs, step, START_STATE
+
+# default table the game loads (see GameEngine)
+CALIBRATION_FILE = "calibration.json"
+
+Hardness = namedtuple('Hardness', ['length', 'branching', 'reachable', 'effort', 'capped'])
+
+
+def measure(tiles, solution_length, max_states=50000):
+    """Hardness of a solvable set
+
+    length is the minimal solution length and effort the states a
+    shortest-first search expands before finding it. reachable counts the
+    overhang states reachable from the start within length moves (stopping
+    at max_states, capped says it did) and branching is how many dominoes
+    fit on average in each of those states.
+    """
+    effort = Solver(max_depth=solution_length, max_states=10 ** 7, prefilter=False).solve(tiles).states_explored
+    pairs = encode_pairs(tiles)
+    seen = {START_STATE}
+    frontier = [START_STATE]
+    expanded = moves = 0
+    # most sets can grow their overhang forever, so only the moves a solution
+    # could take are counted; without the depth limit nearly every count hit the cap
+    for depth in range(solution_length):
+        if not frontier or len(seen) >= max_states:
+            break
+        next_frontier = []
+        for state in frontier:
+            expanded += 1
+            for top, bottom in pairs:
+                new_state = step(state, top, bottom)
+                if new_state is None:
+                    continue
+                moves += 1
+                if new_state not in seen and len(seen) < max_states:
+                    seen.add(new_state)
+                    next_frontier.append(new_state)
+        frontier = next_frontier
+    return Hardness(solution_length, moves / expanded, len(seen), effort, len(seen) >= max_states)
+
+
+def hardness(score):
+    """One number per set: log2 of the search effort, so each step up is twice the work"""
+    return math.log2(1 + score.effort)
+
+
+def parameter_grid(max_squares=6, lengths=range(2, 8)):
+    """Generation parameters to try: square count range per side and planted solution length
+
+    low == high is left out: top and bottom pieces of one string can't be
+    cut differently then, so nothing can be planted.
+    """
+    return [{"squares": (low, high), "lengths": (length, length)}
+            for low in range(1, max_squares) for high in range(low + 1, max_squares + 1) for length in lengths]
+
+
+def _score_chunk(task):
+    """Generate and measure count sets with one parameter setting (runs in a worker process)"""
+    index, params, seed, start, count, max_states = task
+    generator = PuzzleGenerator(levels={0: params})
+    scores = []
+    for i in range(start, start + count):
+        # seeded by the parameters, so adding settings to the grid doesn't change the others' sets
+        rng = random.Random(f"{seed}:{params['squares']}:{params['lengths']}:{i}")
+        try:
+            tiles, solution = generator.generate((0, 0), rng)
+        except RuntimeError:
+            scores.append(None)
+            continue
+        scores.append(measure(tiles, len(solution), max_states))
+    return index, scores
+
+
+def calibrate(grid, sets, seed=0, workers=None, chunk=20, max_states=50000, progress=True):
+    """Scores of sets generated sets for every parameter setting, spread over worker processes
+
+    Returns one list per setting, None standing for a set that couldn't be generated.
+    """
+    tasks = [(index, params, seed, start, min(chunk, sets - start), max_states)
+             for index, params in enumerate(grid) for start in range(0, sets, chunk)]
+    results = [[] for params in grid]
+    started = time.perf_counter()
+    done = 0
+    with multiprocessing.Pool(workers or multiprocessing.cpu_count()) as pool:
+        for n, (index, scores) in enumerate(pool.imap_unordered(_score_chunk, tasks), 1):
+            results[index] += scores
+            done += len(scores)
+            if progress and (n % 50 == 0 or n == len(tasks)):
+                elapsed = time.perf_counter() - started
+                print(f"  {done}/{len(grid) * sets} sets, {done / elapsed:.0f} sets/s")
+    return results
+
+
+def summarise(params, scores):
+    """Averages for one parameter setting, or None if too few of its sets could be generated"""
+    made = [score for score in scores if score is not None]
+    if len(made) < len(scores) / 2:
+        return None
+    return {
+        "squares": list(params["squares"]),
+        "lengths": list(params["lengths"]),
+        "hardness": statistics.mean(hardness(score) for score in made),
+        "solution_length": statistics.mean(score.length for score in made),
+        "branching": statistics.mean(score.branching for score in made),
+        "reachable": statistics.mean(score.reachable for score in made),
+        "reachable_capped": sum(score.capped for score in made) / len(made),
+        "effort": statistics.median(score.effort for score in made),
+        "sets": len(made),
+    }
+
+
+def build_levels(summaries, count):
+    """count levels with evenly spaced hardness, each using a setting close to its target
+
+    The spacing runs from the easiest setting to the hardest, so every win
+    moves up by the same step instead of the jumps the old fixed levels
+    made. The settings are picked together so that going up a level never
+    shortens the solution or makes the dominoes bigger and always raises
+    the hardness; of the tables that do so, the one closest to the targets
+    wins. Without that, neighbouring levels could swap back and forth
+    between two square ranges whose hardness happened to interleave.
+    """
+    summaries = sorted((s for s in summaries if s is not None), key=lambda s: s["hardness"])
+    low, high = summaries[0]["hardness"], summaries[-1]["hardness"]
+    spacing = (high - low) / max(1, count - 1)
+    targets = [low + spacing * level for level in range(count)]
+    # best[i] is (total miss, previous index) for a table ending at setting i
+    best = [(abs(s["hardness"] - targets[0]), None) for s in summaries]
+    chosen = [best]
+    for target in targets[1:]:
+        best = []
+        for s in summaries:
+            options = [(chosen[-1][i][0], i) for i, p in enumerate(summaries)
+                       if chosen[-1][i] is not None and _follows(s, p)]
+            if options:
+                miss, i = min(options)
+                best.append((miss + abs(s["hardness"] - target), i))
+            else:
+                best.append(None)
+        chosen.append(best)
+    ends = [(entry[0], i) for i, entry in enumerate(chosen[-1]) if entry is not None]
+    if not ends:
+        raise ValueError(f"no {count} settings rise steadily in hardness; try fewer levels")
+    index = min(ends)[1]
+    picks = []
+    for best in reversed(chosen):
+        picks.append(index)
+        index = best[index][1]
+    return [dict(summaries[i], level=level, target=target)
+            for level, (i, target) in enumerate(zip(reversed(picks), targets))]
+
+
+def _follows(setting, previous):
+    """Whether setting can be the level after previous: harder, no shorter solution, no bigger dominoes"""
+    return (setting["hardness"] > previous["hardness"]
+            and setting["lengths"][0] >= previous["lengths"][0]
+            and setting["squares"][0] <= previous["squares"][0]
+            and setting["squares"][1] <= previous["squares"][1])
+
+
+def load_levels(path):
+    """Calibrated levels from a calibration file as {level: entry}, or None if there is no file"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return {entry["level"]: entry for entry in json.load(f)["levels"]}
+
+
+def levels_id(levels):
+    """16-bit fingerprint of a level table, as puzzle banks record it; 0 stands for the built-in levels"""
+    if not levels:
+        return 0
+    table = [[level, list(levels[level]["squares"]), list(levels[level]["lengths"])] for level in sorted(levels)]
+    return zlib.crc32(json.dumps(table).encode()) % 0xFFFF + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score generated sets and build the level calibration table")
+    parser.add_argument('--sets', type=int, default=200, help="sets per parameter setting")
+    parser.add_argument('--levels', type=int, default=12)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-squares', type=int, default=6, help="most squares per domino side")
+    parser.add_argument('--lengths', type=int, nargs=2, default=(2, 7), metavar=('MIN', 'MAX'),
+                        help="planted solution lengths to try")
+    parser.add_argument('--max-states', type=int, default=50000, help="cap on the reachable states counted per set")
+    parser.add_argument('--output', default=CALIBRATION_FILE)
+    args = parser.parse_args()
+
+    grid = parameter_grid(args.max_squares, range(args.lengths[0], args.lengths[1] + 1))
+    print(f"{len(grid)} parameter settings x {args.sets} sets, {args.workers or multiprocessing.cpu_count()} workers")
+    started = time.perf_counter()
+    results = calibrate(grid, args.sets, args.seed, args.workers, max_states=args.max_states)
+    summaries = [summarise(params, scores) for params, scores in zip(grid, results)]
+    levels = build_levels(summaries, args.levels)
+
+    print(f"\n{'level':>5s} {'squares':>8s} {'length':>6s} {'hardness':>8s} {'min len':>7s} {'branch':>6s} {'reach':>6s}")
+    for entry in levels:
+        print(f"{entry['level']:5d} {'%d-%d' % tuple(entry['squares']):>8s} {entry['lengths'][0]:6d} "
+              f"{entry['hardness']:8.2f} {entry['solution_length']:7.2f} {entry['branching']:6.2f} {entry['reachable']:6.0f}")
+    with open(args.output, "w") as f:
+        json.dump({"meta": {"sets": args.sets, "seed": args.seed, "max_states": args.max_states,
+                            "elapsed": time.perf_counter() - started},
+                   "levels": levels,
+                   "settings": [s for s in summaries if s is not None]}, f, indent=1)
+    print(f"wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
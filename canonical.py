@@ -0,0 +1,133 @@
+import hashlib
+from collections import namedtuple
+from itertools import permutations
+from solver import START_STATE
+from tiles import COLOR_NAMES, Tile
+
+
+class Transform(namedtuple('Transform', ['perm', 'swap', 'reverse'])):
+    """A symmetry of PCP: relabel colours, swap top and bottom, reverse every string
+
+    perm is bytes with perm[code] the new colour code. All three parts
+    commute, so a transform is its own kind of inverse with perm inverted.
+    """
+    __slots__ = ()
+
+    def table(self):
+        return bytes(self.perm) + bytes(range(len(self.perm), 256))
+
+    def apply(self, tiles):
+        table = self.table()
+        result = []
+        for top, bottom in tiles:
+            top, bottom = top.translate(table), bottom.translate(table)
+            if self.swap:
+                top, bottom = bottom, top
+            if self.reverse:
+                top, bottom = top[::-1], bottom[::-1]
+            result.append(Tile(top, bottom))
+        return result
+
+    def apply_state(self, state):
+        """Overhang state in the transformed puzzle (not defined for reversals)"""
+        if self.reverse:
+            raise ValueError("reversing transforms don't map overhang states")
+        if state is None:
+            return None
+        top_ahead, overhang = state
+        if not overhang:
+            return START_STATE
+        return (top_ahead != self.swap, overhang.translate(self.table()))
+
+    def inverse(self):
+        perm = bytearray(len(self.perm))
+        for code, new in enumerate(self.perm):
+            perm[new] = code
+        return Transform(bytes(perm), self.swap, self.reverse)
+
+
+def transforms(color_count=len(COLOR_NAMES), reversals=True):
+    """Every symmetry: colour permutations x top/bottom swap (x reversal)"""
+    for perm in permutations(range(color_count)):
+        for swap in (False, True):
+            for reverse in ((False, True) if reversals else (False,)):
+                yield Transform(bytes(perm), swap, reverse)
+
+
+def tiles_id(tiles):
+    """Short ID of tiles already in canonical form (what CanonicalForm.id holds)"""
+    digest = hashlib.sha1()
+    for top, bottom in tiles:
+        digest.update(bytes((len(top), len(bottom))) + top + bottom)
+    return digest.hexdigest()[:16]
+
+
+class CanonicalForm:
+    """The smallest sorted image of a tile set over a group of symmetries
+
+    tiles[i] is transform applied to the original tile order[i]. Equivalent
+    sets (any order, any symmetry in the group) get the same tiles and id.
+    """
+
+    def __init__(self, tiles, transform, order):
+        self.tiles = tiles
+        self.transform = transform
+        self.order = order
+        self.id = tiles_id(tiles)
+
+    def __repr__(self):
+        return f"CanonicalForm(id={self.id!r}, transform={self.transform})"
+
+    def state(self, state):
+        """Original overhang state -> canonical one"""
+        return self.transform.apply_state(state)
+
+    def original_tile(self, tile):
+        """Canonical tile -> the tile it came from"""
+        return self.transform.inverse().apply([tile])[0]
+
+    def to_canonical(self, solution):
+        """Solution over the original tile indices -> over canonical indices"""
+        position = {original: i for i, original in enumerate(self.order)}
+        mapped = [position[i] for i in solution]
+        return mapped[::-1] if self.transform.reverse else mapped
+
+    def from_canonical(self, solution):
+        mapped = [self.order[i] for i in solution]
+        return mapped[::-1] if self.transform.reverse else mapped
+
+
+def canonical_form(tiles, color_count=len(COLOR_NAMES), reversals=True):
+    """Canonical form of a tile set; tile order never matters
+
+    With reversals=False only colour permutations and the swap are used;
+    those map overhang states too, so caches keyed by state can share
+    entries between equivalent sets.
+    """
+    tiles = [Tile(bytes(top), bytes(bottom)) for top, bottom in tiles]
+    best = None
+    for transform in transforms(color_count, reversals):
+        image = transform.apply(tiles)
+        order = sorted(range(len(image)), key=image.__getitem__)
+        key = tuple(image[i] for i in order)
+        if best is None or key < best[0]:
+            best = (key, transform, order)
+    return CanonicalForm(*best)
+
+
+def canonical_id(tiles):
+    """Short ID shared by every set equivalent under the full symmetry group"""
+    return canonical_form(tiles).id
+
+
+def random_variant(tiles, solution, rng, color_count=len(COLOR_NAMES)):
+    """An equivalent set under a random symmetry and tile order, with its solution mapped"""
+    transform = rng.choice(list(transforms(color_count)))
+    image = transform.apply(tiles)
+    order = list(range(len(image)))
+    rng.shuffle(order)
+    position = {original: i for i, original in enumerate(order)}
+    mapped = [position[i] for i in solution]
+    if transform.reverse:
+        mapped.reverse()
+    return [image[i] for i in order], mapped
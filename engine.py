@@ -0,0 +1,617 @@
+import os
+import random
+import time
+from background import BackgroundWorker
+from calibrate import levels_id, load_levels, CALIBRATION_FILE
+from domino import Domino
+from generator import PuzzleGenerator
+from hints import HintService
+from puzzle_bank import PuzzleBank
+from recorder import NullRecorder
+from solver import Solver
+from working_area import WorkingArea
+
+# kinds of input handle_input understands
+MOUSE_DOWN = "down"
+MOUSE_UP = "up"
+MOUSE_MOTION = "motion"
+# seconds before an unreachable puzzle server is asked again
+DAILY_RETRY = 30.0
+
+
+class SystemClock:
+    """Real time: tick() sleeps to hold the frame rate and returns the ms since the last tick"""
+
+    def __init__(self):
+        self.last = time.perf_counter()
+
+    def now(self):
+        return time.time()
+
+    def tick(self, fps=0):
+        if fps:
+            wait = self.last + 1 / fps - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        now = time.perf_counter()
+        elapsed = (now - self.last) * 1000
+        self.last = now
+        return elapsed
+
+
+class SimulatedClock:
+    """Time that only moves when ticked, so sessions run as fast as the CPU allows
+
+    Each tick is one frame: 1000 / fps ms (or frame_ms when no fps is given).
+    """
+
+    def __init__(self, start=0.0, frame_ms=1000 / 60):
+        self.time = start
+        self.frame_ms = frame_ms
+
+    def now(self):
+        return self.time
+
+    def tick(self, fps=0):
+        elapsed = 1000 / fps if fps else self.frame_ms
+        self.time += elapsed / 1000
+        return elapsed
+
+    def advance(self, seconds):
+        self.time += seconds
+
+
+class Button:
+    """Clickable screen area (same fields pygame.Rect has for the ones the game uses)"""
+    __slots__ = ('x', 'y', 'width', 'height')
+
+    def __init__(self, x, y, width, height):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.width, self.height))
+
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, i):
+        return (self.x, self.y, self.width, self.height)[i]
+
+    @property
+    def left(self):
+        return self.x
+
+    @property
+    def center(self):
+        return (self.x + self.width // 2, self.y + self.height // 2)
+
+    @property
+    def centery(self):
+        return self.y + self.height // 2
+
+    def collidepoint(self, pos):
+        return self.x <= pos[0] < self.x + self.width and self.y <= pos[1] < self.y + self.height
+
+
+class GameEngine:
+    """The game rules and input handling without any display
+
+    Everything pygame-specific (window, drawing, the event queue) lives in
+    Game, which subclasses this. On its own the engine runs headless:
+    feed it input with handle_input() and move time with tick(); with a
+    SimulatedClock and background_jobs=False (no worker or prefetch
+    threads) a session is deterministic and runs much faster than real time.
+    """
+
+    def __init__(self, seed=None, clock=None, background_jobs=True, verbose=False, recorder=None, scores=None,
+                 server=None, player="player"):
+        self.clock = clock or SystemClock()
+        self.verbose = verbose
+        # session log (see recorder.py): tile sets, input and frame timings
+        self.recorder = recorder or NullRecorder()
+        # wins go to this ScoreWriter (see scores.py), None keeps no scores
+        self.scores = scores
+        # PuzzleClient for the daily puzzles (see server.py); sets are generated locally while it's unreachable
+        self.server = server
+        self.player = player
+        # (date, level) of the current set when it came from the server
+        self.daily = None
+        # level -> (date, tiles) of today's puzzles fetched so far, and when an unreachable server is next asked
+        self.daily_sets = {}
+        self.server_retry = 0.0
+        # levels the server has no puzzles for, not asked for again this session
+        self.refused_levels = set()
+        self.delta_time = 0.1
+        self.screen_width = 1280
+        self.screen_height = 720
+        self.fps = 60
+
+        # searches run on a background thread (or straight away when background_jobs is off)
+        self.background_jobs = background_jobs
+        self.worker = BackgroundWorker(inline=not background_jobs)
+
+        # Domino Generation
+        # "solvable" plants a known solution, "random" is the old unchecked generation
+        self.generation_mode = "solvable"
+        # a seed makes the sequence of generated sets reproducible
+        self.rng = random.Random(seed)
+        # levels calibrated by measured hardness (see calibrate.py); without the file the built-in ones are used
+        levels = load_levels(os.path.join(os.path.dirname(__file__), CALIBRATION_FILE))
+        self.generator = PuzzleGenerator(seed=seed, levels=levels)
+        # prebuilt puzzles (see puzzle_bank.py), used for levels the bank covers if it was built for these levels
+        self.puzzle_bank = PuzzleBank.open_if_exists(os.path.join(os.path.dirname(__file__), "puzzles.bank"),
+                                                     levels_id(levels))
+        self.known_solution = None
+        self.domino_index = 0
+        # the tile set, and one Domino placement per tile in the set area
+        self.tiles = self.generate_tiles()
+        self.dominos = self.place_set_dominos()
+        self.frameDone = False
+
+        # working area dominoes, with their concatenations, match status and highlights kept up to date
+        self.working_area_dominos = WorkingArea(self.tiles)
+        # drag state
+        self.dragged_domino = None
+        # define areas
+        self.working_area_y = 400
+        self.working_area_height = 200
+
+        button_width = 130
+        button_height = 40
+        button_y = 20
+        button_spacing = 20
+
+        new_x = self.screen_width - button_width - 20
+        clear_x = new_x - button_width - button_spacing
+        level_x = clear_x - button_width - button_spacing
+
+        # button for difficulty/clear/new game/game mode
+        self.difficulty_button_rect = Button(level_x, button_y, button_width, button_height)
+        self.clear_button_rect = Button(clear_x, button_y, button_width, button_height)
+        self.new_game_button_rect = Button(new_x, button_y, button_width, button_height)
+        self.game_mode_button_rect = Button(new_x, self.screen_height - button_height - 20, button_width, button_height)
+        self.hint_button_rect = Button(clear_x, self.screen_height - button_height - 20, button_width, button_height)
+
+        # hints: next tile toward a solution, memoized across requests
+        self.hints = HintService()
+        self.hint_index = None
+        self.hint_message = None
+        self.hint_version = None
+
+        # time variables (classic mode uses these)
+        self.timer_start = None
+        self.timer_running = False
+        self.elapsed_time = 0
+        self.last_time = 0
+
+        # default starts at classic
+        self.game_mode = "classic"
+        # default for timed mode
+        self.timed_difficulty = "easy"
+
+        self.time_limits = {
+            "easy": 120.0,
+            "medium": 60.0,
+            "hard": 30.0
+        }
+        self.time_remaining = None
+        self.countdown_active = False
+
+        self.running = True
+        self.recorder.start(self)
+
+    def log(self, message):
+        if self.verbose:
+            print(message)
+
+    def changed(self):
+        """Called when anything on screen may have changed (Game redraws everything)"""
+
+    def close(self):
+        """Stop the background threads, finish the session log and release the files and connections held"""
+        self.worker.stop()
+        self.generator.stop()
+        self.recorder.close(self)
+        self.recorder = NullRecorder()
+        if self.puzzle_bank is not None:
+            self.puzzle_bank.close()
+            self.puzzle_bank = None
+        if self.scores is not None:
+            self.scores.close()
+            self.scores = None
+        if self.server is not None:
+            self.server.close()
+
+    def game_over(self, outcome, seconds):
+        """A game ended: outcome is "win" (seconds is the win time) or "timeout" """
+        self.recorder.outcome(outcome, seconds)
+        if outcome == "win" and self.scores is not None:
+            # only queued here; the writer thread works out the puzzle ID and writes it
+            mode = self.timed_difficulty if self.game_mode == "timed" else "classic"
+            self.scores.submit(mode, Domino.difficulty[0], list(self.tiles), seconds)
+        if outcome == "win" and self.daily is not None:
+            # the server checks the solution and ranks the time; the answer comes back through finish_jobs
+            solution = [d.index for d in self.working_area_dominos]
+            self.worker.submit("submit", self.submit_daily, *self.daily, solution, seconds, tag=self.daily)
+
+    def fetch_daily(self, *levels):
+        """Fetch today's puzzles for these levels on the worker, unless the server failed lately"""
+        for level in levels:
+            if self.clock.now() < self.server_retry:
+                return
+            key = ("daily", level)
+            if level not in self.daily_sets and level not in self.refused_levels and not self.worker.busy(key):
+                self.worker.submit(key, self.load_daily, level)
+
+    def load_daily(self, level, cancelled=None):
+        try:
+            self.daily_sets[level] = self.server.puzzle(level)
+        except OSError as error:
+            # don't ask again for a while, so a down server costs one timeout now and then
+            self.server_retry = self.clock.now() + DAILY_RETRY
+            self.log(f"Puzzle server unavailable ({error}), generating locally")
+        except ValueError as error:
+            self.refused_levels.add(level)
+            self.log(f"No daily puzzle for level {level} ({error})")
+
+    def submit_daily(self, date, level, solution, seconds, cancelled=None):
+        return self.server.submit(date, level, self.player, solution, seconds)
+
+    def start_timer(self):
+        # start timer when first domino is placed
+        if self.game_mode == "timed":
+            if not self.countdown_active:
+                if self.time_remaining is None:
+                    self.time_remaining = float(self.time_limits[self.timed_difficulty])
+                self.countdown_active = True
+                # reset last_time so win time can be computed
+                self.last_time = 0
+                self.log(f"Timed countdown started: {self.timed_difficulty} ({self.time_remaining}s)")
+        else:
+            if not self.timer_running and len(self.working_area_dominos) == 0:
+                self.timer_start = self.clock.now()
+                self.timer_running = True
+                self.elapsed_time = 0
+                self.log("Timer started")
+
+    def stop_timer(self):
+        # stop timer when sequences match 
+        if self.timer_running:
+            self.timer_running = False
+            self.elapsed_time = self.clock.now() - self.timer_start
+            self.last_time = self.elapsed_time
+            self.log(f"Time taken to win: {self.last_time:.2f} seconds")
+            self.game_over("win", self.last_time)
+
+    def reset_timer(self):
+        # reset timer when working area is cleared or new game button is pressed
+        self.timer_running = False
+        self.elapsed_time = 0
+        self.timer_start = None
+        self.last_time = 0
+        self.log("Timer reset")
+    
+    def get_current_time(self):
+        # get current elapsed time in seconds
+        if self.timer_running:
+            return self.clock.now() - self.timer_start 
+        else:
+            return self.elapsed_time
+
+    def is_in_working_area(self, y):
+        # check if y cord is in working area
+        return self.working_area_y <= y <= self.working_area_y + self.working_area_height
+    
+    def get_concatenated_sequences(self, count=None):
+        """Get the concatenated top and bottom sequences (bytes of colour codes) from working area dominoes
+
+        count limits each to its first count squares, all a screen can show.
+        """
+        return self.working_area_dominos.squares(count)
+    
+    def get_current_bottom_sequence(self):
+        """Get the current concatenated bottom sequence"""
+        _, bottom_sequence = self.get_concatenated_sequences()
+        return bottom_sequence
+    
+    def update_highlights(self):
+        """Update which dominoes in the set should be highlighted as valid next moves"""
+        # the working area works out the valid tiles once per change
+        highlights = self.working_area_dominos.highlights()
+        # any change to the working area makes an old hint stale
+        if self.working_area_dominos.version != self.hint_version:
+            self.worker.cancel("hint")
+            self.hint_index = None
+            self.hint_message = None
+        for d in self.dominos:
+            d.highlighted = d.index in highlights
+            d.hinted = d.index == self.hint_index
+
+    def show_hint(self):
+        """Start looking for the best next domino toward a solution"""
+        self.hint_version = self.working_area_dominos.version
+        self.hint_index = None
+        self.hint_message = "Thinking..."
+        self.worker.submit("hint", self.hints.hint, self.tiles, self.working_area_dominos.state,
+                           tag=self.hint_version)
+        self.update_highlights()
+
+    def check_solvable(self):
+        """Solve the current set in the background (prints the result, fills in known_solution)"""
+        self.worker.submit("check", Solver().solve, self.tiles, tag=self.tiles)
+
+    def finish_jobs(self):
+        """Apply results from background jobs that are still current"""
+        for job in self.worker.poll():
+            if job.error is not None:
+                self.log(f"Background {job.key} failed: {job.error!r}")
+            elif job.key == "hint" and job.tag == self.working_area_dominos.version:
+                self.hint_index = job.result
+                self.hint_message = "No hint - try Clear" if job.result is None else None
+                self.log(f"Hint: {self.hint_index} (cache {self.hints.stats()})")
+                self.update_highlights()
+            elif job.key == "submit":
+                if job.result["valid"]:
+                    self.log(f"Daily puzzle {job.tag[0]} level {job.tag[1]}: rank {job.result['rank']} "
+                             f"of {job.result['players']}")
+                else:
+                    self.log("The server didn't accept the solution")
+            elif job.key == "check" and job.tag is self.tiles:
+                self.log(job.result)
+                if job.result.solved and self.known_solution is None:
+                    self.known_solution = job.result.solution
+                elif job.result.rejection is not None:
+                    self.hint_message = f"No solution: {job.result.rejection.reason}"
+                elif job.result.status == "unsolvable":
+                    self.hint_message = "This set has no solution"
+            self.changed()
+
+    def toggle_game_mode(self):
+        # classic -> timed (easy) -> timed (medium) -> timed (hard) -> classic
+        if self.game_mode == "classic":
+            self.game_mode = "timed"
+            self.timed_difficulty = "easy"
+        elif self.game_mode == "timed" and self.timed_difficulty == "easy":
+            self.timed_difficulty = "medium"
+        elif self.game_mode == "timed" and self.timed_difficulty == "medium":
+            self.timed_difficulty = "hard"
+        else:
+            self.game_mode = "classic"
+        # reset working area and timers whenever mode changes
+        if self.game_mode == "timed":
+            self.time_remaining = float(self.time_limits[self.timed_difficulty])
+            self.countdown_active = False
+        else:
+            self.time_remaining = None
+            self.countdown_active = False
+
+        self.clear_working_area()
+        self.log(f"Mode changed to: {self.game_mode}" + (f" ({self.timed_difficulty})" if self.game_mode == "timed" else ""))
+
+    def handle_mouse_down(self, pos):
+        if self.game_mode == "timed" and self.time_remaining == 0:
+            if self.new_game_button_rect.collidepoint(pos) or \
+                self.clear_button_rect.collidepoint(pos) or \
+                self.difficulty_button_rect.collidepoint(pos) or \
+                self.game_mode_button_rect.collidepoint(pos):
+                pass
+            else:
+                # block all other interactions (domino dragging/placing)
+                return
+
+        # check if clicking game mode button
+        if self.game_mode_button_rect.collidepoint(pos):
+            self.toggle_game_mode()
+            return
+
+        # check if clicking clear button
+        if self.clear_button_rect.collidepoint(pos):
+            self.clear_working_area()
+            return
+        
+        # check if clicking new game button
+        if self.new_game_button_rect.collidepoint(pos):
+            self.new_game()
+            return
+        
+        # check if clicking difficulty button
+        if self.difficulty_button_rect.collidepoint(pos):
+            self.resetDifficulty()
+            return
+
+        # check if clicking hint button
+        if self.hint_button_rect.collidepoint(pos):
+            self.show_hint()
+            return
+
+        # check if clicking on a domino in the set 
+        for d in self.dominos:
+            if d.contains_point(pos[0], pos[1]):
+                # create a new placement of the same tile for dragging
+                new_domino = Domino(d.tile, d.index, d.x, d.y)
+                new_domino.start_drag(pos[0], pos[1])
+                self.dragged_domino = new_domino
+                return
+        
+        # check if clicking on a domino in the working area
+        for d in self.working_area_dominos:
+            if d.contains_point(pos[0], pos[1]):
+                d.start_drag(pos[0], pos[1])
+                self.dragged_domino = d
+                # remove from working area for repositioning
+                self.working_area_dominos.remove(d)
+                self.update_highlights()
+                return
+
+    def handle_mouse_up(self, pos):
+        # if timed mode ended, cancel any drag and ignore drops (but allow buttons)
+        if self.game_mode == "timed" and self.time_remaining == 0:
+            if self.dragged_domino:
+                self.dragged_domino.stop_drag()
+                self.dragged_domino = None
+            return
+
+        if self.dragged_domino:
+            # check if domino was dropped in working area
+            if self.is_in_working_area(self.dragged_domino.y):
+                if len(self.working_area_dominos) == 0:
+                    # start timer on first domino placed
+                    self.start_timer()
+                if self.dragged_domino not in self.working_area_dominos:
+                    self.working_area_dominos.append(self.dragged_domino)
+                self.dragged_domino.in_working_area = True
+                # reposition dominoes in sequence
+                self.reposition_working_area_dominos()
+                # stop timer if sequences match
+                if self.working_area_dominos.matched:
+                    # a win moves the next new game up a level
+                    self.frameDone = True
+                    if self.game_mode == "timed":
+                        # stop countdown and record the win time (in timed mode)
+                        if self.countdown_active:
+                            self.countdown_active = False
+                            self.last_time = self.time_limits[self.timed_difficulty] - (self.time_remaining if self.time_remaining is not None else 0)
+                            self.log(f"You win! Time used: {self.last_time:.2f}s")
+                            self.game_over("win", self.last_time)
+                    else:
+                        self.stop_timer()
+            else:
+                # if not in working area, don't add it (it's discarded)
+                pass
+            
+            self.dragged_domino.stop_drag()
+            self.dragged_domino = None
+            # update highlights after any change
+            self.update_highlights()
+
+    def handle_mouse_motion(self, pos):
+        if self.dragged_domino:
+            self.dragged_domino.update_drag(pos[0], pos[1])
+    
+    def reposition_working_area_dominos(self):
+        """Position dominoes in working area from left to right"""
+        x_start = 50
+        y_pos = self.working_area_y + 20  # Position dominoes higher in working area
+        spacing = 20
+        
+        for i, domino in enumerate(self.working_area_dominos):
+            domino.x = x_start + i * (domino.width + spacing)
+            domino.y = y_pos
+    
+    def clear_working_area(self):
+        """Clear all dominoes from working area and reset timer"""
+        self.working_area_dominos.set_tiles(self.tiles)
+        self.reset_timer()
+        # if in timed mode, keep the displayed limit
+        if self.game_mode == "timed":
+            self.time_remaining = float(self.time_limits[self.timed_difficulty])
+            self.countdown_active = False
+        else:
+            self.time_remaining = None
+            self.countdown_active = False
+        self.update_highlights()
+
+
+    def generate_tiles(self):
+        """Build the 10 tiles for a new set using the current generation mode"""
+        level = Domino.difficulty[0]
+        self.daily = None
+        if self.server is not None and self.generation_mode == "solvable":
+            # fetched in the background: until today's puzzle is in, or while the server is down, sets are local
+            self.fetch_daily(level, level + 1)
+            if level in self.daily_sets:
+                date, tiles = self.daily_sets[level]
+                self.daily = (date, level)
+                # the server keeps the solution to itself; check_solvable finds one
+                self.known_solution = None
+                self.log(f"Daily puzzle {date} level {level}")
+                return tiles
+        if self.generation_mode == "solvable" and self.puzzle_bank and self.puzzle_bank.has(level):
+            puzzle = self.puzzle_bank.sample(level, rng=self.rng)
+            self.known_solution = puzzle.solution
+            return puzzle.tiles
+        if self.generation_mode == "solvable":
+            tiles, self.known_solution = self.generator.next_set(Domino.difficulty)
+            # keep the current and next level ready in the background
+            if self.background_jobs:
+                next_level = (Domino.difficulty[0] + 1, Domino.difficulty[1] + 1)
+                self.generator.prefetch(Domino.difficulty, next_level)
+            return tiles
+        self.known_solution = None
+        return Domino.generate_tiles(10, self.rng)
+
+    def place_set_dominos(self):
+        """One placement per tile, laid out in the set area"""
+        return [Domino(tile, i, 50 + i * 120, 100) for i, tile in enumerate(self.tiles)]
+
+    def new_game(self):
+        """Generate new set of dominoes"""
+        if self.frameDone:
+            self.frameDone = False
+            Domino.difficulty = (Domino.difficulty[0] + 1, Domino.difficulty[1] + 1)
+        self.tiles = self.generate_tiles()
+        self.dominos = self.place_set_dominos()
+        self.recorder.tiles(self.tiles, Domino.difficulty)
+        self.check_solvable()
+        # if in timed mode, show the time limit right away
+        if self.game_mode == "timed":
+            self.time_remaining = float(self.time_limits[self.timed_difficulty])
+            self.countdown_active = False
+        else:
+            self.time_remaining = None
+            self.countdown_active = False
+
+        self.clear_working_area()
+
+    def resetDifficulty(self):
+        if Domino.difficulty != (0,0):
+            Domino.difficulty = (Domino.difficulty[0] - 1, Domino.difficulty[1] - 1)
+            self.new_game()
+
+    def check_win_condition(self):
+        """Check if top and bottom sequences match (the drop that wins sets frameDone)"""
+        return self.working_area_dominos.matched
+
+    def handle_input(self, kind, pos):
+        """One mouse event: MOUSE_DOWN, MOUSE_UP or MOUSE_MOTION at pos"""
+        self.recorder.input(kind, pos)
+        if kind == MOUSE_DOWN:
+            self.handle_mouse_down(pos)
+        elif kind == MOUSE_UP:
+            self.handle_mouse_up(pos)
+        elif kind == MOUSE_MOTION:
+            self.handle_mouse_motion(pos)
+
+    def tick(self):
+        """Advance one frame: take the frame time from the clock and update"""
+        elapsed = self.clock.tick(self.fps)
+        self.delta_time = max(0.001, min(0.1, elapsed / 1000))
+        self.recorder.frame(elapsed, self.delta_time)
+        self.update(self.delta_time)
+
+    def update(self, delta_time):
+        """Per-frame game logic: background results and the timed countdown"""
+        # results from background searches, never waits for one
+        self.finish_jobs()
+
+        # update timed countdown
+        if self.game_mode == "timed" and self.countdown_active:
+            # handles timer if player wins or not
+            if not self.check_win_condition():
+                self.time_remaining -= delta_time
+                if self.time_remaining <= 0:
+                    self.time_remaining = 0
+                    self.countdown_active = False
+                    self.changed()
+                    self.log("Game over (time ran out)!")
+                    self.game_over("timeout", 0.0)
+            else:
+                if self.countdown_active:
+                    self.countdown_active = False
+                    self.last_time = self.time_limits[self.timed_difficulty] - (self.time_remaining if self.time_remaining is not None else 0)
+                    self.changed()
+                    self.log(f"You win! Time used: {self.last_time:.2f}s")
+                    self.game_over("win", self.last_time)
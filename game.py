@@ -1,338 +1,104 @@
 import time
-from domino import Domino
+from engine import GameEngine, MOUSE_DOWN, MOUSE_UP, MOUSE_MOTION
+from render import RenderCache, BORDER
+from recorder import SessionRecorder
+from scores import ScoreWriter
+from server import PuzzleClient, HOST, PORT
+from redraw import RedrawScheduler
+from profiler import FrameProfiler, NullProfiler, PHASE_NAMES, EVENTS, UPDATE, HIGHLIGHTS, DRAW, SEQUENCES, DOMINOS, PRESENT
 import pygame
 
 
-class Game:
+class FrameClock:
+    """Real time through pygame's frame clock (tick() waits to hold the frame rate)
+
+    now() moves by the whole ms each tick() reports, so timers measure
+    frames exactly and a recorded session's timers come out the same on replay.
+    """
 
     def __init__(self):
-        # pygame setup
-        pygame.init()
         self.clock = pygame.time.Clock()
+        self.time = time.time()
 
-        self.delta_time = 0.1
-        self.screen_width = 1280
-        self.screen_height = 720
-        self.fps = 60
-
-        self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
-        pygame.display.set_caption("PCP Problem Game")
-        
-        # Domino Generation
-        self.domino_index = 0
-        self.dominos = [Domino() for i in range(10)]
-        self.frameDone = False
-        # set initial positions for dominoes in the set area
-        for i, d in enumerate(self.dominos):
-            d.x = 50 + i * 120
-            d.y = 100
-        
-        # working area dominoes
-        self.working_area_dominos = []
-        # drag state
-        self.dragged_domino = None
-        # define areas
-        self.working_area_y = 400
-        self.working_area_height = 200
-        
-
-        button_width = 130
-        button_height = 40
-        button_y = 20
-        button_spacing = 20
+    def now(self):
+        return self.time
 
-        new_x = self.screen_width - button_width - 20
-        clear_x = new_x - button_width - button_spacing
-        level_x = clear_x - button_width - button_spacing
+    def tick(self, fps=0):
+        elapsed = self.clock.tick(fps)
+        self.time += elapsed / 1000
+        return elapsed
 
-        # button for difficulty/clear/new game/game mode
-        self.difficulty_button_rect = pygame.Rect(level_x, button_y, button_width, button_height)
-        self.clear_button_rect = pygame.Rect(clear_x, button_y, button_width, button_height)
-        self.new_game_button_rect = pygame.Rect(new_x, button_y, button_width, button_height)
-        self.game_mode_button_rect = pygame.Rect(new_x, self.screen_height - button_height - 20, button_width, button_height)
-        
-        # time variables (classic mode uses these)
-        self.timer_start = None
-        self.timer_running = False
-        self.elapsed_time = 0
-        self.last_time = 0
-
-        # default starts at classic
-        self.game_mode = "classic"
-        # default for timed mode
-        self.timed_difficulty = "easy"
-
-        self.time_limits = {
-            "easy": 120.0,
-            "medium": 60.0,
-            "hard": 30.0
-        }
-        self.time_remaining = None
-        self.countdown_active = False
-        self.timer_box_width = 260
 
-        self.running = True
+class Game(GameEngine):
+    """The pygame front end: window, event loop and drawing around the GameEngine rules"""
 
-    def start_timer(self):
-        # start timer when first domino is placed
-        if self.game_mode == "timed":
-            if not self.countdown_active:
-                if self.time_remaining is None:
-                    self.time_remaining = float(self.time_limits[self.timed_difficulty])
-                self.countdown_active = True
-                # reset last_time so win time can be computed
-                self.last_time = 0
-                print(f"Timed countdown started: {self.timed_difficulty} ({self.time_remaining}s)")
-        else:
-            if not self.timer_running and len(self.working_area_dominos) == 0:
-                self.timer_start = time.time()
-                self.timer_running = True
-                self.elapsed_time = 0
-                print("Timer started")
-
-    def stop_timer(self):
-        # stop timer when sequences match 
-        if self.timer_running:
-            self.timer_running = False
-            self.elapsed_time = time.time() - self.timer_start
-            self.last_time = self.elapsed_time
-            print(f"Time taken to win: {self.last_time:.2f} seconds")
-
-    def reset_timer(self):
-        # reset timer when working area is cleared or new game button is pressed
-        self.timer_running = False
-        self.elapsed_time = 0
-        self.timer_start = None
-        self.last_time = 0
-        print("Timer reset")
-    
-    def get_current_time(self):
-        # get current elapsed time in seconds
-        if self.timer_running:
-            return time.time() - self.timer_start 
-        else:
-            return self.elapsed_time
-
-    def is_in_working_area(self, y):
-        # check if y cord is in working area
-        return self.working_area_y <= y <= self.working_area_y + self.working_area_height
-    
-    def get_concatenated_sequences(self):
-        """Get the concatenated top and bottom sequences from working area dominoes"""
-        top_sequence = []
-        bottom_sequence = []
-        for domino in self.working_area_dominos:
-            top_sequence.extend(domino.top)
-            bottom_sequence.extend(domino.bottom)
-        return top_sequence, bottom_sequence
-    
-    def get_current_bottom_sequence(self):
-        """Get the current concatenated bottom sequence"""
-        _, bottom_sequence = self.get_concatenated_sequences()
-        return bottom_sequence
-    
-    def update_highlights(self):
-        """Update which dominoes in the set should be highlighted as valid next moves"""
-        # Reset all highlights
-        for d in self.dominos:
-            d.highlighted = False
-        
-        # If working area is empty, all dominoes are valid (can start with anything)
-        if not self.working_area_dominos:
-            for d in self.dominos:
-                d.highlighted = True
-            return
-        
-        # Get the current bottom sequence
-        current_bottom = self.get_current_bottom_sequence()
-        
-        # Highlight dominoes whose top matches the current bottom
-        # This means they can be placed next to continue the sequence
-        for d in self.dominos:
-            if d.top == current_bottom:
-                d.highlighted = True
-
-    def toggle_game_mode(self):
-        # classic -> timed (easy) -> timed (medium) -> timed (hard) -> classic
-        if self.game_mode == "classic":
-            self.game_mode = "timed"
-            self.timed_difficulty = "easy"
-        elif self.game_mode == "timed" and self.timed_difficulty == "easy":
-            self.timed_difficulty = "medium"
-        elif self.game_mode == "timed" and self.timed_difficulty == "medium":
-            self.timed_difficulty = "hard"
-        else:
-            self.game_mode = "classic"
-        # reset working area and timers whenever mode changes
-        if self.game_mode == "timed":
-            self.time_remaining = float(self.time_limits[self.timed_difficulty])
-            self.countdown_active = False
-        else:
-            self.time_remaining = None
-            self.countdown_active = False
-
-        self.clear_working_area()
-        print(f"Mode changed to: {self.game_mode}" + (f" ({self.timed_difficulty})" if self.game_mode == "timed" else ""))
-
-    def handle_mouse_down(self, pos):
-        if self.game_mode == "timed" and self.time_remaining == 0:
-            if self.new_game_button_rect.collidepoint(pos) or \
-                self.clear_button_rect.collidepoint(pos) or \
-                self.difficulty_button_rect.collidepoint(pos) or \
-                self.game_mode_button_rect.collidepoint(pos):
-                pass
-            else:
-                # block all other interactions (domino dragging/placing)
-                return
+    def __init__(self, redraw_mode="dirty", show_redraw_stats=False, seed=None, background_jobs=True,
+                 profile=False, profile_trace=None, record=None, scores=None, server=None, player="player"):
+        # pygame setup
+        pygame.init()
+        # per-phase frame timings (F3 shows them); the null profiler costs nothing
+        self.profiler = FrameProfiler() if profile or profile_trace else NullProfiler()
+        self.profile_trace = profile_trace
+        # record=path logs the session for replay.py
+        recorder = SessionRecorder(record) if record else None
+        # scores=path keeps wins in that SQLite file for the leaderboards
+        scores = ScoreWriter(scores) if scores else None
+        # server="host:port" plays the daily puzzles from a puzzle server (see server.py)
+        if server:
+            host, _, port = server.rpartition(":")
+            server = PuzzleClient(host or HOST, int(port or PORT))
+        super().__init__(seed=seed, clock=FrameClock(), background_jobs=background_jobs, verbose=True,
+                         recorder=recorder, scores=scores, server=server, player=player)
 
-        # check if clicking game mode button
-        if self.game_mode_button_rect.collidepoint(pos):
-            self.toggle_game_mode()
-            return
+        self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
+        pygame.display.set_caption("PCP Problem Game")
+        # fonts, text and domino surfaces are rendered once and reused
+        self.render = RenderCache()
+        self.background = None
+        # only changed screen areas are redrawn; "full" redraws every frame like before
+        self.redraw = RedrawScheduler(self.screen.get_rect(), redraw_mode)
+        self.show_redraw_stats = show_redraw_stats
+        # ms to sleep waiting for events when nothing is animating
+        self.idle_timeout = 500
+        # the worker posts JOB_DONE to wake the loop when a background search finishes
+        self.JOB_DONE = pygame.event.custom_type()
+        self.worker.notify = lambda: pygame.event.post(pygame.event.Event(self.JOB_DONE))
 
-        # check if clicking clear button
-        if self.clear_button_rect.collidepoint(pos):
-            self.clear_working_area()
-            return
-        
-        # check if clicking new game button
-        if self.new_game_button_rect.collidepoint(pos):
-            self.new_game()
-            return
-        
-        # check if clicking difficulty button
-        if self.difficulty_button_rect.collidepoint(pos):
-            self.resetDifficulty()
-            return
+        self.timer_box_width = 260
+        # area covering both timer displays, redrawn when the timer text changes
+        self.timer_region = pygame.Rect(0, 0, 360, 60)
+        self.timer_region.center = (self.screen_width // 2, self.clear_button_rect.centery)
+        self.drawn_timer_state = None
 
-        # check if clicking on a domino in the set 
-        for d in self.dominos:
-            if d.contains_point(pos[0], pos[1]):
-                # create a copy of the domino for dragging
-                new_domino = Domino()
-                new_domino.top = d.top.copy()
-                new_domino.bottom = d.bottom.copy()
-                new_domino.x = d.x
-                new_domino.y = d.y
-                new_domino.start_drag(pos[0], pos[1])
-                self.dragged_domino = new_domino
-                return
-        
-        # check if clicking on a domino in the working area
-        for d in self.working_area_dominos:
-            if d.contains_point(pos[0], pos[1]):
-                d.start_drag(pos[0], pos[1])
-                self.dragged_domino = d
-                # remove from working area for repositioning
-                self.working_area_dominos.remove(d)
-                return
-
-    def handle_mouse_up(self, pos):
-        # if timed mode ended, cancel any drag and ignore drops (but allow buttons)
-        if self.game_mode == "timed" and self.time_remaining == 0:
-            if self.dragged_domino:
-                self.dragged_domino.stop_drag()
-                self.dragged_domino = None
-            return
+        # F3 overlay with the profiler's numbers
+        self.show_profile = False
+        self.profile_overlay = None
+        self.profile_overlay_frame = 0
+        self.profile_rect = pygame.Rect(self.screen_width - 300, 70, 290, 12 + 20 * (len(PHASE_NAMES) + 2))
 
-        if self.dragged_domino:
-            # check if domino was dropped in working area
-            if self.is_in_working_area(self.dragged_domino.y):
-                if len(self.working_area_dominos) == 0:
-                    # start timer on first domino placed
-                    self.start_timer()
-                if self.dragged_domino not in self.working_area_dominos:
-                    self.working_area_dominos.append(self.dragged_domino)
-                self.dragged_domino.in_working_area = True
-                # reposition dominoes in sequence
-                self.reposition_working_area_dominos()
-                # stop timer if sequences match
-                top_seq, bottom_seq = self.get_concatenated_sequences()
-                if top_seq == bottom_seq and len(top_seq) > 0:
-                    if self.game_mode == "timed":
-                        # stop countdown and record the win time (in timed mode)
-                        if self.countdown_active:
-                            self.countdown_active = False
-                            self.last_time = self.time_limits[self.timed_difficulty] - (self.time_remaining if self.time_remaining is not None else 0)
-                            print(f"You win! Time used: {self.last_time:.2f}s")
-                    else:
-                        self.stop_timer()
-            else:
-                # if not in working area, don't add it (it's discarded)
-                pass
-            
-            self.dragged_domino.stop_drag()
-            self.dragged_domino = None
-            # update highlights after any change
-            self.update_highlights()
+    def changed(self):
+        # clicks, drops and finished searches can change anything on screen
+        self.redraw.mark_all()
 
     def handle_mouse_motion(self, pos):
         if self.dragged_domino:
-            self.dragged_domino.update_drag(pos[0], pos[1])
-    
-    def reposition_working_area_dominos(self):
-        """Position dominoes in working area from left to right"""
-        x_start = 50
-        y_pos = self.working_area_y + 20  # Position dominoes higher in working area
-        spacing = 20
-        
-        for i, domino in enumerate(self.working_area_dominos):
-            domino.x = x_start + i * (domino.width + spacing)
-            domino.y = y_pos
-    
-    def clear_working_area(self):
-        """Clear all dominoes from working area and reset timer"""
-        self.working_area_dominos = []
-        self.reset_timer()
-        # if in timed mode, keep the displayed limit
-        if self.game_mode == "timed":
-            self.time_remaining = float(self.time_limits[self.timed_difficulty])
-            self.countdown_active = False
-        else:
-            self.time_remaining = None
-            self.countdown_active = False
-        self.update_highlights()
+            # redraw where the domino was and where it is now
+            self.redraw.mark(self.domino_rect(self.dragged_domino))
+            super().handle_mouse_motion(pos)
+            self.redraw.mark(self.domino_rect(self.dragged_domino))
 
+    def update_highlights(self):
+        # counted as its own phase wherever it's called from
+        previous = self.profiler.switch(HIGHLIGHTS)
+        super().update_highlights()
+        self.profiler.switch(previous)
 
-    def new_game(self):
-        """Generate new set of dominoes"""
-        if self.frameDone:
-            self.frameDone = False
-            Domino.difficulty = (Domino.difficulty[0] + 1, Domino.difficulty[1] + 1)
-        Domino.generated.clear()
-        self.dominos = [Domino() for i in range(10)]
-        # set initial positions for dominoes in the set area
-        for i, d in enumerate(self.dominos):
-            d.x = 50 + i * 120
-            d.y = 100
-        # if in timed mode, show the time limit right away
-        if self.game_mode == "timed":
-            self.time_remaining = float(self.time_limits[self.timed_difficulty])
-            self.countdown_active = False
-        else:
-            self.time_remaining = None
-            self.countdown_active = False
+    def domino_rect(self, domino):
+        """Screen area a domino covers, including its highlight border"""
+        return pygame.Rect(domino.x - BORDER, domino.y - BORDER, domino.width + 2 * BORDER, domino.height + 2 * BORDER)
 
-        self.clear_working_area()
-
-    def resetDifficulty(self):
-        if Domino.difficulty != (0,0):
-            Domino.difficulty = (Domino.difficulty[0] - 1, Domino.difficulty[1] - 1)
-            self.new_game()
-
-    def check_win_condition(self):
-        """Check if top and bottom sequences match"""
-        if not self.working_area_dominos:
-            return False
-        top_seq, bottom_seq = self.get_concatenated_sequences()
-        playerWon = top_seq == bottom_seq and len(top_seq) > 0
-        if playerWon:
-            self.frameDone = True
-        return playerWon
-    
     def draw_timer(self):
         """Draw the timer display"""
-        timer_font = pygame.font.Font(None, 36)
         bg_color = (0, 100, 0) # Dark green background
 
         if self.timer_running:
@@ -348,7 +114,7 @@ class Game:
                 timer_text = "Timer: 0.00s"
                 color = (150, 255, 150)  # Green for timer not started
         
-        text_surface = timer_font.render(timer_text, True, color)
+        text_surface = self.render.text(timer_text, 36, color)
         timer_rect = text_surface.get_rect()
         timer_rect.center = (self.screen_width // 2, self.clear_button_rect.centery)
 
@@ -363,8 +129,6 @@ class Game:
         """Draws the timed countdown."""
         if self.game_mode != "timed":
             return
-        
-        timer_font = pygame.font.Font(None, 36)
 
         # if there's no time value set, use the difficulty's limit
         if self.time_remaining is None:
@@ -390,7 +154,7 @@ class Game:
         else:
             color = (150, 255, 150)
 
-        text_surface = timer_font.render(time_text, True, color)
+        text_surface = self.render.text(time_text, 36, color)
 
         box_w = self.timer_box_width
         box_h = text_surface.get_height() + 12
@@ -408,25 +172,63 @@ class Game:
 
     def draw_time_up_message(self):
         """Draws game over message"""
-        font = pygame.font.Font(None, 72)
-        text = font.render("GAME OVER", True, (255, 50, 50))
-        rect = text.get_rect(center=(self.screen_width // 2, 325))
+        panel = self.render.panel("game_over", lambda: self.build_message_panel("GAME OVER", (255, 50, 50), (50, 0, 0)))
+        self.screen.blit(panel, panel.get_rect(center=(self.screen_width // 2, 325)))
 
+    def build_message_panel(self, message, color, bg_color):
+        """Render a big boxed message (win / game over) to its own surface"""
+        text = self.render.font(72).render(message, True, color)
+        rect = text.get_rect()
         bg = rect.inflate(40, 20)
-        pygame.draw.rect(self.screen, (50, 0, 0), bg)
-        pygame.draw.rect(self.screen, (255, 50, 50), bg, 5)
-
-        self.screen.blit(text, rect)
+        panel = pygame.Surface(bg.size)
+        panel.fill(bg_color)
+        pygame.draw.rect(panel, color, panel.get_rect(), 5)
+        panel.blit(text, text.get_rect(center=panel.get_rect().center))
+        return panel.convert()
+
+    def build_background(self):
+        """Draw everything that never changes (backgrounds, labels, buttons) once"""
+        background = pygame.Surface((self.screen_width, self.screen_height))
+        background.fill((0, 135, 0))
+
+        #draw working area background
+        pygame.draw.rect(background, (50, 100, 50), (0, self.working_area_y, self.screen_width, self.working_area_height))
+
+        # label for set area
+        background.blit(self.render.text("Domino Set (Click and Drag)", 36, (255, 255, 255)), (20, 20))
+
+        # Draw buttons
+        buttons = [
+            (self.clear_button_rect, (200, 50, 50), "Clear"),
+            (self.new_game_button_rect, (50, 50, 200), "New Game"),
+            (self.difficulty_button_rect, (190, 140, 35), "Lower Level"),
+            (self.hint_button_rect, (0, 150, 150), "Hint"),
+        ]
+        for rect, color, label in buttons:
+            pygame.draw.rect(background, color, rect)
+            pygame.draw.rect(background, (255, 255, 255), rect, 2)
+            text = self.render.text(label, 28, (255, 255, 255))
+            background.blit(text, text.get_rect(center=rect.center))
+
+        # Game mode button (bottom-right), its label is drawn every frame
+        pygame.draw.rect(background, (100, 50, 200), self.game_mode_button_rect)
+        pygame.draw.rect(background, (255, 255, 255), self.game_mode_button_rect, 2)
+
+        # label for working area
+        background.blit(self.render.text("Working Area (Drop Here)", 36, (255, 255, 255)), (20, self.working_area_y - 40))
+        return background.convert()
 
     def run(self):
         print('Starting game...')
 
         # Domino Debug
         for d in self.dominos:
+            top, bottom = d.tile.names()
             print(f'Domino {self.domino_index}:')
-            print(f'Top: {d.top}')
-            print(f'Bottom: {d.bottom}\n')
+            print(f'Top: {top}')
+            print(f'Bottom: {bottom}\n')
             self.domino_index += 1
+        self.check_solvable()
         
         # initialize highlights (all valid at start)
         self.update_highlights()
@@ -436,136 +238,196 @@ class Game:
             self.countdown_active = False
 
         while self.running:
-            
-            # frame rate timing
-            self.delta_time = self.clock.tick(self.fps) / 1000
-            self.delta_time = max(0.001, min(0.1, self.delta_time))
-            
-            # EVENT HANDLER
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    self.handle_mouse_down(event.pos)
-                elif event.type == pygame.MOUSEBUTTONUP:
-                    self.handle_mouse_up(event.pos)
-                elif event.type == pygame.MOUSEMOTION:
-                    self.handle_mouse_motion(event.pos)
-            
-            # update timed countdown
-            if self.game_mode == "timed" and self.countdown_active:
-                # handles timer if player wins or not
-                if not self.check_win_condition():
-                    self.time_remaining -= self.delta_time
-                    if self.time_remaining <= 0:
-                        self.time_remaining = 0
-                        self.countdown_active = False
-                        print("Game over (time ran out)!")
-                else:
-                    if self.countdown_active:
-                        self.countdown_active = False
-                        self.last_time = self.time_limits[self.timed_difficulty] - (self.time_remaining if self.time_remaining is not None else 0)
-                        print(f"You win! Time used: {self.last_time:.2f}s")
-            
-            self.screen.fill((0, 135, 0))
-
-            #draw working area background
-            pygame.draw.rect(self.screen, (50, 100, 50), (0, self.working_area_y, self.screen_width, self.working_area_height))
-
-            # label for set area
-            font = pygame.font.Font(None, 36)
-            text = font.render("Domino Set (Click and Drag)", True, (255, 255, 255))
-            self.screen.blit(text, (20, 20))
-            
-            # Draw buttons
-            # Clear button
-            pygame.draw.rect(self.screen, (200, 50, 50), self.clear_button_rect)
-            pygame.draw.rect(self.screen, (255, 255, 255), self.clear_button_rect, 2)
-            button_font = pygame.font.Font(None, 28)
-            clear_text = button_font.render("Clear", True, (255, 255, 255))
-            text_rect = clear_text.get_rect(center=self.clear_button_rect.center)
-            self.screen.blit(clear_text, text_rect)
-            
-            # New Game button
-            pygame.draw.rect(self.screen, (50, 50, 200), self.new_game_button_rect)
-            pygame.draw.rect(self.screen, (255, 255, 255), self.new_game_button_rect, 2)
-            new_game_text = button_font.render("New Game", True, (255, 255, 255))
-            text_rect = new_game_text.get_rect(center=self.new_game_button_rect.center)
-            self.screen.blit(new_game_text, text_rect)
-
-            pygame.draw.rect(self.screen, (190, 140, 35), self.difficulty_button_rect)
-            pygame.draw.rect(self.screen, (255, 255, 255), self.difficulty_button_rect, 2)
-            new_game_text2 = button_font.render("Lower Level", True, (255, 255, 255))
-            text_rect2 = new_game_text2.get_rect(center=self.difficulty_button_rect.center)
-            self.screen.blit(new_game_text2, text_rect2)
-
-            # Game mode button (bottom-right)
-            pygame.draw.rect(self.screen, (100, 50, 200), self.game_mode_button_rect)
-            pygame.draw.rect(self.screen, (255, 255, 255), self.game_mode_button_rect, 2)
-            gm_font = pygame.font.Font(None, 22)
-            if self.game_mode == "classic":
-                gm_text = "Mode: Classic"
+            animating = self.dragged_domino or self.timer_running or self.countdown_active
+            if self.redraw.mode == "dirty" and not animating and not self.redraw.pending():
+                # nothing is moving: sleep until an event arrives instead of spinning
+                first_event = pygame.event.wait(self.idle_timeout)
+                self.redraw.idle_waits += 1
+                # restart frame timing so the idle gap doesn't count as one long frame
+                elapsed = self.clock.tick()
+                self.delta_time = 0.001
+                events = pygame.event.get()
+                if first_event.type != pygame.NOEVENT:
+                    events.insert(0, first_event)
             else:
-                gm_text = f"Timed: {self.timed_difficulty.title()}"
-            gm_surface = gm_font.render(gm_text, True, (255,255,255))
-            gm_rect = gm_surface.get_rect(center=self.game_mode_button_rect.center)
-            self.screen.blit(gm_surface, gm_rect)
-
-            # label for working area
-            text = font.render("Working Area (Drop Here)", True, (255, 255, 255))
-            self.screen.blit(text, (20, self.working_area_y - 40))
-            
-            # Classic timer
-            if self.game_mode == "classic":
-                self.draw_timer()
-            # Timed countdown timer
-            if self.game_mode == "timed":
-                self.draw_countdown()
-
-            # Update highlights every frame to ensure they're current
-            self.update_highlights()
+                # frame rate timing
+                elapsed = self.clock.tick(self.fps)
+                self.delta_time = max(0.001, min(0.1, elapsed / 1000))
+                events = pygame.event.get()
+            self.recorder.frame(elapsed, self.delta_time)
             
-            # Draw current sequences if there are dominoes in working area
-            if self.working_area_dominos:
-                top_seq, bottom_seq = self.get_concatenated_sequences()
-                self.draw_sequence_display(top_seq, bottom_seq)
+            self.process_frame(events)
+
+        self.close()
+        if self.show_redraw_stats:
+            print(self.redraw.report())
+        if self.profiler.enabled:
+            print(self.profiler.report())
+        if self.profile_trace:
+            self.profiler.export(self.profile_trace)
+            print(f"Frame trace written to {self.profile_trace}")
+        pygame.quit()
+
+    def process_frame(self, events, event_times=None):
+        """Update, handle one frame's events, and redraw what changed
+
+        The update comes first, as in GameEngine.tick() followed by input,
+        so a recorded session replays in the same order. With event_times
+        (a list or deque) each event's handling time is appended to it.
+        """
+        profiler = self.profiler
+        profiler.begin_frame(UPDATE)
+        # background results and the timed countdown
+        self.update(self.delta_time)
+
+        # EVENT HANDLER
+        profiler.switch(EVENTS)
+        for event in events:
+            if event_times is None:
+                self.handle_event(event)
             else:
-                # Show instructions when working area is empty
-                instruction_font = pygame.font.Font(None, 26)
-                inst_text = instruction_font.render("Drag any domino to start! (Yellow border = valid next move)", True, (255, 255, 0))
-                inst_rect = inst_text.get_rect(center=(self.screen_width // 2, self.working_area_y + self.working_area_height // 2))
-                self.screen.blit(inst_text, inst_rect)
-
-            # Check and display win condition
-            if self.check_win_condition():
-                self.draw_win_message()
-            
-            if self.game_mode == "timed" and self.time_remaining == 0:
-                # draw game-over message overlay
-                self.draw_time_up_message()
+                event_start = time.perf_counter()
+                self.handle_event(event)
+                event_times.append(time.perf_counter() - event_start)
+
+        # timer text only changes its own box
+        timer_state = self.timer_state()
+        if timer_state != self.drawn_timer_state:
+            self.drawn_timer_state = timer_state
+            self.redraw.mark(self.timer_region)
+        if self.show_profile and profiler.count >= self.profile_overlay_frame + 30:
+            # the overlay's numbers change twice a second or so, not every frame
+            self.profile_overlay = None
+            self.redraw.mark(self.profile_rect)
+
+        rects = self.redraw.take()
+        if rects == []:
+            profiler.end_frame()
+            return
+        profiler.switch(DRAW)
+        draw_start = time.perf_counter()
+        self.screen.set_clip(rects[0].unionall(rects[1:]) if rects else None)
+        self.draw_frame()
+        self.screen.set_clip(None)
+        profiler.switch(PRESENT)
+        self.redraw.present(rects, time.perf_counter() - draw_start)
+        profiler.end_frame()
+
+    def handle_event(self, event):
+        """Dispatch one pygame event to the engine's input handling"""
+        if event.type != pygame.MOUSEMOTION:
+            # clicks, drops and window events can change anything on screen
+            self.redraw.mark_all()
+        if event.type == pygame.QUIT:
+            self.running = False
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            self.toggle_profile_overlay()
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            self.handle_input(MOUSE_DOWN, event.pos)
+        elif event.type == pygame.MOUSEBUTTONUP:
+            self.handle_input(MOUSE_UP, event.pos)
+        elif event.type == pygame.MOUSEMOTION:
+            self.handle_input(MOUSE_MOTION, event.pos)
+
+    def timer_state(self):
+        """What the timer/countdown currently shows, used to spot when it changes"""
+        if self.game_mode == "timed":
+            return (self.countdown_active, self.time_remaining and round(self.time_remaining, 2))
+        return (self.timer_running, round(self.get_current_time(), 2), self.last_time)
+
+    def draw_frame(self):
+        """Draw the whole scene (only the clipped part reaches the screen)"""
+        if self.background is None:
+            self.background = self.build_background()
+        self.screen.blit(self.background, (0, 0))
+
+        # Game mode button label
+        if self.game_mode == "classic":
+            gm_text = "Mode: Classic"
+        else:
+            gm_text = f"Timed: {self.timed_difficulty.title()}"
+        gm_surface = self.render.text(gm_text, 22, (255, 255, 255))
+        gm_rect = gm_surface.get_rect(center=self.game_mode_button_rect.center)
+        self.screen.blit(gm_surface, gm_rect)
+
+        if self.hint_message:
+            hint_text = self.render.text(self.hint_message, 26, (255, 255, 255))
+            self.screen.blit(hint_text, hint_text.get_rect(midright=(self.hint_button_rect.left - 15, self.hint_button_rect.centery)))
+
+        # Classic timer
+        if self.game_mode == "classic":
+            self.draw_timer()
+        # Timed countdown timer
+        if self.game_mode == "timed":
+            self.draw_countdown()
+
+        # Draw current sequences if there are dominoes in working area
+        if self.working_area_dominos:
+            self.profiler.switch(SEQUENCES)
+            self.draw_sequence_display()
+            self.profiler.switch(DRAW)
+        else:
+            # Show instructions when working area is empty
+            inst_text = self.render.text("Drag any domino to start! (Yellow border = valid next move)", 26, (255, 255, 0))
+            inst_rect = inst_text.get_rect(center=(self.screen_width // 2, self.working_area_y + self.working_area_height // 2))
+            self.screen.blit(inst_text, inst_rect)
+
+        # Check and display win condition
+        if self.check_win_condition():
+            self.draw_win_message()
+        
+        if self.game_mode == "timed" and self.time_remaining == 0:
+            # draw game-over message overlay
+            self.draw_time_up_message()
+
+        
+        self.profiler.switch(DOMINOS)
+        for d in self.dominos:
+            self.render.draw_domino(self.screen, d)
+        
+        # draw dominoes in working area
+        for d in self.working_area_dominos:
+            if d.x >= self.screen_width:
+                # the rest are laid out past the right edge
+                break
+            if d != self.dragged_domino:  # don't draw if currently being dragged
+                self.render.draw_domino(self.screen, d)
+        
+        # draw dragged domino on top
+        if self.dragged_domino:
+            self.render.draw_domino(self.screen, self.dragged_domino)
+        self.profiler.switch(DRAW)
+
+        if self.show_profile:
+            if self.profile_overlay is None:
+                self.profile_overlay = self.build_profile_overlay()
+                self.profile_overlay_frame = self.profiler.count
+            self.screen.blit(self.profile_overlay, self.profile_rect)
 
-            
-            for d in self.dominos:
-                d.draw(self.screen)
-            
-            # draw dominoes in working area
-            for d in self.working_area_dominos:
-                if d != self.dragged_domino:  # don't draw if currently being dragged
-                    d.draw(self.screen)
-            
-            # draw dragged domino on top
-            if self.dragged_domino:
-                self.dragged_domino.draw(self.screen)
-
-            # Draw dominos
-            # for i, d in enumerate(self.dominos):
-            #     d.draw(self.screen, 50 + i * 120, 100)
-                
-            pygame.display.flip()
-            
-        pygame.quit()
     
-    def draw_sequence_display(self, top_seq, bottom_seq):
+    def toggle_profile_overlay(self):
+        """F3: show or hide the frame timings, starting to profile if it wasn't already"""
+        if not self.profiler.enabled:
+            self.profiler = FrameProfiler()
+        self.show_profile = not self.show_profile
+        self.profile_overlay = None
+
+    def build_profile_overlay(self):
+        """Panel with p50/p99 ms for the whole frame and each phase over the buffered frames"""
+        panel = pygame.Surface(self.profile_rect.size, pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 180))
+        font = self.render.font(22)
+        rows = [("ms", "p50", "p99")]
+        rows += [(name, f"{p50:.2f}", f"{p99:.2f}") for name, (p50, p99) in self.profiler.summary().items()]
+        for i, row in enumerate(rows):
+            color = (255, 255, 100) if i == 0 else (255, 255, 255)
+            for text, right in zip(row, (None, 200, 280)):
+                surface = font.render(text, True, color)
+                x = 10 if right is None else right - surface.get_width()
+                panel.blit(surface, (x, 6 + 20 * i))
+        return panel
+
+    def draw_sequence_display(self):
         """Draw the concatenated sequences as colored squares"""
         square_size = 20
         spacing = 4
@@ -576,51 +438,40 @@ class Game:
         top_y = self.working_area_y + self.working_area_height + 30  # 630
         bottom_y = self.working_area_y + self.working_area_height + 75  # 675
         
-        label_font = pygame.font.Font(None, 30)
-        
+        # only the squares that fit on screen are read and rendered, so a long sequence's strip stays cached
+        def visible(x):
+            return (self.screen_width - x) // (square_size + spacing) + 1
+
+        top_seq, bottom_seq = self.get_concatenated_sequences(visible(start_x + 70))
+        top_length, bottom_length = self.working_area_dominos.lengths()
+
         # Draw top sequence label
-        label = label_font.render("Top:", True, (255, 255, 255))
-        self.screen.blit(label, (start_x, top_y))
+        self.screen.blit(self.render.text("Top:", 30, (255, 255, 255)), (start_x, top_y))
         
         # Draw top sequence colored squares (aligned with label)
         x_offset = start_x + 70  # Space after "Top:" label
-        for i, color in enumerate(top_seq):
-            x = x_offset + i * (square_size + spacing)
-            pygame.draw.rect(self.screen, Domino.colors[color], (x, top_y + 2, square_size, square_size))
-            pygame.draw.rect(self.screen, (0, 0, 0), (x, top_y + 2, square_size, square_size), 2)
+        self.screen.blit(self.render.sequence_strip(top_seq, square_size, spacing), (x_offset, top_y + 2))
         
         # Draw bottom sequence label
-        label = label_font.render("Bottom:", True, (255, 255, 255))
-        self.screen.blit(label, (start_x, bottom_y))
+        self.screen.blit(self.render.text("Bottom:", 30, (255, 255, 255)), (start_x, bottom_y))
         
         # Draw bottom sequence colored squares (aligned with label)
         x_offset_bottom = start_x + 95  # Space after "Bottom:" label (longer text)
-        for i, color in enumerate(bottom_seq):
-            x = x_offset_bottom + i * (square_size + spacing)
-            pygame.draw.rect(self.screen, Domino.colors[color], (x, bottom_y + 2, square_size, square_size))
-            pygame.draw.rect(self.screen, (0, 0, 0), (x, bottom_y + 2, square_size, square_size), 2)
+        self.screen.blit(self.render.sequence_strip(bottom_seq[:visible(x_offset_bottom)], square_size, spacing), (x_offset_bottom, bottom_y + 2))
         
         # Draw match indicator
-        max_offset = max(x_offset + len(top_seq) * (square_size + spacing), 
-                         x_offset_bottom + len(bottom_seq) * (square_size + spacing))
+        max_offset = max(x_offset + top_length * (square_size + spacing),
+                         x_offset_bottom + bottom_length * (square_size + spacing))
         
-        if top_seq == bottom_seq and len(top_seq) > 0:
-            match_text = label_font.render("✓ MATCH!", True, (255, 215, 0))
+        if self.working_area_dominos.matched:
+            match_text = self.render.text("✓ MATCH!", 30, (255, 215, 0))
             self.screen.blit(match_text, (max_offset + 30, top_y + 20))
-        elif len(top_seq) > 0 and len(bottom_seq) > 0:
+        elif top_length > 0 and bottom_length > 0:
             # Show if they're getting close
-            match_text = label_font.render("No match yet...", True, (255, 100, 100))
+            match_text = self.render.text("No match yet...", 30, (255, 100, 100))
             self.screen.blit(match_text, (max_offset + 30, top_y + 20))
     
     def draw_win_message(self):
         """Draw a win message when sequences match"""
-        font = pygame.font.Font(None, 72)
-        text = font.render("MATCH! YOU WIN!", True, (255, 215, 0))
-        text_rect = text.get_rect(center=(self.screen_width // 2, 325))
-        
-        # Draw background for text
-        bg_rect = text_rect.inflate(40, 20)
-        pygame.draw.rect(self.screen, (0, 100, 0), bg_rect)
-        pygame.draw.rect(self.screen, (255, 215, 0), bg_rect, 5)
-        
-        self.screen.blit(text, text_rect)
+        panel = self.render.panel("win", lambda: self.build_message_panel("MATCH! YOU WIN!", (255, 215, 0), (0, 100, 0)))
+        self.screen.blit(panel, panel.get_rect(center=(self.screen_width // 2, 325)))
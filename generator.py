@@ -0,0 +1,203 @@
+import random
+import threading
+from collections import deque
+from solver import Solver
+from tiles import COLOR_NAMES, Tile, TileSampler
+
+
+class PuzzleGenerator:
+    """Generates domino sets that are guaranteed to be solvable
+
+    A solution is planted by cutting one random colour string into k top
+    pieces and k bottom pieces, then random distractor dominoes fill up the
+    set. The solver confirms the minimal solution length lands in the target
+    range for the difficulty level (distractors can create shortcuts).
+    """
+
+    # minimal solution length (min, max) wanted for each level of Domino.difficulty
+    target_lengths = {
+        0: (2, 4),
+        1: (3, 5),
+        2: (4, 6),
+        3: (5, 7),
+    }
+
+    def __init__(self, color_count=len(COLOR_NAMES), set_size=10, seed=None,
+                 max_attempts=200, prefetch_count=3, levels=None):
+        self.color_count = color_count
+        # calibrated level -> {"squares": (low, high), "lengths": (min, max)} (see calibrate.py)
+        self.levels = levels
+        self.set_size = set_size
+        self.max_attempts = max_attempts
+        self.prefetch_count = prefetch_count
+        self.random = random.Random(seed)
+        # every set comes from its own stream, split from this by difficulty and number (see set_random)
+        self.seed = seed if seed is not None else self.random.getrandbits(64)
+        self.max_states = 20000
+
+        # sets handed out and sets the background thread has started, per difficulty
+        self.taken = {}
+        self.planned = {}
+        # background run-ahead: difficulty -> deque of finished (number, puzzle)
+        self.ready = {}
+        self.wanted = set()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.thread = None
+        self.running = False
+
+    def target_for(self, difficulty):
+        level = max(0, difficulty[0])
+        if self.levels:
+            return tuple(self.calibrated(level)["lengths"])
+        return self.target_lengths.get(level, self.target_lengths[max(self.target_lengths)])
+
+    def square_range(self, difficulty):
+        if self.levels:
+            return tuple(self.calibrated(difficulty[0])["squares"])
+        # same square count range as Domino.generate_tiles
+        return 1 + difficulty[0], 3 + difficulty[1]
+
+    def calibrated(self, level):
+        # levels past the end of the table stay at its hardest
+        return self.levels.get(max(0, level), self.levels[max(self.levels)])
+
+    def split_lengths(self, total, parts, low, high, rng):
+        """Random composition of total into parts, each within [low, high]"""
+        lengths = [low] * parts
+        spare = total - low * parts
+        open_slots = list(range(parts))
+        while spare > 0:
+            i = rng.choice(open_slots)
+            lengths[i] += 1
+            spare -= 1
+            if lengths[i] == high:
+                open_slots.remove(i)
+        return lengths
+
+    def plant(self, difficulty, length, rng):
+        """Build a set containing a planted solution of the given length"""
+        low, high = self.square_range(difficulty)
+        total = rng.randint(low * length, high * length)
+        string = bytes(rng.randrange(self.color_count) for i in range(total))
+        top_lengths = self.split_lengths(total, length, low, high, rng)
+        bottom_lengths = self.split_lengths(total, length, low, high, rng)
+        if top_lengths == bottom_lengths:
+            return None
+
+        tiles = []
+        top_pos = bottom_pos = 0
+        for top_len, bottom_len in zip(top_lengths, bottom_lengths):
+            tiles.append(Tile(string[top_pos:top_pos + top_len],
+                              string[bottom_pos:bottom_pos + bottom_len]))
+            top_pos += top_len
+            bottom_pos += bottom_len
+
+        # a domino with equal halves is a one-tile solution
+        if any(top == bottom for top, bottom in tiles):
+            return None
+        unique = list(dict.fromkeys(tiles))
+        if len(unique) > self.set_size:
+            return None
+
+        # fill the rest of the set with distinct distractors
+        sampler = TileSampler(low, high, self.color_count, distinct_halves=True)
+        unique += sampler.sample(self.set_size - len(unique), rng, exclude=unique)
+        rng.shuffle(unique)
+        return unique
+
+    def generate(self, difficulty, rng=None):
+        """Returns (tiles, solution): a list of Tiles and a minimal solution"""
+        rng = rng or self.random
+        min_len, max_len = self.target_for(difficulty)
+        best = None
+        for attempt in range(self.max_attempts):
+            tiles = self.plant(difficulty, rng.randint(min_len, max_len), rng)
+            if tiles is None:
+                continue
+            # planted sets always pass the pre-filter, so skip it
+            result = Solver(max_depth=max_len, max_states=self.max_states, prefilter=False).solve(tiles)
+            if not result.solved:
+                continue
+            if len(result.solution) >= min_len:
+                return tiles, result.solution
+            if best is None or len(result.solution) > len(best[1]):
+                best = (tiles, result.solution)
+        if best is None:
+            raise RuntimeError(f"could not generate a solvable set for difficulty {difficulty}")
+        # fall back to the hardest solvable set we saw
+        return best
+
+    def set_random(self, difficulty, number):
+        """Random stream for the number-th set of a difficulty
+
+        Seeded from the generator seed, the difficulty and the number
+        alone, so a seeded game gets the same sets whether they were made
+        ahead by the background thread or on the spot.
+        """
+        return random.Random(f"{self.seed}:{difficulty[0]}:{difficulty[1]}:{number}")
+
+    def next_set(self, difficulty):
+        """Takes a pre-generated set if the background thread has one ready, else generates now"""
+        with self.lock:
+            number = self.taken.get(difficulty, 0)
+            self.taken[difficulty] = number + 1
+            queue = self.ready.get(difficulty)
+            # sets made while we generated the same number ourselves are stale
+            while queue and queue[0][0] < number:
+                queue.popleft()
+            if queue and queue[0][0] == number:
+                puzzle = queue.popleft()[1]
+                self.wakeup.notify()
+                return puzzle
+        return self.generate(difficulty, self.set_random(difficulty, number))
+
+    def prefetch(self, *difficulties):
+        """Ask the background thread to keep sets ready for these difficulties"""
+        with self.lock:
+            self.wanted = set(difficulties)
+            for difficulty in difficulties:
+                self.ready.setdefault(difficulty, deque())
+            self.wakeup.notify()
+        if self.thread is None:
+            self.running = True
+            self.thread = threading.Thread(target=self._run_ahead, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            self.wakeup.notify()
+
+    def _run_ahead(self):
+        while True:
+            with self.lock:
+                while self.running and not self._next_needed():
+                    self.wakeup.wait()
+                if not self.running:
+                    return
+                difficulty = self._next_needed()
+                # the next set not yet handed out or started
+                number = max(self.planned.get(difficulty, 0), self.taken.get(difficulty, 0))
+                self.planned[difficulty] = number + 1
+            try:
+                puzzle = self.generate(difficulty, self.set_random(difficulty, number))
+            except Exception as error:
+                # the thread carries on with the other difficulties; next_set makes this one on the spot
+                # (and raises there), and a later prefetch asking for it again retries it
+                print(f"Generating ahead for difficulty {difficulty} failed: {error}")
+                with self.lock:
+                    self.wanted.discard(difficulty)
+                    if self.planned[difficulty] == number + 1:
+                        self.planned[difficulty] = number
+                continue
+            with self.lock:
+                if number >= self.taken.get(difficulty, 0):
+                    self.ready.setdefault(difficulty, deque()).append((number, puzzle))
+
+    def _next_needed(self):
+        # lowest wanted difficulty whose queue is not full
+        for difficulty in sorted(self.wanted):
+            if len(self.ready.get(difficulty, ())) < self.prefetch_count:
+                return difficulty
+        return None
@@ -0,0 +1,104 @@
+from collections import OrderedDict
+from canonical import canonical_form
+from solver import Solver, step
+
+
+class LRUCache:
+    """Dict with a size limit that drops the least recently used entry first"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        return {'entries': len(self.entries), 'max_entries': self.max_entries, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
+
+
+# cached when the search found no way forward from a state
+NO_HINT = 'none'
+
+
+class HintService:
+    """Best next tile from a game in progress, memoized per (puzzle, overhang state)
+
+    A search from one state gives the whole remaining solution, so every
+    state along it is cached too: following the hints is one search and
+    then cache hits. Puzzles and states are keyed in canonical form (colour
+    relabelling and top/bottom swap, see canonical.py) and cached values
+    are canonical Tiles, so equivalent sets in any tile order share entries.
+    """
+
+    def __init__(self, max_entries=4096, max_depth=20, max_states=50000):
+        self.cache = LRUCache(max_entries)
+        self.solver = Solver(max_depth=max_depth, max_states=max_states)
+        # canonical form of the last set asked about
+        self.last_form = (None, None)
+
+    def hint(self, tiles, state, cancelled=None):
+        """Index into tiles of the next domino to place from this overhang state (None if no hint)
+
+        cancelled is passed on to Solver.solve; a cancelled search returns
+        None and caches nothing.
+        """
+        if state is None:
+            # top and bottom already disagree, nothing can fix that
+            return None
+        form = self.form(tiles)
+        state = form.state(state)
+        tile = self.cache.get((form.id, state))
+        if tile is None:
+            tile = self._search(form, state, cancelled)
+        if tile is None or tile == NO_HINT:
+            return None
+        return tiles.index(form.original_tile(tile))
+
+    def form(self, tiles):
+        key = tuple(tiles)
+        if self.last_form[0] != key:
+            # reversals don't map overhang states, so only the non-reversing symmetries
+            self.last_form = (key, canonical_form(tiles, reversals=False))
+        return self.last_form[1]
+
+    def _search(self, form, state, cancelled):
+        tiles = form.tiles
+        pid = form.id
+        result = self.solver.solve(tiles, start=state, cancelled=cancelled)
+        if cancelled is not None and cancelled():
+            return None
+        if not result.solved:
+            self.cache.put((pid, state), NO_HINT)
+            return NO_HINT
+        # cache the next tile for every state along the solution path
+        for i in result.solution:
+            tile = tiles[i]
+            self.cache.put((pid, state), tile)
+            state = step(state, tile.top, tile.bottom)
+        return tiles[result.solution[0]]
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,193 @@
+# Synthetic input driver for stress-testing the event loop
+# usage: python input_bot.py --scenario flood --frames 300 --motion-per-frame 500
+import argparse
+import os
+import random
+import time
+from collections import deque
+from profiler import FrameProfiler, percentile
+
+
+class InputBot:
+    """Feeds pygame mouse events to a Game one frame at a time and times the handling
+
+    Each frame's events go through Game.process_frame, the same path
+    Game.run uses, but without waiting for the frame rate, so frame
+    times measure the work alone. process_frame also times every
+    event's handle_event() call for the bot. Scenarios are generators that yield one list of
+    events per frame.
+    """
+
+    def __init__(self, game, seed=None):
+        import pygame
+        self.pygame = pygame
+        self.game = game
+        self.random = random.Random(seed)
+        self.mouse = (0, 0)
+        self.event_times = deque(maxlen=200000)
+        self.frame_times = deque(maxlen=100000)
+        self.events = 0
+        self.frames = 0
+        self.wins = 0
+
+    # event builders, in the shape pygame delivers them
+    def down(self, pos):
+        self.mouse = pos
+        return self.pygame.event.Event(self.pygame.MOUSEBUTTONDOWN, pos=pos, button=1)
+
+    def up(self, pos):
+        self.mouse = pos
+        return self.pygame.event.Event(self.pygame.MOUSEBUTTONUP, pos=pos, button=1)
+
+    def motion(self, pos):
+        rel = (pos[0] - self.mouse[0], pos[1] - self.mouse[1])
+        self.mouse = pos
+        return self.pygame.event.Event(self.pygame.MOUSEMOTION, pos=pos, rel=rel, buttons=(1, 0, 0))
+
+    def path(self, start, end, steps):
+        """Motion events along a straight line from start to end"""
+        steps = max(1, steps)
+        return [self.motion((start[0] + (end[0] - start[0]) * i // steps,
+                             start[1] + (end[1] - start[1]) * i // steps)) for i in range(1, steps + 1)]
+
+    def drop_point(self):
+        game = self.game
+        return (self.random.randrange(20, game.screen_width - 20),
+                self.random.randrange(game.working_area_y + 30, game.working_area_y + game.working_area_height - 30))
+
+    def drag(self, domino, end, steps, frames=1):
+        """A drag of domino to end spread over frames, as lists of events per frame"""
+        start = (domino.x + 10, domino.y + 10)
+        moves = self.path(start, end, steps)
+        per_frame = max(1, len(moves) // frames)
+        batches = [moves[i:i + per_frame] for i in range(0, len(moves), per_frame)]
+        batches[0].insert(0, self.down(start))
+        batches[-1].append(self.up(end))
+        return batches
+
+    def run_frame(self, events):
+        game = self.game
+        start = time.perf_counter()
+        game.delta_time = 1 / game.fps
+        game.process_frame(events, self.event_times)
+        self.frame_times.append(time.perf_counter() - start)
+        self.events += len(events)
+        self.frames += 1
+        if game.check_win_condition():
+            self.wins += 1
+            game.new_game()
+
+    def run(self, scenario, frames):
+        start = time.perf_counter()
+        for batch in scenario:
+            if self.frames >= frames:
+                break
+            self.run_frame(batch)
+        self.wall = time.perf_counter() - start
+        return self.report()
+
+    # scenarios: each yields one list of events per frame, forever
+    def random_play(self, steps=12, frames_per_drag=6):
+        """Drag random set dominoes into the working area, move placed ones, sometimes clear"""
+        game = self.game
+        while True:
+            roll = self.random.random()
+            if roll < 0.05:
+                yield [self.down(game.clear_button_rect.center), self.up(game.clear_button_rect.center)]
+            elif roll < 0.3 and game.working_area_dominos:
+                domino = self.random.choice(list(game.working_area_dominos))
+                yield from self.drag(domino, self.drop_point(), steps, frames_per_drag)
+            else:
+                domino = self.random.choice(game.dominos)
+                yield from self.drag(domino, self.drop_point(), steps, frames_per_drag)
+            yield []
+
+    def solver_guided(self, steps=12, frames_per_drag=6):
+        """Play the hint service's next domino each move, clearing on dead ends"""
+        game = self.game
+        while True:
+            index = game.hints.hint(game.tiles, game.working_area_dominos.state)
+            if index is None:
+                yield [self.down(game.clear_button_rect.center), self.up(game.clear_button_rect.center)]
+                continue
+            end = (game.screen_width - 40, game.working_area_y + 60)
+            yield from self.drag(game.dominos[index], end, steps, frames_per_drag)
+            yield []
+
+    def motion_flood(self, per_frame=500):
+        """One endless drag with hundreds of motion events per frame, like a very high polling rate mouse"""
+        game = self.game
+        while True:
+            domino = self.random.choice(game.dominos)
+            start = (domino.x + 10, domino.y + 10)
+            yield [self.down(start)]
+            for i in range(20):
+                yield [self.motion((self.random.randrange(game.screen_width), self.random.randrange(game.screen_height)))
+                       for j in range(per_frame)]
+            yield [self.up(self.drop_point())]
+
+    def churn(self, per_frame=20):
+        """Rapid drag and drop: many complete pick-up/drop cycles every frame"""
+        game = self.game
+        while True:
+            batch = []
+            for i in range(per_frame):
+                if game.working_area_dominos and self.random.random() < 0.5:
+                    domino = self.random.choice(list(game.working_area_dominos))
+                else:
+                    domino = self.random.choice(game.dominos)
+                start = (domino.x + 10, domino.y + 10)
+                end = self.drop_point()
+                batch += [self.down(start), self.motion(end), self.up(end)]
+            yield batch
+
+    def report(self):
+        frame_ms = [t * 1000 for t in self.frame_times]
+        event_us = [t * 1e6 for t in self.event_times]
+        budget = 1000 / self.game.fps
+        over = sum(1 for t in frame_ms if t > budget)
+        return (f"{self.frames} frames, {self.events} events in {self.wall:.2f}s "
+                f"({self.events / max(self.wall, 1e-9):.0f} events/s), {self.wins} wins\n"
+                f"  event handling us: p50={percentile(event_us, 0.5):.1f} p99={percentile(event_us, 0.99):.1f} "
+                f"max={max(event_us, default=0):.1f}\n"
+                f"  frame ms: p50={percentile(frame_ms, 0.5):.2f} p99={percentile(frame_ms, 0.99):.2f} "
+                f"max={max(frame_ms, default=0):.2f}, {over} of {len(frame_ms)} over the {budget:.1f}ms budget")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the game with synthetic mouse input and time it")
+    parser.add_argument('--scenario', choices=['random', 'solver', 'flood', 'churn', 'all'], default='all')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--motion-per-frame', type=int, default=500, help="motion events per frame in the flood scenario")
+    parser.add_argument('--drops-per-frame', type=int, default=20, help="drag/drop cycles per frame in the churn scenario")
+    parser.add_argument('--redraw', choices=['dirty', 'full'], default='dirty')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--window', action='store_true', help="open a real window instead of SDL's dummy video driver")
+    parser.add_argument('--profile', action='store_true', help="also print per-phase frame times for each scenario")
+    args = parser.parse_args()
+
+    if not args.window:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from game import Game
+
+    game = Game(redraw_mode=args.redraw, seed=args.seed, profile=args.profile)
+    game.verbose = False
+    game.update_highlights()
+    names = ['random', 'solver', 'flood', 'churn'] if args.scenario == 'all' else [args.scenario]
+    for name in names:
+        bot = InputBot(game, seed=args.seed)
+        scenario = {
+            'random': bot.random_play,
+            'solver': bot.solver_guided,
+            'flood': lambda: bot.motion_flood(args.motion_per_frame),
+            'churn': lambda: bot.churn(args.drops_per_frame),
+        }[name]()
+        print(f"{name} ({args.redraw} redraw): {bot.run(scenario, args.frames)}")
+        if args.profile:
+            print(game.profiler.report())
+            game.profiler = FrameProfiler()
+    game.close()
+
+
+if __name__ == '__main__':
+    main()
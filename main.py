@@ -1,8 +1,47 @@
 # PCP Problem Game
 # COMP 382 - ON1
+import argparse
+import getpass
+import os
+import time
 from game import Game
 import pygame
 
 if __name__ == '__main__':
-    game = Game()
+    parser = argparse.ArgumentParser(description="PCP Problem Game")
+    parser.add_argument('--redraw', choices=['dirty', 'full'], default='dirty',
+                        help="dirty: redraw only changed areas and sleep when idle, full: redraw every frame")
+    parser.add_argument('--redraw-stats', action='store_true',
+                        help="print CPU usage and frame draw times on exit (compare --redraw modes)")
+    parser.add_argument('--seed', type=int, default=None, help="seed for reproducible domino sets")
+    parser.add_argument('--profile', action='store_true',
+                        help="record per-phase frame times (F3 shows them) and print a summary on exit")
+    parser.add_argument('--profile-trace', default=None, metavar='PATH',
+                        help="profile and write the frame trace here on exit (.csv, or a Chrome trace .json)")
+    parser.add_argument('--record', default=None, metavar='PATH',
+                        help="session log for replay.py (default: a new file in sessions/)")
+    parser.add_argument('--no-record', action='store_true', help="don't record the session")
+    parser.add_argument('--scores', default=None, metavar='PATH',
+                        help="SQLite score store for wins (default: scores.db next to the game)")
+    parser.add_argument('--no-scores', action='store_true', help="don't save scores")
+    parser.add_argument('--server', default=None, metavar='HOST:PORT',
+                        help="play the daily puzzles from a puzzle server (falls back to local sets when it's down)")
+    parser.add_argument('--player', default=getpass.getuser(), help="name on the server's rankings")
+    args = parser.parse_args()
+
+    record = None
+    if not args.no_record:
+        record = args.record
+        if record is None:
+            sessions = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions")
+            os.makedirs(sessions, exist_ok=True)
+            record = os.path.join(sessions, time.strftime("session-%Y%m%d-%H%M%S.pcprec"))
+
+    scores = None
+    if not args.no_scores:
+        scores = args.scores or os.path.join(os.path.dirname(os.path.abspath(__file__)), "scores.db")
+
+    game = Game(redraw_mode=args.redraw, show_redraw_stats=args.redraw_stats, seed=args.seed,
+                profile=args.profile, profile_trace=args.profile_trace, record=record, scores=scores,
+                server=args.server, player=args.player)
     game.run()
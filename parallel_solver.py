@@ -0,0 +1,258 @@
+import multiprocessing
+import struct
+import time
+import zlib
+from solver import SolverResult, encode_pairs, step, START_STATE
+
+# how many states a worker expands between checks of the cancel flag and global budget
+CHECK_EVERY = 512
+
+_record_header = struct.Struct('<HH')
+_tile = struct.Struct('<H')
+
+
+def encode_state(state):
+    """Pack an overhang state as one side byte followed by the overhang"""
+    return (b'\x01' if state[0] else b'\x00') + state[1]
+
+
+def decode_state(data):
+    return (data[0] == 1, data[1:])
+
+
+def shard_of(encoded, shards):
+    # crc32 rather than hash() so every process agrees on the owner
+    return zlib.crc32(encoded) % shards
+
+
+def unpack_records(blob):
+    pos = 0
+    end = len(blob)
+    while pos < end:
+        state_len, parent_len = _record_header.unpack_from(blob, pos)
+        pos += _record_header.size
+        state = blob[pos:pos + state_len]
+        pos += state_len
+        parent = blob[pos:pos + parent_len]
+        pos += parent_len
+        tile, = _tile.unpack_from(blob, pos)
+        pos += _tile.size
+        yield state, parent, tile
+
+
+def _worker(index, shards, conn, inboxes, cancel, explored, budget):
+    """Owns one shard of the visited-state table and expands the states it owns
+
+    Successors for other shards go straight into their owners' inbox
+    queues, tagged with the solve and level they belong to; only counts and
+    a found solution go back to the coordinator.
+    """
+    # exiting must not wait for peers to read what this worker sent last
+    for inbox in inboxes:
+        inbox.cancel_join_thread()
+    inbox = inboxes[index]
+    pairs = []
+    parents = {}
+    solve_id = 0
+    # (level) -> blobs that arrived from peers ahead of this worker reaching that level
+    early = {}
+    own = b''
+    while True:
+        message = conn.recv()
+        command = message[0]
+        if command == 'stop':
+            return
+        if command == 'reset':
+            pairs, solve_id = message[1], message[2]
+            parents = {}
+            early = {}
+            own = b''
+            if shard_of(encode_state(START_STATE), shards) == index:
+                parents[encode_state(START_STATE)] = None
+            conn.send(('ok',))
+        elif command == 'parent':
+            conn.send(('parent', parents.get(message[1])))
+        elif command == 'expand':
+            level, seed_start = message[1], message[2]
+            blobs = [own] + early.pop(level, [])
+            # every peer sends exactly one blob per level after the first
+            while level > 1 and len(blobs) < shards:
+                sender_solve, sender_level, blob = inbox.get()
+                if sender_solve != solve_id:
+                    # left over from a solve that stopped early
+                    continue
+                if sender_level == level:
+                    blobs.append(blob)
+                else:
+                    early.setdefault(sender_level, []).append(blob)
+            count, found, buckets = _expand(b''.join(blobs), seed_start, pairs, parents, shards, cancel, explored, budget)
+            for shard, bucket in enumerate(buckets):
+                if shard != index:
+                    inboxes[shard].put((solve_id, level + 1, bucket))
+            own = buckets[index]
+            conn.send(('level', count, found, sum(len(bucket) for bucket in buckets)))
+
+
+def _expand(blob, seed_start, pairs, parents, shards, cancel, explored, budget):
+    # dedupe the incoming candidates against this shard's visited table
+    frontier = []
+    if seed_start:
+        frontier.append(encode_state(START_STATE))
+    for state, parent, tile in unpack_records(blob):
+        if state not in parents:
+            parents[state] = (parent, tile)
+            frontier.append(state)
+
+    # successors are packed straight into one bytearray per owning shard
+    buckets = [bytearray() for i in range(shards)]
+    header = _record_header.pack
+    tile_bytes = [_tile.pack(i) for i in range(len(pairs))]
+    found = None
+    count = 0
+    pending = 0
+    for encoded in frontier:
+        if pending >= CHECK_EVERY:
+            with explored.get_lock():
+                explored.value += pending
+                total = explored.value
+            pending = 0
+            if cancel.is_set() or total >= budget.value:
+                break
+        count += 1
+        pending += 1
+        state = decode_state(encoded)
+        for i, (top, bottom) in enumerate(pairs):
+            new_state = step(state, top, bottom)
+            if new_state is None:
+                continue
+            if not new_state[1]:
+                found = (encoded, i)
+                break
+            new_encoded = encode_state(new_state)
+            bucket = buckets[shard_of(new_encoded, shards) if shards > 1 else 0]
+            bucket += header(len(new_encoded), len(encoded))
+            bucket += new_encoded
+            bucket += encoded
+            bucket += tile_bytes[i]
+        if found:
+            break
+    with explored.get_lock():
+        explored.value += pending
+    return count, found, [bytes(bucket) for bucket in buckets]
+
+class ParallelSolver:
+    """Level-synchronous breadth-first search split across worker processes
+
+    Each worker owns the states whose crc32 falls in its shard and keeps its
+    own visited table. After every level each worker sends the successors it
+    generated, packed as bytes per owning shard, straight to the owners'
+    inbox queues; the coordinator only sees counts, so no single process
+    carries the whole frontier. Workers stop early when cancel() is called
+    or the shared explored-state counter reaches max_states.
+    """
+
+    def __init__(self, workers=None, max_depth=20, max_states=200000):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.max_depth = max_depth
+        self.max_states = max_states
+        self.processes = []
+        self.connections = []
+        self.cancel_event = None
+        self.explored = None
+        self.budget = None
+        # bumped per solve, so workers can drop blobs left over from an earlier one
+        self.solve_id = 0
+
+    def start(self):
+        """Start the worker pool (done automatically by solve)"""
+        if self.processes:
+            return
+        context = multiprocessing.get_context()
+        self.cancel_event = context.Event()
+        self.explored = context.Value('q', 0)
+        self.budget = context.Value('q', 0)
+        inboxes = [context.Queue() for i in range(self.workers)]
+        for i in range(self.workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(target=_worker,
+                                      args=(i, self.workers, child_conn, inboxes, self.cancel_event,
+                                            self.explored, self.budget),
+                                      daemon=True)
+            process.start()
+            self.processes.append(process)
+            self.connections.append(parent_conn)
+
+    def close(self):
+        for conn in self.connections:
+            conn.send(('stop',))
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        self.connections = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def cancel(self):
+        """Ask a running solve to stop (safe to call from another thread)"""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+
+    def solve(self, dominos):
+        self.start()
+        start_time = time.perf_counter()
+        self.cancel_event.clear()
+        self.explored.value = 0
+        self.budget.value = self.max_states
+        pairs = encode_pairs(dominos)
+        self.solve_id += 1
+        for conn in self.connections:
+            conn.send(('reset', pairs, self.solve_id))
+        for conn in self.connections:
+            conn.recv()
+
+        start_owner = shard_of(encode_state(START_STATE), self.workers)
+        depth = 0
+        # only a level with no successors at all proves there is no solution
+        exhausted = False
+        while depth < self.max_depth:
+            depth += 1
+            for i, conn in enumerate(self.connections):
+                conn.send(('expand', depth, depth == 1 and i == start_owner))
+            replies = [conn.recv() for conn in self.connections]
+
+            found = next((reply[2] for reply in replies if reply[2]), None)
+            if found:
+                solution = self._rebuild(found)
+                return SolverResult("solved", solution, self.explored.value, depth,
+                                    time.perf_counter() - start_time)
+            if self.cancel_event.is_set() or self.explored.value >= self.max_states:
+                break
+            # the workers have already sent their successors to each other
+            if not sum(reply[3] for reply in replies):
+                exhausted = True
+                break
+
+        status = "unsolvable" if exhausted else "unknown"
+        return SolverResult(status, None, self.explored.value, depth,
+                            time.perf_counter() - start_time)
+
+    def _rebuild(self, found):
+        # walk the parent links back to the start, asking each state's owner
+        encoded, tile = found
+        path = [tile]
+        while True:
+            conn = self.connections[shard_of(encoded, self.workers)]
+            conn.send(('parent', encoded))
+            link = conn.recv()[1]
+            if link is None:
+                break
+            encoded, tile = link
+            path.append(tile)
+        path.reverse()
+        return path
+
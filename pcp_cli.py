@@ -0,0 +1,288 @@
+# Command-line PCP pipeline: solves puzzle sets streamed as JSONL, or generates them
+# usage: python pcp_cli.py solve [sets.jsonl ...] [-o results.jsonl] [--workers N]
+#        python pcp_cli.py generate --count 1000 [--level 1] [--random] | python pcp_cli.py solve
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from analysis import prefilter
+from calibrate import load_levels, CALIBRATION_FILE
+from canonical import canonical_form
+from generator import PuzzleGenerator
+from solver import Solver
+from tiles import Tile, TileSampler, encode_colors, encode_tiles
+
+
+def parse_tiles(data):
+    """Tiles from a JSON puzzle set
+
+    A set is a list of tiles (or an object with one under "tiles"); a tile
+    is {"top": ..., "bottom": ...} or a [top, bottom] pair, and a side is a
+    list of colour names or of colour codes.
+    """
+    if isinstance(data, dict):
+        data = data["tiles"]
+    tiles = []
+    for tile in data:
+        sides = (tile["top"], tile["bottom"]) if isinstance(tile, dict) else tile
+        if len(sides) != 2:
+            raise ValueError("a tile needs a top and a bottom")
+        tiles.append(Tile(*(encode_colors(side) if side and isinstance(side[0], str) else bytes(side) for side in sides)))
+    if not tiles:
+        raise ValueError("empty set")
+    return tiles
+
+
+# stages, run lazily one item at a time; an item is a result dict that each stage fills in
+
+def parsed(lines):
+    for number, line in lines:
+        result = {"line": number}
+        if not line.strip():
+            # still gets a result, so resuming counts the line as done
+            result["status"] = "skipped"
+            yield result
+            continue
+        try:
+            data = json.loads(line.decode())
+            if isinstance(data, dict) and "id" in data:
+                result["id"] = data["id"]
+            result["tiles"] = parse_tiles(data)
+        except (ValueError, KeyError, TypeError, IndexError) as error:
+            # a line that isn't UTF-8 lands here too (UnicodeDecodeError is a ValueError)
+            result.update(status="error", error=str(error) or type(error).__name__)
+        yield result
+
+
+def prefiltered(results):
+    for result in results:
+        if "status" not in result:
+            start = time.perf_counter()
+            rejection = prefilter(result["tiles"])
+            result["ms"] = (time.perf_counter() - start) * 1000
+            if rejection is not None:
+                result.update(status="unsolvable", solution=None, rejected=rejection.rule, reason=rejection.reason)
+        yield result
+
+
+def solved(results, solver):
+    for result in results:
+        if "status" not in result:
+            outcome = solver.solve(result["tiles"])
+            result.update(status=outcome.status, solution=outcome.solution, states=outcome.states_explored,
+                          depth=outcome.max_depth)
+            result["ms"] += outcome.elapsed * 1000
+        yield result
+
+
+def canonicalized(results):
+    for result in results:
+        if "tiles" in result:
+            form = canonical_form(result.pop("tiles"))
+            result["canonical_id"] = form.id
+            if result.get("solution"):
+                result["canonical_solution"] = form.to_canonical(result["solution"])
+        yield result
+
+
+def solve_batch(lines, max_depth, max_states):
+    """Run a batch of (line number, JSON line as bytes) through every stage; returns the output lines"""
+    solver = Solver(max_depth=max_depth, max_states=max_states, prefilter=False)
+    results = canonicalized(solved(prefiltered(parsed(lines)), solver))
+    return [json.dumps(result, separators=(",", ":")) for result in results]
+
+
+def read_lines(paths):
+    """(line number, line) over every input in turn, "-" being stdin; numbers run on across files
+
+    Lines are bytes, decoded one at a time by parsed(), so a line that
+    isn't UTF-8 gets an error result instead of ending the run. Blank lines
+    come through too (parsed() marks them skipped), so numbers match the
+    input and every line gets a result.
+    """
+    number = 0
+    for path in paths:
+        f = sys.stdin.buffer if path == "-" else open(path, "rb")
+        try:
+            for line in f:
+                number += 1
+                yield number, line
+        finally:
+            if f is not sys.stdin.buffer:
+                f.close()
+
+
+class Done:
+    """Line numbers already solved, held as a watermark plus the few done out of order past it
+
+    Results arrive out of order but at most the in-flight work apart, so
+    the set past the watermark stays small however long the input is.
+    """
+
+    def __init__(self):
+        # every line up to and including watermark is done
+        self.watermark = 0
+        self.ahead = set()
+
+    def add(self, number):
+        if number <= self.watermark:
+            return
+        self.ahead.add(number)
+        while self.watermark + 1 in self.ahead:
+            self.watermark += 1
+            self.ahead.remove(self.watermark)
+
+    def __contains__(self, number):
+        return number <= self.watermark or number in self.ahead
+
+    def __len__(self):
+        return self.watermark + len(self.ahead)
+
+
+def resume(path):
+    """Lines an earlier run already wrote to path; a last line cut off mid-write is removed"""
+    done = Done()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as f:
+        end = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            done.add(json.loads(line)["line"])
+            end += len(line)
+        f.truncate(end)
+    return done
+
+
+def batches(lines, size):
+    batch = []
+    for item in lines:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_pipeline(lines, out, workers, batch_size=32, in_flight=None, max_depth=40, max_states=200000):
+    """Solve every (number, line) and write the results to out as they finish; returns how many
+
+    With more than one worker, batches go to a process pool, at most
+    in_flight of them at a time: the input is only read as fast as
+    results come back, so memory stays flat on any input size. Results
+    are written in the order they finish, not the input order.
+    """
+    written = 0
+    if workers <= 1:
+        for batch in batches(lines, batch_size):
+            for line in solve_batch(batch, max_depth, max_states):
+                out.write(line + "\n")
+            out.flush()
+            written += len(batch)
+        return written
+
+    in_flight = in_flight or workers * 4
+    with ProcessPoolExecutor(workers, initializer=_ignore_interrupts) as pool:
+        pending = set()
+        source = batches(lines, batch_size)
+        try:
+            while True:
+                for batch in source:
+                    pending.add(pool.submit(solve_batch, batch, max_depth, max_states))
+                    if len(pending) >= in_flight:
+                        break
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    results = future.result()
+                    out.write("\n".join(results) + "\n")
+                    written += len(results)
+                out.flush()
+        except BaseException:
+            # don't start queued batches; results already written stay valid for resuming
+            for future in pending:
+                future.cancel()
+            raise
+    return written
+
+
+def _ignore_interrupts():
+    # Ctrl-C is the parent's to handle: it stops handing out batches and lets the running ones finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def generate_sets(count, level, seed, random_sets=False, levels=None):
+    """count puzzle sets as JSON objects: planted-solution sets for the level, or plain random ones
+
+    levels is a calibrated level table (see calibrate.py), None for the built-in levels.
+    """
+    rng = random.Random(seed)
+    generator = PuzzleGenerator(seed=seed, levels=levels)
+    sampler = TileSampler(*generator.square_range((level, level)))
+    for i in range(count):
+        if random_sets:
+            yield {"id": i, "tiles": encode_tiles(sampler.sample(10, rng))}
+        else:
+            tiles, solution = generator.generate((level, level), rng)
+            yield {"id": i, "tiles": encode_tiles(tiles)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve PCP sets streamed as JSONL, or generate sets to solve")
+    commands = parser.add_subparsers(dest='command', required=True)
+    solve = commands.add_parser('solve', help="pre-filter, solve and canonicalize each set, one JSON result per line")
+    solve.add_argument('inputs', nargs='*', default=['-'], help="JSONL files, - for stdin (the default)")
+    solve.add_argument('-o', '--output', default=None,
+                       help="append results here, skipping lines an earlier run already solved (default: stdout)")
+    solve.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    solve.add_argument('--batch', type=int, default=32, help="sets per task sent to a worker")
+    solve.add_argument('--in-flight', type=int, default=None, help="most batches queued or running (default: 4 per worker)")
+    solve.add_argument('--max-depth', type=int, default=40)
+    solve.add_argument('--max-states', type=int, default=200000, help="search budget per set")
+    generate = commands.add_parser('generate', help="write puzzle sets as JSONL")
+    generate.add_argument('--count', type=int, default=100)
+    generate.add_argument('--level', type=int, default=0)
+    generate.add_argument('--seed', type=int, default=None)
+    generate.add_argument('--random', action='store_true', help="plain random sets instead of planted solutions")
+    generate.add_argument('--calibration', default=os.path.join(os.path.dirname(__file__), CALIBRATION_FILE),
+                          help="level table the level refers to (default: the one the game loads)")
+    generate.add_argument('--builtin-levels', action='store_true', help="use the built-in levels, not the calibration")
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        # the same levels the game plays
+        levels = None if args.builtin_levels else load_levels(args.calibration)
+        for puzzle in generate_sets(args.count, args.level, args.seed, args.random, levels):
+            sys.stdout.write(json.dumps(puzzle, separators=(",", ":")) + "\n")
+        return
+
+    done = Done()
+    out = sys.stdout
+    if args.output:
+        done = resume(args.output)
+        out = open(args.output, "a")
+    lines = ((number, line) for number, line in read_lines(args.inputs) if number not in done)
+    start = time.perf_counter()
+    try:
+        written = run_pipeline(lines, out, args.workers, args.batch, args.in_flight, args.max_depth, args.max_states)
+    except KeyboardInterrupt:
+        print("\ninterrupted; run again with the same -o to carry on", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    skipped = f", {len(done)} already done" if len(done) else ""
+    print(f"{written} sets in {elapsed:.2f}s ({written / max(elapsed, 1e-9):.0f}/s){skipped}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# Per-phase frame timings, for finding which part of a frame is slow
+# usage: python profiler.py trace.csv  (summarise a trace exported with --profile-trace)
+import argparse
+import csv
+import json
+import time
+from collections import deque
+
+# phases of a frame, in the order they usually run
+EVENTS, UPDATE, HIGHLIGHTS, DRAW, SEQUENCES, DOMINOS, PRESENT = range(7)
+PHASE_NAMES = ("events", "update", "highlights", "draw", "sequences", "dominos", "present")
+
+
+def percentile(values, fraction):
+    values = sorted(values) or [0.0]
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class FrameProfiler:
+    """Per-phase time of each frame, the last capacity frames kept in a ring buffer
+
+    The frame loop calls begin_frame(), then switch(phase) whenever the work
+    moves to another phase, then end_frame(). Time between two switches is
+    added to the phase that was running, so a phase that runs inside
+    another (highlights during event handling) is counted once, in itself:
+    switch() returns the phase it left, to switch back to afterwards.
+    """
+
+    enabled = True
+
+    def __init__(self, capacity=600):
+        # each frame: (start time, total seconds, seconds per phase...)
+        self.frames = deque(maxlen=capacity)
+        # frames ever ended, including ones the buffer has dropped
+        self.count = 0
+        self.times = [0.0] * len(PHASE_NAMES)
+        self.phase = EVENTS
+        self.start = self.last = 0.0
+        self.clock_start = time.time() - time.perf_counter()
+
+    def begin_frame(self, phase=EVENTS):
+        self.times = [0.0] * len(PHASE_NAMES)
+        self.phase = phase
+        self.start = self.last = time.perf_counter()
+
+    def switch(self, phase):
+        now = time.perf_counter()
+        self.times[self.phase] += now - self.last
+        self.last = now
+        previous, self.phase = self.phase, phase
+        return previous
+
+    def end_frame(self):
+        now = time.perf_counter()
+        self.times[self.phase] += now - self.last
+        self.frames.append((self.start, now - self.start, *self.times))
+        self.count += 1
+
+    def __len__(self):
+        return len(self.frames)
+
+    def summary(self):
+        """{name: (p50 ms, p99 ms)} for the whole frame ("frame") and each phase"""
+        frames = list(self.frames)
+        columns = [("frame", 1)] + [(name, i + 2) for i, name in enumerate(PHASE_NAMES)]
+        return {name: (1000 * percentile([f[column] for f in frames], 0.5),
+                       1000 * percentile([f[column] for f in frames], 0.99)) for name, column in columns}
+
+    def report(self):
+        lines = [f"{len(self.frames)} frames, ms per phase:"]
+        for name, (p50, p99) in self.summary().items():
+            lines.append(f"  {name:11s} p50={p50:7.3f} p99={p99:7.3f}")
+        return "\n".join(lines)
+
+    def export(self, path):
+        """Write the buffered frames: .csv gets one row per frame, anything else a Chrome trace
+
+        The Chrome trace (chrome://tracing, Perfetto) has one complete event
+        per frame and a counter track with the per-phase ms stacked.
+        """
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["start", "frame_ms"] + [f"{name}_ms" for name in PHASE_NAMES])
+                for start, total, *times in self.frames:
+                    writer.writerow([f"{self.clock_start + start:.6f}", f"{1000 * total:.4f}"]
+                                    + [f"{1000 * t:.4f}" for t in times])
+            return
+        events = []
+        for start, total, *times in self.frames:
+            ts = (self.clock_start + start) * 1e6
+            events.append({"name": "frame", "ph": "X", "ts": ts, "dur": total * 1e6, "pid": 1, "tid": 1})
+            events.append({"name": "phases", "ph": "C", "ts": ts, "pid": 1,
+                           "args": {name: round(1000 * t, 4) for name, t in zip(PHASE_NAMES, times)}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+class NullProfiler:
+    """Stands in for FrameProfiler when profiling is off; every call does nothing"""
+
+    enabled = False
+    count = 0
+
+    def begin_frame(self, phase=EVENTS):
+        pass
+
+    def switch(self, phase):
+        return phase
+
+    def end_frame(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a frame trace exported as CSV")
+    parser.add_argument('trace')
+    args = parser.parse_args()
+
+    profiler = FrameProfiler(capacity=None)
+    with open(args.trace, newline="") as f:
+        for row in csv.DictReader(f):
+            profiler.frames.append((float(row["start"]), float(row["frame_ms"]) / 1000,
+                                    *(float(row[f"{name}_ms"]) / 1000 for name in PHASE_NAMES)))
+    print(profiler.report())
+
+
+if __name__ == '__main__':
+    main()
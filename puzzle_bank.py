@@ -0,0 +1,357 @@
+# Precomputed puzzle bank
+# usage: python puzzle_bank.py build puzzles.bank --difficulty 0 1 2 --count 1000 [--calibration calibration.json]
+#        python puzzle_bank.py info puzzles.bank
+#        python puzzle_bank.py verify puzzles.bank
+import argparse
+import bisect
+import mmap
+import os
+import random
+import struct
+import sys
+from array import array
+from batch_verify import verify_each
+from calibrate import levels_id, load_levels, CALIBRATION_FILE
+from canonical import canonical_form, random_variant, tiles_id
+from generator import PuzzleGenerator
+from solver import Solver
+from tiles import Tile
+
+BANK_MAGIC = b'PCPBANK1'
+INDEX_MAGIC = b'PCPINDX1'
+# magic, version, set size, max squares per side, max solution length,
+# the level table the difficulties refer to (calibrate.levels_id, 0 for the built-in levels), record count
+_bank_header = struct.Struct('<8sHBBBxHQ')
+# difficulty level, solution length, tile count, flags, states explored by the solver
+_record_meta = struct.Struct('<BBBBI')
+# magic, directory entries, record count the index was built for
+_index_header = struct.Struct('<8sIQ')
+# difficulty level, solution length, first slot in the record table, record count
+_index_entry = struct.Struct('<BBxxII')
+# records checked per batch by verify_bank
+VERIFY_CHUNK = 10000
+
+
+def pack_colors(codes, size):
+    """Pack colour codes (2 bits each) 4 to a byte into exactly size bytes"""
+    packed = bytearray(size)
+    for i, code in enumerate(codes):
+        packed[i >> 2] |= code << ((i & 3) * 2)
+    return bytes(packed)
+
+
+def unpack_colors(data, length):
+    return bytes((data[i >> 2] >> ((i & 3) * 2)) & 3 for i in range(length))
+
+
+class BankFormat:
+    """Fixed record layout shared by the reader and the builder"""
+
+    def __init__(self, set_size=10, max_side=12, max_solution=32):
+        self.set_size = set_size
+        self.max_side = max_side
+        self.max_solution = max_solution
+        self.side_bytes = (max_side + 3) // 4
+        self.tile_size = 2 + 2 * self.side_bytes
+        self.record_size = _record_meta.size + set_size * self.tile_size + max_solution
+
+    def pack(self, tiles, solution, difficulty, states_explored):
+        if len(tiles) != self.set_size:
+            raise ValueError(f"bank holds sets of {self.set_size} dominoes, got {len(tiles)}")
+        if len(solution) > self.max_solution:
+            raise ValueError(f"solution longer than {self.max_solution}")
+        parts = [_record_meta.pack(difficulty, len(solution), len(tiles), 0,
+                                   min(states_explored, 0xFFFFFFFF))]
+        for top, bottom in tiles:
+            if len(top) > self.max_side or len(bottom) > self.max_side:
+                raise ValueError(f"domino side longer than {self.max_side} squares")
+            parts.append(bytes((len(top), len(bottom))))
+            parts.append(pack_colors(top, self.side_bytes))
+            parts.append(pack_colors(bottom, self.side_bytes))
+        parts.append(bytes(solution).ljust(self.max_solution, b'\xff'))
+        return b''.join(parts)
+
+    def unpack(self, data, offset):
+        """Returns a BankPuzzle for the record starting at offset"""
+        difficulty, solution_len, count, flags, states = _record_meta.unpack_from(data, offset)
+        pos = offset + _record_meta.size
+        tiles = []
+        for i in range(count):
+            top_len, bottom_len = data[pos], data[pos + 1]
+            top_start = pos + 2
+            bottom_start = top_start + self.side_bytes
+            tiles.append(Tile(unpack_colors(data[top_start:bottom_start], top_len),
+                              unpack_colors(data[bottom_start:bottom_start + self.side_bytes], bottom_len)))
+            pos += self.tile_size
+        pos = offset + self.record_size - self.max_solution
+        solution = list(data[pos:pos + solution_len])
+        return BankPuzzle(tiles, solution, difficulty, states)
+
+
+class BankPuzzle:
+    def __init__(self, tiles, solution, difficulty, states_explored):
+        self.tiles = tiles
+        self.solution = solution
+        self.difficulty = difficulty
+        # hardness: states the solver explored to prove the solution minimal
+        self.states_explored = states_explored
+
+
+class PuzzleBank:
+    """Read-only view of a bank file and its index, both memory-mapped
+
+    Nothing is loaded up front besides the index directory (one entry per
+    difficulty/solution-length pair), so opening a bank of millions of
+    puzzles is instant and sampling is a couple of lookups into the maps.
+    Records are stored in canonical form (see canonical.py); sample() hands
+    out a random equivalent variant, so each record stands for up to 24 sets.
+    """
+
+    def __init__(self, path, levels_id=None):
+        """levels_id, if given, is the level table (calibrate.levels_id) the bank has to be built for"""
+        self.path = path
+        self.bank_file = open(path, 'rb')
+        self.bank = mmap.mmap(self.bank_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, set_size, max_side, max_solution, self.levels_id, self.count = _bank_header.unpack_from(
+            self.bank, 0)
+        if magic != BANK_MAGIC:
+            raise ValueError(f"{path} is not a puzzle bank")
+        if levels_id is not None and levels_id != self.levels_id:
+            raise ValueError(f"{path} was built for other difficulty levels, rebuild it with the current calibration")
+        self.format = BankFormat(set_size, max_side, max_solution)
+
+        self.index_file = open(path + '.idx', 'rb')
+        self.index = mmap.mmap(self.index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, entries, indexed = _index_header.unpack_from(self.index, 0)
+        if magic != INDEX_MAGIC or indexed != self.count:
+            raise ValueError(f"{path}.idx is missing or out of date, rebuild it with the builder")
+        self.table_offset = _index_header.size + entries * _index_entry.size
+
+        # (difficulty, solution length) -> (start, count); per difficulty cumulative counts for sampling
+        self.directory = {}
+        self.levels = {}
+        for i in range(entries):
+            difficulty, length, start, count = _index_entry.unpack_from(
+                self.index, _index_header.size + i * _index_entry.size)
+            self.directory[(difficulty, length)] = (start, count)
+            keys, totals = self.levels.setdefault(difficulty, ([], []))
+            keys.append(length)
+            totals.append((totals[-1] if totals else 0) + count)
+
+    @classmethod
+    def open_if_exists(cls, path, levels_id=None):
+        if not os.path.exists(path) or not os.path.exists(path + '.idx'):
+            return None
+        try:
+            return cls(path, levels_id)
+        except ValueError as error:
+            print(f"Puzzle bank not used: {error}")
+            return None
+
+    def close(self):
+        self.bank.close()
+        self.index.close()
+        self.bank_file.close()
+        self.index_file.close()
+
+    def has(self, difficulty, solution_length=None):
+        if solution_length is None:
+            return difficulty in self.levels
+        return (difficulty, solution_length) in self.directory
+
+    def get(self, record):
+        return self.format.unpack(self.bank, _bank_header.size + record * self.format.record_size)
+
+    def sample(self, difficulty, solution_length=None, rng=random):
+        """Random puzzle for a difficulty level (and optionally an exact solution length)
+
+        The stored puzzle gets a random colour relabelling, top/bottom swap,
+        reversal and tile order.
+        """
+        if solution_length is None:
+            keys, totals = self.levels[difficulty]
+            pick = rng.randrange(totals[-1])
+            slot = bisect.bisect_right(totals, pick)
+            start, count = self.directory[(difficulty, keys[slot])]
+            offset = pick - (totals[slot - 1] if slot else 0)
+        else:
+            start, count = self.directory[(difficulty, solution_length)]
+            offset = rng.randrange(count)
+        record, = struct.unpack_from('<I', self.index, self.table_offset + 4 * (start + offset))
+        puzzle = self.get(record)
+        puzzle.tiles, puzzle.solution = random_variant(puzzle.tiles, puzzle.solution, rng)
+        return puzzle
+
+
+def create_bank(path, bank_format, levels_id=0):
+    with open(path, 'wb') as f:
+        f.write(_bank_header.pack(BANK_MAGIC, 1, bank_format.set_size, bank_format.max_side,
+                                  bank_format.max_solution, levels_id, 0))
+
+
+def append_puzzles(path, puzzles, levels_id=None):
+    """Append (tiles, solution, difficulty, states_explored) tuples and bump the record count
+
+    levels_id, if given, has to match the level table the bank was created for.
+    """
+    with open(path, 'r+b') as f:
+        magic, version, set_size, max_side, max_solution, levels, count = _bank_header.unpack(
+            f.read(_bank_header.size))
+        if levels_id is not None and levels_id != levels:
+            raise ValueError(f"{path} was built for other difficulty levels")
+        bank_format = BankFormat(set_size, max_side, max_solution)
+        f.seek(_bank_header.size + count * bank_format.record_size)
+        for tiles, solution, difficulty, states in puzzles:
+            f.write(bank_format.pack(tiles, solution, difficulty, states))
+            count += 1
+        f.seek(0)
+        f.write(_bank_header.pack(magic, version, set_size, max_side, max_solution, levels, count))
+    return count
+
+
+def bank_ids(path):
+    """Canonical IDs of the puzzles already in a bank
+
+    Records are stored in canonical form, so each ID is just the hash of the
+    record's tiles, read through a memory map one record at a time.
+    """
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, set_size, max_side, max_solution, levels, count = _bank_header.unpack_from(data, 0)
+        bank_format = BankFormat(set_size, max_side, max_solution)
+        ids = {tiles_id(bank_format.unpack(data, _bank_header.size + record * bank_format.record_size).tiles)
+               for record in range(count)}
+        data.close()
+    return ids
+
+
+def verify_bank(path, chunk=VERIFY_CHUNK):
+    """Record numbers whose stored solution doesn't solve their tiles
+
+    Records are read and checked chunk at a time, one batch each, so memory
+    stays flat however big the bank is.
+    """
+    bank = PuzzleBank(path)
+    bad = []
+    for start in range(0, bank.count, chunk):
+        puzzles = [bank.get(record) for record in range(start, min(start + chunk, bank.count))]
+        results = verify_each([puzzle.tiles for puzzle in puzzles], [puzzle.solution for puzzle in puzzles])
+        bad += [start + i for i, ok in enumerate(results) if not ok]
+    bank.close()
+    return bad
+
+
+def build_index(path):
+    """Rebuild the difficulty/solution-length index with a counting sort over the records"""
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, set_size, max_side, max_solution, levels, count = _bank_header.unpack_from(data, 0)
+        record_size = BankFormat(set_size, max_side, max_solution).record_size
+        keys = array('H', bytes(2 * count))
+        counts = {}
+        for record in range(count):
+            offset = _bank_header.size + record * record_size
+            key = data[offset] << 8 | data[offset + 1]
+            keys[record] = key
+            counts[key] = counts.get(key, 0) + 1
+        data.close()
+
+    starts = {}
+    position = 0
+    for key in sorted(counts):
+        starts[key] = position
+        position += counts[key]
+    table = array('I', bytes(4 * count))
+    fill = dict(starts)
+    for record, key in enumerate(keys):
+        table[fill[key]] = record
+        fill[key] += 1
+
+    with open(path + '.idx', 'wb') as f:
+        f.write(_index_header.pack(INDEX_MAGIC, len(counts), count))
+        for key in sorted(counts):
+            f.write(_index_entry.pack(key >> 8, key & 0xFF, starts[key], counts[key]))
+        if sys.byteorder == 'big':
+            table.byteswap()
+        table.tofile(f)
+    return counts
+
+
+def generate_puzzles(difficulties, count, seed, seen=None, max_duplicates=1000, levels=None):
+    """count new puzzles per level in canonical form, skipping sets equivalent to one in seen
+
+    seen is a set of canonical IDs and is updated as puzzles are made.
+    levels is a calibrated level table (see calibrate.py), None for the
+    built-in levels.
+    """
+    generator = PuzzleGenerator(seed=seed, levels=levels)
+    seen = set() if seen is None else seen
+    for level in difficulties:
+        difficulty = (level, level)
+        made = duplicates = 0
+        while made < count:
+            tiles, solution = generator.generate(difficulty)
+            form = canonical_form(tiles)
+            if form.id in seen:
+                # an equivalent set is already banked, don't spend a re-solve on it
+                duplicates += 1
+                if duplicates > max_duplicates:
+                    print(f"difficulty {level}: stopping after {made} puzzles, "
+                          f"too many equivalent sets ({duplicates})")
+                    break
+                continue
+            seen.add(form.id)
+            made += 1
+            tiles = list(form.tiles)
+            solution = form.to_canonical(solution)
+            # re-solve to the known depth to record how much search the set takes
+            states = Solver(max_depth=len(solution), max_states=10 ** 7, prefilter=False).solve(tiles).states_explored
+            yield tiles, solution, level, states
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect a puzzle bank")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="generate puzzles and append them to a bank")
+    build.add_argument('path')
+    build.add_argument('--difficulty', type=int, nargs='+', default=[0, 1, 2])
+    build.add_argument('--count', type=int, default=100, help="puzzles per difficulty level")
+    build.add_argument('--seed', type=int, default=None)
+    build.add_argument('--calibration', default=os.path.join(os.path.dirname(__file__), CALIBRATION_FILE),
+                       help="level table the difficulties refer to (default: the one the game loads)")
+    build.add_argument('--builtin-levels', action='store_true', help="use the built-in levels, not the calibration")
+    info = commands.add_parser('info', help="show how many puzzles each index key holds")
+    info.add_argument('path')
+    verify = commands.add_parser('verify', help="check every stored solution against its tiles")
+    verify.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        # filed under the same levels the game plays, so it can use them
+        levels = None if args.builtin_levels else load_levels(args.calibration)
+        if not os.path.exists(args.path):
+            create_bank(args.path, BankFormat(), levels_id(levels))
+        seen = bank_ids(args.path)
+        try:
+            total = append_puzzles(args.path, generate_puzzles(args.difficulty, args.count, args.seed, seen,
+                                                               levels=levels), levels_id(levels))
+        except ValueError as error:
+            sys.exit(f"{error}; build a new bank or pass the levels it was built with")
+        build_index(args.path)
+        print(f"{args.path}: {total} puzzles")
+    elif args.command == 'verify':
+        bad = verify_bank(args.path)
+        print(f"{args.path}: {len(bad)} puzzles with a wrong solution" + (f" (records {bad[:20]})" if bad else ""))
+        if bad:
+            sys.exit(1)
+    else:
+        bank = PuzzleBank(args.path)
+        print(f"{args.path}: {bank.count} puzzles, {bank.format.record_size} bytes each, "
+              + (f"calibrated levels {bank.levels_id:04x}" if bank.levels_id else "built-in levels"))
+        for (difficulty, length), (start, count) in sorted(bank.directory.items()):
+            print(f"  difficulty {difficulty}, solution length {length}: {count}")
+        bank.close()
+
+
+if __name__ == '__main__':
+    main()
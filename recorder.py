@@ -0,0 +1,258 @@
+import queue
+import struct
+import threading
+from domino import Domino
+from tiles import Tile
+
+# file layout: MAGIC, then records; each record is a type byte and its fields,
+# integers as LEB128 varints (zigzag for signed ones)
+MAGIC = b'PCPREC02'
+# the first format, still readable: TICK timings were whole microseconds
+MAGIC_V1 = b'PCPREC01'
+
+# START: clock time (float64), game mode, timed difficulty, generation mode, Domino.difficulty
+START = 1
+# SET: Domino.difficulty, tile count, then per tile: top length, bottom length, the codes
+SET = 2
+# TICK: ms the clock moved, delta_time (both float64, exact so timers replay to the bit),
+# number of frames in a row with these two values
+TICK = 3
+# input at x, y stored as the change from the previous input's position
+DOWN, UP, MOTION = 4, 5, 6
+# OUTCOME: outcome, seconds (float64)
+OUTCOME = 7
+# END: timer value, time remaining (float64, NaN for None)
+END = 8
+
+GAME_MODES = ("classic", "timed")
+TIMED_DIFFICULTIES = ("easy", "medium", "hard")
+GENERATION_MODES = ("solvable", "random")
+OUTCOMES = ("win", "timeout")
+# handle_input kinds, in record type order
+INPUT_KINDS = ("down", "up", "motion")
+
+_float = struct.Struct('<d')
+_timing = struct.Struct('<dd')
+
+
+def write_varint(out, value):
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def write_signed(out, value):
+    write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def read_signed(data, pos):
+    value, pos = read_varint(data, pos)
+    return (value >> 1) ^ -(value & 1), pos
+
+
+class SessionRecorder:
+    """Appends a session's records to a file: the tile sets, every input and each frame's timing
+
+    Records go into an in-memory buffer; full buffers are handed to a
+    writer thread, so the frame loop never waits on the disk. Frames with
+    no input and the same timing are run-length coded into one TICK, so
+    an idle minute costs a few bytes.
+    """
+
+    def __init__(self, path, buffer_size=4096):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.buffer = bytearray(MAGIC)
+        # (clock us, delta us) of the frames counted in run, not written yet
+        self.run_timing = None
+        self.run = 0
+        self.x = self.y = 0
+        self.chunks = queue.Queue()
+        self.file = open(path, 'wb')
+        self.thread = threading.Thread(target=self._write, name="session-recorder", daemon=True)
+        self.thread.start()
+
+    def start(self, engine):
+        """START and the first SET, from a freshly built engine"""
+        out = self.buffer
+        out.append(START)
+        out += _float.pack(engine.clock.now())
+        out.append(GAME_MODES.index(engine.game_mode))
+        out.append(TIMED_DIFFICULTIES.index(engine.timed_difficulty))
+        out.append(GENERATION_MODES.index(engine.generation_mode))
+        self._difficulty(Domino.difficulty)
+        self.tiles(engine.tiles, Domino.difficulty)
+
+    def tiles(self, tiles, difficulty):
+        out = self._record(SET)
+        self._difficulty(difficulty)
+        write_varint(out, len(tiles))
+        for top, bottom in tiles:
+            out.append(len(top))
+            out.append(len(bottom))
+            out += top
+            out += bottom
+
+    def _difficulty(self, difficulty):
+        write_signed(self.buffer, difficulty[0])
+        write_signed(self.buffer, difficulty[1])
+
+    def frame(self, clock_ms, delta_time):
+        timing = (clock_ms, delta_time)
+        if timing != self.run_timing:
+            self._flush_run()
+            self.run_timing = timing
+        self.run += 1
+
+    def input(self, kind, pos):
+        out = self._record(DOWN + INPUT_KINDS.index(kind))
+        write_signed(out, pos[0] - self.x)
+        write_signed(out, pos[1] - self.y)
+        self.x, self.y = pos[0], pos[1]
+
+    def outcome(self, outcome, seconds):
+        out = self._record(OUTCOME)
+        out.append(OUTCOMES.index(outcome))
+        out += _float.pack(seconds)
+
+    def close(self, engine):
+        """END with the final timer values, then write out everything and close the file"""
+        out = self._record(END)
+        out += _float.pack(engine.get_current_time())
+        out += _float.pack(float('nan') if engine.time_remaining is None else engine.time_remaining)
+        self._hand_off()
+        self.chunks.put(None)
+        self.thread.join()
+        self.file.close()
+
+    def _flush_run(self):
+        if self.run:
+            out = self.buffer
+            out.append(TICK)
+            out += _timing.pack(*self.run_timing)
+            write_varint(out, self.run)
+            self.run = 0
+            if len(out) >= self.buffer_size:
+                self._hand_off()
+
+    def _record(self, kind):
+        # any other record ends the current run of frames: it happened in the run's last frame
+        self._flush_run()
+        self.buffer.append(kind)
+        return self.buffer
+
+    def _hand_off(self):
+        self._flush_run()
+        if self.buffer:
+            self.chunks.put(bytes(self.buffer))
+            self.buffer = bytearray()
+
+    def _write(self):
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None:
+                self.file.flush()
+                return
+            self.file.write(chunk)
+            self.file.flush()
+
+
+class NullRecorder:
+    """Stands in for SessionRecorder when nothing is recorded"""
+
+    def start(self, engine):
+        pass
+
+    def tiles(self, tiles, difficulty):
+        pass
+
+    def frame(self, clock_ms, delta_time):
+        pass
+
+    def input(self, kind, pos):
+        pass
+
+    def outcome(self, outcome, seconds):
+        pass
+
+    def close(self, engine):
+        pass
+
+
+def read_records(data):
+    """(type, fields) for each complete record in a session log; a cut-off last record is dropped
+
+    TICK fields are (ms the clock moved, delta_time, frame count) in either format.
+    """
+    version = data[:len(MAGIC)]
+    if version not in (MAGIC, MAGIC_V1):
+        raise ValueError("not a session recording")
+    pos = len(MAGIC)
+    x = y = 0
+    while pos < len(data):
+        start = pos
+        try:
+            kind = data[pos]
+            pos += 1
+            if kind == START:
+                clock, = _float.unpack_from(data, pos)
+                pos += _float.size
+                modes = (GAME_MODES[data[pos]], TIMED_DIFFICULTIES[data[pos + 1]], GENERATION_MODES[data[pos + 2]])
+                low, pos = read_signed(data, pos + 3)
+                high, pos = read_signed(data, pos)
+                fields = (clock, *modes, (low, high))
+            elif kind == SET:
+                low, pos = read_signed(data, pos)
+                high, pos = read_signed(data, pos)
+                count, pos = read_varint(data, pos)
+                tiles = []
+                for i in range(count):
+                    top_len, bottom_len = data[pos], data[pos + 1]
+                    pos += 2
+                    top, bottom = data[pos:pos + top_len], data[pos + top_len:pos + top_len + bottom_len]
+                    pos += top_len + bottom_len
+                    if len(bottom) != bottom_len:
+                        raise IndexError
+                    tiles.append(Tile(bytes(top), bytes(bottom)))
+                fields = ((low, high), tiles)
+            elif kind == TICK and version == MAGIC_V1:
+                clock_us, pos = read_varint(data, pos)
+                delta_us, pos = read_varint(data, pos)
+                count, pos = read_varint(data, pos)
+                fields = (clock_us / 1000, delta_us / 1e6, count)
+            elif kind == TICK:
+                clock_ms, delta_time = _timing.unpack_from(data, pos)
+                count, pos = read_varint(data, pos + _timing.size)
+                fields = (clock_ms, delta_time, count)
+            elif kind in (DOWN, UP, MOTION):
+                dx, pos = read_signed(data, pos)
+                dy, pos = read_signed(data, pos)
+                x, y = x + dx, y + dy
+                fields = (INPUT_KINDS[kind - DOWN], (x, y))
+            elif kind == OUTCOME:
+                outcome = OUTCOMES[data[pos]]
+                seconds, = _float.unpack_from(data, pos + 1)
+                pos += 1 + _float.size
+                fields = (outcome, seconds)
+            elif kind == END:
+                current, remaining = struct.unpack_from('<dd', data, pos)
+                pos += 2 * _float.size
+                fields = (current, None if remaining != remaining else remaining)
+            else:
+                raise ValueError(f"unknown record type {kind} at byte {start}")
+        except (IndexError, struct.error):
+            # the session ended mid-write
+            return
+        yield kind, fields
@@ -0,0 +1,71 @@
+import time
+from collections import deque
+import pygame
+
+
+class RedrawScheduler:
+    """Tracks which parts of the screen changed since the last frame
+
+    In "dirty" mode only the marked rectangles are redrawn (with the screen
+    clipped to them) and pushed with display.update(rects); when nothing is
+    marked the frame is skipped. "full" mode redraws and flips everything
+    every frame, like the original loop, for comparison.
+    """
+
+    def __init__(self, screen_rect, mode="dirty"):
+        self.screen_rect = pygame.Rect(screen_rect)
+        self.mode = mode
+        self.rects = []
+        self.full = True
+
+        # comparison stats
+        self.frames = 0
+        self.drawn = 0
+        self.idle_waits = 0
+        self.draw_times = deque(maxlen=10000)
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    def mark(self, rect):
+        """Mark a screen area as changed"""
+        if not self.full:
+            rect = self.screen_rect.clip(rect)
+            if rect.width and rect.height:
+                self.rects.append(rect)
+
+    def mark_all(self):
+        self.full = True
+        self.rects = []
+
+    def pending(self):
+        return self.full or bool(self.rects) or self.mode == "full"
+
+    def take(self):
+        """Rects to redraw this frame ([] if nothing, None for the whole screen)"""
+        self.frames += 1
+        if self.full or self.mode == "full":
+            rects = None
+        else:
+            rects = self.rects
+        self.full = False
+        self.rects = []
+        return rects
+
+    def present(self, rects, draw_time):
+        """Push the finished frame to the display"""
+        self.drawn += 1
+        self.draw_times.append(draw_time)
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+    def report(self):
+        """Frame time / CPU usage summary for comparing redraw modes"""
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        times = sorted(self.draw_times) or [0.0]
+        return (f"redraw={self.mode} loops={self.frames} drawn={self.drawn} idle_waits={self.idle_waits} "
+                f"cpu={100 * cpu / max(wall, 1e-9):.1f}% "
+                f"draw_ms p50={1000 * times[len(times) // 2]:.2f} "
+                f"p99={1000 * times[min(len(times) - 1, int(len(times) * 0.99))]:.2f}")
@@ -0,0 +1,122 @@
+import pygame
+from domino import Domino
+
+# room around a domino surface for the highlight border
+BORDER = 4
+# rendered texts / sequence strips kept before the cache is flushed
+MAX_CACHED = 256
+
+
+class RenderCache:
+    """Keeps everything that is expensive to draw as ready-made Surfaces
+
+    Fonts are loaded once, texts and sequence strips are rendered once per
+    distinct value, and each (tile, highlighted) pair is drawn once and then
+    blitted, so a frame costs one blit per object however many squares it has.
+    """
+
+    def __init__(self):
+        self.fonts = {}
+        self.texts = {}
+        self.domino_surfaces = {}
+        self.strips = {}
+        self.panels = {}
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    def text(self, text, size, color):
+        """Rendered text surface, re-rendered only when the text/colour is new"""
+        key = (text, size, color)
+        surface = self.texts.get(key)
+        if surface is None:
+            if len(self.texts) >= MAX_CACHED:
+                self.texts.clear()
+            surface = self.texts[key] = self.font(size).render(text, True, color)
+        return surface
+
+    def domino(self, tile, highlighted, hinted=False):
+        """Surface for a tile, BORDER pixels bigger than the domino on each side"""
+        key = (tile, highlighted, hinted)
+        surface = self.domino_surfaces.get(key)
+        if surface is None:
+            if len(self.domino_surfaces) >= MAX_CACHED:
+                self.domino_surfaces.clear()
+            surface = self.domino_surfaces[key] = self._render_domino(tile, highlighted, hinted)
+        return surface
+
+    def draw_domino(self, surface, domino, highlighted=None):
+        if highlighted is None:
+            highlighted = domino.highlighted
+        surface.blit(self.domino(domino.tile, highlighted, domino.hinted), (domino.x - BORDER, domino.y - BORDER))
+
+    def _render_domino(self, tile, highlighted, hinted):
+        width, height = Domino.width, Domino.height
+        surface = pygame.Surface((width + 2 * BORDER, height + 2 * BORDER), pygame.SRCALPHA)
+        x = y = BORDER
+        square_size = 10
+        spacing = 5
+
+        #draw domino base w/ border (highlight if this is a valid next domino)
+        if highlighted:
+            # Draw glowing yellow border for highlighted dominoes
+            pygame.draw.rect(surface, (255, 255, 0), (x - 4, y - 4, width + 8, height + 8))
+            pygame.draw.rect(surface, (255, 255, 0), (x - 2, y - 2, width + 4, height + 4))
+        if hinted:
+            # cyan border for the hint's suggested domino
+            pygame.draw.rect(surface, (0, 255, 255), (x - 4, y - 4, width + 8, height + 8))
+
+        pygame.draw.rect(surface, (255, 255, 255), (x, y, width, height))
+        pygame.draw.rect(surface, (0, 0, 0), (x, y, width, height), 2)
+        pygame.draw.line(surface, (0, 0, 0), (x, y + height / 2), (x + width, y + height / 2), 3)
+
+        for half, squares in enumerate(tile):
+            n = len(squares)
+            if n == 0:
+                continue
+            y_offset = y + half * (height / 2) + (height / 4 - square_size / 2)
+            total_width = n * square_size + (n - 1) * spacing
+            start_x = x + (width - total_width) / 2
+
+            for i, color in enumerate(squares):
+                rect_x = start_x + i * (square_size + spacing)
+                pygame.draw.rect(surface, Domino.palette[color], (rect_x, y_offset, square_size, square_size))
+        return self._convert(surface, alpha=True)
+
+    def sequence_strip(self, sequence, square_size, spacing):
+        """One surface holding a whole concatenated sequence as bordered squares"""
+        key = (sequence, square_size, spacing)
+        surface = self.strips.get(key)
+        if surface is None:
+            if len(self.strips) >= MAX_CACHED:
+                self.strips.clear()
+            width = max(1, len(sequence) * (square_size + spacing))
+            surface = pygame.Surface((width, square_size), pygame.SRCALPHA)
+            for i, color in enumerate(sequence):
+                x = i * (square_size + spacing)
+                pygame.draw.rect(surface, Domino.palette[color], (x, 0, square_size, square_size))
+                pygame.draw.rect(surface, (0, 0, 0), (x, 0, square_size, square_size), 2)
+            surface = self.strips[key] = self._convert(surface, alpha=True)
+        return surface
+
+    def panel(self, key, build):
+        """Cached surface made by build() the first time key is asked for"""
+        surface = self.panels.get(key)
+        if surface is None:
+            surface = self.panels[key] = build()
+        return surface
+
+    def clear(self):
+        self.texts.clear()
+        self.domino_surfaces.clear()
+        self.strips.clear()
+        self.panels.clear()
+
+    def _convert(self, surface, alpha=False):
+        # match the display's pixel format for fast blits, once a display exists
+        if pygame.display.get_surface() is None:
+            return surface
+        return surface.convert_alpha() if alpha else surface.convert()
@@ -0,0 +1,149 @@
+# Replays recorded sessions headlessly and checks they come out the same
+# usage: python replay.py session.pcprec [more.pcprec ...] [--info]
+import argparse
+import sys
+import time
+from collections import deque
+from domino import Domino
+from engine import GameEngine, SimulatedClock
+from recorder import read_records, START, SET, TICK, DOWN, UP, MOTION, OUTCOME, END
+
+
+class ReplayEngine(GameEngine):
+    """A headless engine whose tile sets come from the recording instead of the generator"""
+
+    def __init__(self, sets, clock):
+        self.sets = deque(sets)
+        self.outcomes = []
+        # index of the frame being replayed
+        self.frame = -1
+        super().__init__(clock=clock, background_jobs=False)
+
+    def generate_tiles(self):
+        if not self.sets:
+            raise ValueError("recording has fewer tile sets than the replay asked for")
+        difficulty, tiles = self.sets.popleft()
+        Domino.difficulty = difficulty
+        self.known_solution = None
+        return tiles
+
+    def check_solvable(self):
+        # the check only fills in messages, and would solve every set inline
+        pass
+
+    def game_over(self, outcome, seconds):
+        self.outcomes.append((self.frame, outcome, seconds))
+
+
+class ReplayResult:
+    """What the recording says happened next to what the replay did"""
+
+    def __init__(self, frames, inputs, recorded_seconds, elapsed, expected, outcomes, expected_end, end):
+        self.frames = frames
+        self.inputs = inputs
+        self.recorded_seconds = recorded_seconds
+        self.elapsed = elapsed
+        # (frame, outcome, seconds) from the log and from the replay
+        self.expected = expected
+        self.outcomes = outcomes
+        # (timer value, time remaining) at the end of the session, None if the log was cut off
+        self.expected_end = expected_end
+        self.end = end
+
+    @property
+    def matched(self):
+        return self.expected == self.outcomes and (self.expected_end is None or self.expected_end == self.end)
+
+    def __repr__(self):
+        speed = self.recorded_seconds / max(self.elapsed, 1e-9)
+        return (f"ReplayResult(matched={self.matched}, frames={self.frames}, inputs={self.inputs}, "
+                f"outcomes={len(self.outcomes)}, {self.recorded_seconds:.1f}s replayed in {self.elapsed:.3f}s ({speed:.0f}x))")
+
+
+def replay(path):
+    """Run a recording through a ReplayEngine, as fast as it goes
+
+    Each recorded frame moves the simulated clock by what the real clock
+    moved and runs update() with the recorded delta_time; the frame's
+    input follows through handle_input, the order Game.run and
+    GameEngine.tick() both use.
+    """
+    with open(path, 'rb') as f:
+        records = list(read_records(f.read()))
+    if not records or records[0][0] != START:
+        raise ValueError(f"{path}: recording has no START record")
+    clock_start, game_mode, timed_difficulty, generation_mode, difficulty = records[0][1]
+
+    started = time.perf_counter()
+    Domino.difficulty = difficulty
+    clock = SimulatedClock(start=clock_start)
+    engine = ReplayEngine([fields for kind, fields in records if kind == SET], clock)
+    engine.game_mode = game_mode
+    engine.timed_difficulty = timed_difficulty
+    engine.generation_mode = generation_mode
+
+    expected = []
+    expected_end = None
+    inputs = 0
+    recorded_seconds = 0.0
+    for kind, fields in records[1:]:
+        if kind == TICK:
+            clock_ms, delta_time, count = fields
+            for i in range(count):
+                engine.frame += 1
+                clock.advance(clock_ms / 1000)
+                recorded_seconds += clock_ms / 1000
+                engine.delta_time = delta_time
+                engine.update(engine.delta_time)
+        elif kind in (DOWN, UP, MOTION):
+            engine.handle_input(*fields)
+            inputs += 1
+        elif kind == OUTCOME:
+            expected.append((engine.frame, *fields))
+        elif kind == END:
+            expected_end = fields
+    end = (engine.get_current_time(), engine.time_remaining)
+    engine.close()
+    return ReplayResult(engine.frame + 1, inputs, recorded_seconds, time.perf_counter() - started,
+                        expected, engine.outcomes, expected_end, end)
+
+
+def info(path):
+    """Counts of each kind of record, and the recording's size"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    counts = {}
+    frames = 0
+    for kind, fields in read_records(data):
+        counts[kind] = counts.get(kind, 0) + 1
+        if kind == TICK:
+            frames += fields[2]
+    names = {START: "start", SET: "sets", TICK: "tick runs", DOWN: "down", UP: "up", MOTION: "motion",
+             OUTCOME: "outcomes", END: "end"}
+    return (f"{path}: {len(data)} bytes, {frames} frames, "
+            + ", ".join(f"{counts[kind]} {name}" for kind, name in names.items() if kind in counts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded sessions and check the outcomes and timers match")
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--info', action='store_true', help="only describe the recordings")
+    args = parser.parse_args()
+
+    failed = 0
+    for path in args.paths:
+        if args.info:
+            print(info(path))
+            continue
+        result = replay(path)
+        print(f"{path}: {result}")
+        if not result.matched:
+            failed += 1
+            print(f"  recorded outcomes {result.expected}, end {result.expected_end}")
+            print(f"  replayed outcomes {result.outcomes}, end {result.end}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+# Local score store and leaderboards
+# usage: python scores.py scores.db [--mode easy] [--level 2] [--puzzle ID] [--limit 10]
+import argparse
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from canonical import canonical_id
+
+# leaderboard modes: classic, or the timed difficulty
+MODES = ("classic", "easy", "medium", "hard")
+
+Score = namedtuple('Score', ['mode', 'level', 'puzzle', 'seconds', 'finished'])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    mode TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    puzzle TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    finished REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_by_mode ON scores (mode, seconds);
+CREATE INDEX IF NOT EXISTS scores_by_level ON scores (level, seconds);
+CREATE INDEX IF NOT EXISTS scores_by_puzzle ON scores (puzzle, seconds);
+"""
+
+
+class ScoreStore:
+    """SQLite table of wins, one connection (use it from one thread)
+
+    The database runs in WAL mode, so leaderboard reads don't wait for
+    the writer. Each leaderboard (by mode, by Domino.difficulty level, by
+    puzzle ID) has an index on (key, seconds): the top N is read straight
+    off the index, however many rows there are.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # with WAL, NORMAL only syncs at checkpoints; a crash can lose the last batches, never corrupt
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        # 64 MB page cache: inserts touch three indexes at random places
+        self.db.execute("PRAGMA cache_size=-65536")
+        self.db.executescript(SCHEMA)
+
+    def add_many(self, scores):
+        """Insert Scores in one transaction"""
+        with self.db:
+            self.db.executemany("INSERT INTO scores (mode, level, puzzle, seconds, finished) VALUES (?, ?, ?, ?, ?)",
+                                scores)
+
+    def top(self, mode=None, level=None, puzzle=None, limit=10):
+        """Fastest wins, optionally only for one mode, level and/or puzzle"""
+        where, params = [], []
+        for column, value in (("mode", mode), ("level", level), ("puzzle", puzzle)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT mode, level, puzzle, seconds, finished FROM scores"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY seconds LIMIT ?"
+        return [Score(*row) for row in self.db.execute(sql, params + [limit])]
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+
+class ScoreWriter:
+    """Takes scores from the game loop and writes them in batches on a background thread
+
+    submit() only puts the score on a queue, so a slow disk never holds up
+    a frame. The thread waits for a score, then takes everything else
+    already queued (up to batch_size) and inserts it all in one
+    transaction; under load batches grow by themselves. Puzzle IDs are
+    worked out on the thread too.
+    """
+
+    def __init__(self, path, batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.written = 0
+        self.batches = 0
+        self.error = None
+        # create the table before returning, so readers can open the file straight away
+        ScoreStore(path).close()
+        self.thread = threading.Thread(target=self._run, name="score-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, mode, level, puzzle, seconds):
+        """Queue a win; puzzle is a canonical ID or the tile set"""
+        self.queue.put((mode, level, puzzle, seconds, time.time()))
+
+    def flush(self):
+        """Wait until everything submitted so far is written"""
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        try:
+            store = ScoreStore(self.path)
+        except Exception as error:
+            # nothing gets written, but flush() and close() must still return
+            store, self.error = None, error
+        while True:
+            item = self.queue.get()
+            batch = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch and store is not None:
+                # anything escaping here would end the thread and leave flush() waiting forever
+                try:
+                    store.add_many([Score(mode, level, puzzle if isinstance(puzzle, str) else canonical_id(puzzle),
+                                          seconds, finished)
+                                    for mode, level, puzzle, seconds, finished in batch])
+                    self.written += len(batch)
+                    self.batches += 1
+                except Exception as error:
+                    self.error = error
+            for i in batch:
+                self.queue.task_done()
+            if item is None:
+                self.queue.task_done()
+                if store is not None:
+                    store.close()
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show a leaderboard from the score store")
+    parser.add_argument('path')
+    parser.add_argument('--mode', choices=MODES, default=None)
+    parser.add_argument('--level', type=int, default=None)
+    parser.add_argument('--puzzle', default=None, help="canonical puzzle ID")
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    store = ScoreStore(args.path)
+    print(f"{store.count()} scores")
+    for rank, score in enumerate(store.top(args.mode, args.level, args.puzzle, args.limit), 1):
+        print(f"{rank:3d}. {score.seconds:8.2f}s  {score.mode:8s} level {score.level}  puzzle {score.puzzle}  "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(score.finished))}")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
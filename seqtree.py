@@ -0,0 +1,212 @@
+import random
+
+# polynomial hashes of colour strings, mod a Mersenne prime; a square with code c counts as c + 1
+MOD = (1 << 61) - 1
+BASE = 1000003
+
+TOP, BOTTOM = 0, 1
+
+
+def string_hash(codes):
+    h = 0
+    for code in codes:
+        h = (h * BASE + code + 1) % MOD
+    return h
+
+
+class _Node:
+    __slots__ = ('left', 'right', 'priority', 'size', 'top', 'bottom',
+                 'own_top_hash', 'own_top_pow', 'own_bottom_hash', 'own_bottom_pow',
+                 'top_length', 'top_hash', 'top_pow', 'bottom_length', 'bottom_hash', 'bottom_pow')
+
+    def __init__(self, top, bottom, priority):
+        self.left = None
+        self.right = None
+        self.priority = priority
+        self.size = 1
+        self.top = top
+        self.bottom = bottom
+        # own_*: this domino alone; the rest: squares, hash and BASE ** squares over the subtree
+        self.own_top_hash = self.top_hash = string_hash(top)
+        self.own_top_pow = self.top_pow = pow(BASE, len(top), MOD)
+        self.own_bottom_hash = self.bottom_hash = string_hash(bottom)
+        self.own_bottom_pow = self.bottom_pow = pow(BASE, len(bottom), MOD)
+        self.top_length = len(top)
+        self.bottom_length = len(bottom)
+
+
+# attribute names for reading one side of a node
+_SIDE_FIELDS = {
+    TOP: ('top', 'top_length', 'top_hash', 'top_pow', 'own_top_hash', 'own_top_pow'),
+    BOTTOM: ('bottom', 'bottom_length', 'bottom_hash', 'bottom_pow', 'own_bottom_hash', 'own_bottom_pow'),
+}
+
+
+def _update(node):
+    # written out for both sides: this runs for every node on every split and merge path
+    left, right = node.left, node.right
+    size = 1
+    top_length, top_hash, top_pow = len(node.top), node.own_top_hash, node.own_top_pow
+    bottom_length, bottom_hash, bottom_pow = len(node.bottom), node.own_bottom_hash, node.own_bottom_pow
+    if left is not None:
+        size += left.size
+        top_length += left.top_length
+        top_hash = (left.top_hash * top_pow + top_hash) % MOD
+        top_pow = left.top_pow * top_pow % MOD
+        bottom_length += left.bottom_length
+        bottom_hash = (left.bottom_hash * bottom_pow + bottom_hash) % MOD
+        bottom_pow = left.bottom_pow * bottom_pow % MOD
+    if right is not None:
+        size += right.size
+        top_length += right.top_length
+        top_hash = (top_hash * right.top_pow + right.top_hash) % MOD
+        top_pow = top_pow * right.top_pow % MOD
+        bottom_length += right.bottom_length
+        bottom_hash = (bottom_hash * right.bottom_pow + right.bottom_hash) % MOD
+        bottom_pow = bottom_pow * right.bottom_pow % MOD
+    node.size = size
+    node.top_length, node.top_hash, node.top_pow = top_length, top_hash, top_pow
+    node.bottom_length, node.bottom_hash, node.bottom_pow = bottom_length, bottom_hash, bottom_pow
+
+
+def _split(node, count):
+    """(first count dominoes, the rest)"""
+    if node is None:
+        return None, None
+    left_size = node.left.size if node.left else 0
+    if count <= left_size:
+        first, node.left = _split(node.left, count)
+        _update(node)
+        return first, node
+    node.right, rest = _split(node.right, count - left_size - 1)
+    _update(node)
+    return node, rest
+
+
+def _merge(first, second):
+    if first is None:
+        return second
+    if second is None:
+        return first
+    if first.priority > second.priority:
+        first.right = _merge(first.right, second)
+        _update(first)
+        return first
+    second.left = _merge(first, second.left)
+    _update(second)
+    return second
+
+
+class SequenceTree:
+    """Dominoes in order, with the hashes of both concatenations kept in a treap
+
+    Each node holds one domino and the length and polynomial hash of its
+    subtree's top and bottom concatenations. Inserting, removing or moving
+    a domino anywhere is a couple of splits and merges, O(log n) expected,
+    and the hashes of whole sides or of any prefix are read off the tree
+    in O(log n) too, without building the concatenations.
+    """
+
+    def __init__(self, pairs=(), seed=None):
+        self.random = random.Random(seed)
+        self.root = None
+        for top, bottom in pairs:
+            self.insert(len(self), top, bottom)
+
+    def __len__(self):
+        return self.root.size if self.root else 0
+
+    def insert(self, index, top, bottom):
+        node = _Node(bytes(top), bytes(bottom), self.random.random())
+        first, rest = _split(self.root, index)
+        self.root = _merge(_merge(first, node), rest)
+
+    def remove(self, index):
+        """Remove the domino at index, returns its (top, bottom)"""
+        if not 0 <= index < len(self):
+            raise IndexError("domino index out of range")
+        first, rest = _split(self.root, index)
+        node, rest = _split(rest, 1)
+        self.root = _merge(first, rest)
+        return node.top, node.bottom
+
+    def move(self, old_index, new_index):
+        top, bottom = self.remove(old_index)
+        self.insert(new_index, top, bottom)
+
+    def clear(self):
+        self.root = None
+
+    def length(self, side):
+        return getattr(self.root, _SIDE_FIELDS[side][1]) if self.root else 0
+
+    def hash(self, side):
+        return getattr(self.root, _SIDE_FIELDS[side][2]) if self.root else 0
+
+    def prefix_hash(self, side, length):
+        """Hash of the first length squares of one side"""
+        own_name, length_name, hash_name, pow_name, own_hash_name, own_pow_name = _SIDE_FIELDS[side]
+        h = 0
+        node = self.root
+        while node is not None and length > 0:
+            left = node.left
+            left_length = getattr(left, length_name) if left else 0
+            if length <= left_length:
+                node = left
+                continue
+            if left:
+                h = (h * getattr(left, pow_name) + getattr(left, hash_name)) % MOD
+                length -= left_length
+            own = getattr(node, own_name)
+            if length <= len(own):
+                return (h * pow(BASE, length, MOD) + string_hash(own[:length])) % MOD
+            h = (h * getattr(node, own_pow_name) + getattr(node, own_hash_name)) % MOD
+            length -= len(own)
+            node = node.right
+        return h
+
+    def squares(self, side, start=0, end=None):
+        """Bytes of one side's concatenation from start to end
+
+        Walks only the dominoes overlapping the range: O(log n) plus one
+        step per domino read.
+        """
+        own_name, length_name = _SIDE_FIELDS[side][:2]
+        if end is None:
+            end = self.length(side)
+        # (node, squares before its own) still to read, the next one last
+        stack = []
+        node, offset = self.root, 0
+        while node is not None:
+            own_start = offset + (getattr(node.left, length_name) if node.left else 0)
+            if start < own_start:
+                stack.append((node, own_start))
+                node = node.left
+                continue
+            own_end = own_start + len(getattr(node, own_name))
+            if start < own_end:
+                stack.append((node, own_start))
+                break
+            node, offset = node.right, own_end
+        pieces = []
+        while stack:
+            node, own_start = stack.pop()
+            if own_start >= end:
+                break
+            own = getattr(node, own_name)
+            pieces.append(own[max(start - own_start, 0):end - own_start])
+            # next come the right subtree's leftmost path
+            offset = own_start + len(own)
+            node = node.right
+            while node is not None:
+                stack.append((node, offset + (getattr(node.left, length_name) if node.left else 0)))
+                node = node.left
+        return b''.join(pieces)
+
+    def hashes_match(self):
+        """Top and bottom have equal length and hash (compare squares to be sure)"""
+        return self.length(TOP) == self.length(BOTTOM) and self.hash(TOP) == self.hash(BOTTOM)
+
+    def matches(self):
+        """Exact top == bottom, comparing squares only when the hashes already agree"""
+        return self.hashes_match() and self.squares(TOP) == self.squares(BOTTOM)
@@ -0,0 +1,395 @@
+# Daily puzzle server: hands out the puzzle of the day, verifies solutions and ranks them
+# usage: python server.py [--host 127.0.0.1] [--port 38200] [--date 2026-01-31]
+#        python server.py --load 2000   (connect that many clients to a running server)
+import argparse
+import asyncio
+import bisect
+import json
+import math
+import os
+import random
+import socket
+import threading
+import time
+import batch_verify
+from calibrate import load_levels, CALIBRATION_FILE
+from generator import PuzzleGenerator
+from profiler import percentile
+from tiles import encode_tiles, decode_tiles
+
+HOST = "127.0.0.1"
+PORT = 38200
+# longest request line the server reads
+LINE_LIMIT = 1 << 16
+# longest solution accepted
+MAX_SOLUTION = 256
+# highest level the server generates puzzles for without a calibrated level table
+MAX_LEVEL = 9
+
+
+def today():
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+def daily_seed(date, level, salt=0):
+    """Seed of the puzzle for a date and level: every server with the same salt hands out the same set"""
+    return (int(date.replace("-", "")) * 100 + level) * 1000003 + salt
+
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+class Leaderboard:
+    """Best time per player on one puzzle, kept sorted so a rank is a binary search"""
+
+    def __init__(self):
+        self.best = {}
+        # (seconds, player), fastest first
+        self.times = []
+        # bumped on every change, so cached top lists know they are stale
+        self.version = 0
+
+    def add(self, player, seconds):
+        """Record a time; returns the player's rank (1 is fastest) by their best time"""
+        old = self.best.get(player)
+        if old is None or seconds < old:
+            if old is not None:
+                del self.times[bisect.bisect_left(self.times, (old, player))]
+            self.best[player] = seconds
+            bisect.insort(self.times, (seconds, player))
+            self.version += 1
+        return bisect.bisect_left(self.times, (self.best[player], player)) + 1
+
+    def top(self, limit):
+        return [[player, seconds] for seconds, player in self.times[:limit]]
+
+
+class Puzzle:
+    """One day's set for one level, with its response already encoded"""
+
+    def __init__(self, date, level, tiles, solution):
+        self.date = date
+        self.level = level
+        self.tiles = tiles
+        # the planted solution: the load test submits it, clients never see it
+        self.solution = solution
+        self.payload = encode({"ok": True, "date": date, "level": level, "tiles": encode_tiles(tiles)})
+        self.leaderboard = Leaderboard()
+        # limit -> (leaderboard version, encoded top list)
+        self.top_cache = {}
+
+
+class PuzzleServer:
+    """Line-delimited JSON over TCP, every connection served by one asyncio loop
+
+    Requests (one JSON object per line, one response line each):
+      {"op": "puzzle", "level": 0}                      today's set for the level
+      {"op": "submit", "date": ..., "level": 0, "player": "ann", "solution": [3, 1, 4], "seconds": 12.5}
+      {"op": "top", "date": ..., "level": 0, "limit": 10}
+      {"op": "stats"}
+    A connection stays open for as many requests as the client likes.
+
+    Puzzles are generated once per date and level (off the loop, in a
+    thread) and their encoded payload reused for every request.
+    Submissions wait on a queue; one task takes everything queued, checks
+    it with batch_verify.verify_many per puzzle (in a thread, so requests
+    keep being read meanwhile) and answers each one, so under load a
+    verification pass covers many submissions.
+    """
+
+    def __init__(self, salt=0, date=None, batch_size=4096, levels=None):
+        self.salt = salt
+        # calibrated level table the puzzles are generated for (see calibrate.py), None for the built-in levels
+        self.levels = levels
+        # past the table's last level the generator would only repeat it
+        self.max_level = max(levels) if levels else MAX_LEVEL
+        # a fixed date instead of the UTC day (for tests and load runs)
+        self.date = date
+        self.batch_size = batch_size
+        # (date, level) -> Future of the Puzzle, so concurrent first requests generate it once
+        self.puzzles = {}
+        self.pending = None
+        self.connections = 0
+        self.peak_connections = 0
+        self.requests = 0
+        self.batches = 0
+        self.verified = 0
+
+    def current_date(self):
+        return self.date or today()
+
+    def puzzle(self, date, level):
+        """Future of the Puzzle for a date and level; only today's are generated on demand"""
+        key = (date, level)
+        future = self.puzzles.get(key)
+        if future is None:
+            if date != self.current_date():
+                raise ValueError(f"no puzzle for {date}")
+            if not 0 <= level <= self.max_level:
+                raise ValueError(f"level must be 0-{self.max_level}")
+            future = asyncio.get_running_loop().run_in_executor(None, self._generate, date, level)
+            self.puzzles[key] = future
+            future.add_done_callback(lambda done: self._forget_failed(key, done))
+        return future
+
+    def _forget_failed(self, key, future):
+        # a generation that failed is tried again by the next request instead of failing for the rest of the day
+        if future.cancelled() or future.exception() is not None:
+            if self.puzzles.get(key) is future:
+                del self.puzzles[key]
+
+    def _generate(self, date, level):
+        seed = daily_seed(date, level, self.salt)
+        tiles, solution = PuzzleGenerator(seed=seed, levels=self.levels).generate((level, level), random.Random(seed))
+        return Puzzle(date, level, tiles, solution)
+
+    async def serve(self, host=HOST, port=PORT, ready=None):
+        self.pending = asyncio.Queue()
+        verifier = asyncio.create_task(self._verify_batches())
+        server = await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT, backlog=4096)
+        if ready is not None:
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            verifier.cancel()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self.peak_connections = max(self.peak_connections, self.connections)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    # line over LINE_LIMIT or the client went away
+                    break
+                if not line:
+                    break
+                self.requests += 1
+                writer.write(await self.respond(line))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def respond(self, line):
+        try:
+            request = json.loads(line)
+            op = request["op"]
+            if op == "puzzle":
+                return (await self.puzzle(request.get("date") or self.current_date(), int(request.get("level", 0)))).payload
+            if op == "submit":
+                return await self.submit(request)
+            if op == "top":
+                puzzle = await self.puzzle(request.get("date") or self.current_date(), int(request.get("level", 0)))
+                limit = max(1, min(100, int(request.get("limit", 10))))
+                cached = puzzle.top_cache.get(limit)
+                if cached is None or cached[0] != puzzle.leaderboard.version:
+                    cached = (puzzle.leaderboard.version,
+                              encode({"ok": True, "players": len(puzzle.leaderboard.best),
+                                      "top": puzzle.leaderboard.top(limit)}))
+                    puzzle.top_cache[limit] = cached
+                return cached[1]
+            if op == "stats":
+                return encode({"ok": True, "connections": self.connections, "peak_connections": self.peak_connections,
+                               "requests": self.requests, "batches": self.batches, "verified": self.verified})
+            raise ValueError(f"unknown op {op!r}")
+        except (ValueError, KeyError, TypeError, RuntimeError) as error:
+            return encode({"ok": False, "error": str(error) or type(error).__name__})
+
+    async def submit(self, request):
+        puzzle = await self.puzzle(request["date"], int(request["level"]))
+        solution = request["solution"]
+        if (not isinstance(solution, list) or not 0 < len(solution) <= MAX_SOLUTION
+                or not all(isinstance(i, int) and 0 <= i < len(puzzle.tiles) for i in solution)):
+            raise ValueError("solution must be a list of tile indices")
+        player = str(request["player"])[:64]
+        seconds = float(request["seconds"])
+        if not math.isfinite(seconds) or seconds < 0:
+            raise ValueError("seconds must be a finite time, not negative")
+        future = asyncio.get_running_loop().create_future()
+        self.pending.put_nowait((puzzle, solution, future))
+        if not await future:
+            return encode({"ok": True, "valid": False})
+        rank = puzzle.leaderboard.add(player, seconds)
+        return encode({"ok": True, "valid": True, "rank": rank, "players": len(puzzle.leaderboard.best)})
+
+    async def _verify_batches(self):
+        while True:
+            batch = [await self.pending.get()]
+            while len(batch) < self.batch_size and not self.pending.empty():
+                batch.append(self.pending.get_nowait())
+            # one verify_many call per puzzle in the batch
+            by_puzzle = {}
+            for item in batch:
+                by_puzzle.setdefault(id(item[0]), []).append(item)
+            loop = asyncio.get_running_loop()
+            for items in by_puzzle.values():
+                try:
+                    results = await loop.run_in_executor(None, batch_verify.verify_many, items[0][0].tiles,
+                                                         [solution for puzzle, solution, future in items])
+                except Exception as error:
+                    # these submissions get an error reply; the verifier carries on with the next puzzle
+                    for puzzle, solution, future in items:
+                        if not future.done():
+                            future.set_exception(RuntimeError(f"verification failed: {error}"))
+                    continue
+                for (puzzle, solution, future), valid in zip(items, results):
+                    if not future.done():
+                        future.set_result(bool(valid))
+            self.batches += 1
+            self.verified += len(batch)
+
+
+class PuzzleClient:
+    """Blocking client for the puzzle server over one persistent connection
+
+    The connection is opened on the first request and kept; if it has
+    dropped, a request reconnects once before giving up with OSError.
+    Requests from different threads take turns on the connection.
+    """
+
+    def __init__(self, host=HOST, port=PORT, timeout=2.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        self.file = None
+        self.lock = threading.Lock()
+
+    def request(self, message):
+        with self.lock:
+            response = json.loads(self._exchange(encode(message)))
+        if not response.get("ok"):
+            raise ValueError(response.get("error"))
+        return response
+
+    def _exchange(self, data):
+        for attempt in (0, 1):
+            try:
+                if self.sock is None:
+                    self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+                    self.file = self.sock.makefile("rwb")
+                self.file.write(data)
+                self.file.flush()
+                line = self.file.readline()
+                if not line:
+                    raise ConnectionError("server closed the connection")
+                return line
+            except OSError:
+                self.close()
+                if attempt:
+                    raise
+
+    def puzzle(self, level):
+        """(date, tiles) of today's puzzle for the level"""
+        response = self.request({"op": "puzzle", "level": level})
+        return response["date"], decode_tiles(response["tiles"])
+
+    def submit(self, date, level, player, solution, seconds):
+        """The server's verdict: {"valid": ..., "rank": ..., "players": ...}"""
+        return self.request({"op": "submit", "date": date, "level": level, "player": player,
+                             "solution": list(solution), "seconds": seconds})
+
+    def top(self, date, level, limit=10):
+        return self.request({"op": "top", "date": date, "level": level, "limit": limit})
+
+    def close(self):
+        if self.sock is not None:
+            self.file.close()
+            self.sock.close()
+            self.sock = self.file = None
+
+
+async def load(host, port, clients, submissions, level, connect_rate=500):
+    """Open clients connections to a running server; each fetches the puzzle and submits, half correctly
+
+    Returns per-request latencies (s) and the elapsed time.
+    """
+    from solver import Solver
+
+    reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+    writer.write(encode({"op": "puzzle", "level": level}))
+    puzzle = json.loads(await reader.readline())
+    writer.close()
+    tiles = decode_tiles(puzzle["tiles"])
+    solution = Solver().solve(tiles).solution
+    latencies = []
+    errors = []
+
+    async def client(n):
+        reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        rng = random.Random(n)
+        try:
+            for i in range(1 + submissions):
+                if i == 0:
+                    message = {"op": "puzzle", "level": level}
+                else:
+                    candidate = solution if rng.random() < 0.5 else [rng.randrange(len(tiles)) for j in range(6)]
+                    message = {"op": "submit", "date": puzzle["date"], "level": level, "player": f"bot{n}",
+                               "solution": candidate, "seconds": rng.uniform(5, 300)}
+                start = time.perf_counter()
+                writer.write(encode(message))
+                response = json.loads(await reader.readline())
+                latencies.append(time.perf_counter() - start)
+                if not response.get("ok"):
+                    errors.append(response)
+                # every client stays connected until they have all connected
+                await all_connected.wait()
+        finally:
+            writer.close()
+
+    all_connected = asyncio.Event()
+    start = time.perf_counter()
+    tasks = []
+    for n in range(clients):
+        tasks.append(asyncio.create_task(client(n)))
+        if n % connect_rate == connect_rate - 1:
+            await asyncio.sleep(0.01)
+    await asyncio.sleep(0)
+    all_connected.set()
+    await asyncio.gather(*tasks)
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the daily puzzle, or load-test a running server")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--date', default=None, help="serve this date's puzzles instead of today's (YYYY-MM-DD)")
+    parser.add_argument('--salt', type=int, default=0, help="changes every daily puzzle")
+    parser.add_argument('--load', type=int, default=None, metavar='CLIENTS',
+                        help="connect this many clients to a running server and time their requests")
+    parser.add_argument('--submissions', type=int, default=3, help="submissions per load-test client")
+    parser.add_argument('--level', type=int, default=0, help="level the load test plays")
+    args = parser.parse_args()
+
+    if args.load:
+        latencies, errors, elapsed = asyncio.run(load(args.host, args.port, args.load, args.submissions, args.level))
+        latencies = [latency * 1000 for latency in latencies]
+        print(f"{args.load} clients, {len(latencies)} requests in {elapsed:.2f}s ({len(latencies) / elapsed:,.0f}/s), "
+              f"latency p50 {percentile(latencies, 0.5):.1f} ms p99 {percentile(latencies, 0.99):.1f} ms, "
+              f"{len(errors)} errors")
+        client = PuzzleClient(args.host, args.port)
+        print(client.request({"op": "stats"}))
+        client.close()
+        return
+
+    # the same levels the game plays
+    server = PuzzleServer(salt=args.salt, date=args.date,
+                          levels=load_levels(os.path.join(os.path.dirname(__file__), CALIBRATION_FILE)))
+    try:
+        asyncio.run(server.serve(args.host, args.port,
+                                 ready=lambda s: print(f"Serving puzzles on {args.host}:{args.port}")))
+    except KeyboardInterrupt:
+        print(f"\n{server.requests} requests, {server.verified} submissions in {server.batches} batches, "
+              f"peak {server.peak_connections} connections")
+
+
+if __name__ == '__main__':
+    main()
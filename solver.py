@@ -0,0 +1,153 @@
+import time
+from collections import deque
+from analysis import prefilter
+
+
+class SolverResult:
+    """Outcome of a bounded search over a domino set"""
+
+    def __init__(self, status, solution, states_explored, max_depth, elapsed, rejection=None):
+        # "solved", "unsolvable" (search space exhausted) or "unknown" (budget hit)
+        self.status = status
+        # list of domino indices, or None
+        self.solution = solution
+        self.states_explored = states_explored
+        self.max_depth = max_depth
+        self.elapsed = elapsed
+        # analysis.Rejection when the pre-filter ruled the set out without searching
+        self.rejection = rejection
+
+    @property
+    def solved(self):
+        return self.status == "solved"
+
+    def __repr__(self):
+        rejected = f", rejected by {self.rejection.rule!r}" if self.rejection else ""
+        return (f"SolverResult(status={self.status!r}, solution={self.solution}, "
+                f"states_explored={self.states_explored}, elapsed={self.elapsed:.4f}s{rejected})")
+
+
+def encode_pairs(pairs):
+    """Turn (top, bottom) colour sequences into (top, bottom) byte strings"""
+    codes = {}
+    encoded = []
+    for top, bottom in pairs:
+        sides = []
+        for seq in (top, bottom):
+            if isinstance(seq, (bytes, bytearray)):
+                sides.append(bytes(seq))
+            else:
+                sides.append(bytes(codes.setdefault(c, len(codes)) for c in seq))
+        encoded.append((sides[0], sides[1]))
+    return encoded
+
+
+def step(state, top, bottom):
+    """Apply one domino to an overhang state, returns the new state or None on mismatch
+
+    A state is (top_ahead, overhang): the unmatched suffix of the longer side.
+    """
+    top_ahead, overhang = state
+    if top_ahead:
+        ahead, behind = overhang + top, bottom
+    else:
+        ahead, behind = overhang + bottom, top
+    if ahead.startswith(behind):
+        if len(ahead) == len(behind):
+            # a full match, whichever side was ahead: (False, b'') would not count as a win
+            return START_STATE
+        return (top_ahead, ahead[len(behind):])
+    if behind.startswith(ahead):
+        return (not top_ahead, behind[len(ahead):])
+    return None
+
+
+def state_after(pairs, sequence):
+    """Overhang state reached by placing the given domino indices in order (None if dead)"""
+    state = START_STATE
+    for i in sequence:
+        state = step(state, pairs[i][0], pairs[i][1])
+        if state is None:
+            return None
+    return state
+
+
+# empty overhang; the side flag is normalised so both empty states are the same
+START_STATE = (True, b'')
+
+# how many states are expanded between checks of the cancelled hook
+CHECK_EVERY = 256
+
+
+class Solver:
+    """Breadth-first search over overhang states, so the first solution found is a shortest one"""
+
+    def __init__(self, max_depth=20, max_states=200000, prefilter=True):
+        self.max_depth = max_depth
+        self.max_states = max_states
+        # rule out sets with analysis.prefilter before searching from the start state
+        self.prefilter = prefilter
+
+    def solve(self, dominos, start=START_STATE, cancelled=None):
+        """Search for a matching sequence
+
+        dominos is a list of Tiles (or any (top, bottom) colour sequences,
+        which get encoded to bytes first). start is the overhang state to
+        search from, e.g. WorkingArea.state for a game in progress; the
+        solution then lists the dominoes still to place. cancelled is an
+        optional callable polled during the search (e.g. Event.is_set from
+        another thread); once it returns True the search stops as "unknown".
+        """
+        start_time = time.perf_counter()
+        pairs = encode_pairs(dominos)
+        if self.prefilter and start == START_STATE:
+            rejection = prefilter(pairs)
+            if rejection is not None:
+                return SolverResult("unsolvable", None, 0, 0, time.perf_counter() - start_time, rejection)
+
+        # parent links for rebuilding the solution: state -> (previous state, domino index)
+        parents = {start: None}
+        frontier = deque([start])
+        depth = 0
+        explored = 0
+        exhausted = True
+
+        while frontier and depth < self.max_depth:
+            depth += 1
+            next_frontier = deque()
+            for state in frontier:
+                explored += 1
+                for i, (top, bottom) in enumerate(pairs):
+                    new_state = step(state, top, bottom)
+                    if new_state is None:
+                        continue
+                    if not new_state[1]:
+                        # empty overhang: top and bottom match
+                        solution = self._rebuild(parents, state) + [i]
+                        return SolverResult("solved", solution, explored, depth,
+                                            time.perf_counter() - start_time)
+                    if new_state not in parents:
+                        parents[new_state] = (state, i)
+                        next_frontier.append(new_state)
+                if explored >= self.max_states:
+                    exhausted = False
+                    break
+                if cancelled is not None and explored % CHECK_EVERY == 0 and cancelled():
+                    exhausted = False
+                    break
+            if not exhausted:
+                break
+            frontier = next_frontier
+
+        if frontier and depth >= self.max_depth:
+            exhausted = False
+        status = "unsolvable" if exhausted else "unknown"
+        return SolverResult(status, None, explored, depth, time.perf_counter() - start_time)
+
+    def _rebuild(self, parents, state):
+        path = []
+        while parents[state] is not None:
+            state, i = parents[state]
+            path.append(i)
+        path.reverse()
+        return path
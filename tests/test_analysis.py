@@ -0,0 +1,59 @@
+import random
+import pytest
+from analysis import RULES, check_colour_balance, prefilter, _pairs
+from generator import PuzzleGenerator
+from solver import Solver
+from tiles import Tile, TileSampler
+
+
+def tiles(*pairs):
+    """Tiles from (top, bottom) pairs of colour code lists"""
+    return [Tile(bytes(top), bytes(bottom)) for top, bottom in pairs]
+
+
+@pytest.mark.parametrize("rule, reason, pairs", [
+    ("no_start", "", [([0, 1], [1, 0]), ([2], [1, 1])]),
+    ("no_end", "", [([0], [0, 1]), ([2, 1], [0, 2])]),
+    ("length", "top", [([0, 0], [0]), ([0, 1], [1])]),
+    ("length", "bottom", [([0], [0, 0]), ([1], [0, 1])]),
+    # only the first domino has a green, only the second a blue: neither can be used
+    ("colour_balance", "", [([0], [0, 1]), ([2, 2], [2])]),
+])
+def test_each_rule_rejects(rule, reason, pairs):
+    rejection = prefilter(tiles(*pairs))
+    assert rejection is not None and rejection.rule == rule and reason in rejection.reason
+    assert not Solver(max_depth=12, prefilter=False).solve(tiles(*pairs)).solved
+
+
+def test_matching_halves_pass_length():
+    # a domino with equal halves is a solution by itself
+    assert prefilter(tiles(([0], [0]), ([1], [0, 1]))) is None
+
+
+def test_colour_balance_accepts_balanced_mix():
+    # neither domino balances green alone, but one of each does: 0 11 over 01 1
+    sample = tiles(([0], [0, 1]), ([1, 1], [1]))
+    assert prefilter(sample) is None
+    assert Solver(prefilter=False).solve(sample).solved
+
+
+def test_rules_accept_planted_sets():
+    for level in range(4):
+        generator = PuzzleGenerator(seed=level)
+        for i in range(10):
+            sample, solution = generator.next_set((level, level))
+            assert check_colour_balance(_pairs(sample)) is None
+            assert all(check(_pairs(sample)) is None for check in RULES.values())
+
+
+def test_rejected_random_sets_are_unsolvable():
+    rng = random.Random(4)
+    sampler = TileSampler(1, 3)
+    solver = Solver(max_depth=12, max_states=20000, prefilter=False)
+    rejected = 0
+    for i in range(200):
+        sample = sampler.sample(4, rng)
+        if prefilter(sample) is not None:
+            rejected += 1
+            assert not solver.solve(sample).solved
+    assert rejected
@@ -0,0 +1,26 @@
+from batch_verify import verify_each, verify_many
+from generator import PuzzleGenerator
+
+
+def solved_set(seed):
+    return PuzzleGenerator(seed=seed).generate((0, 0))
+
+
+def test_verify_many():
+    tiles, solution = solved_set(0)
+    result = verify_many(tiles, [solution, solution[:-1], []])
+    assert [bool(ok) for ok in result] == [True, False, False]
+
+
+def test_verify_each():
+    sets = [solved_set(seed) for seed in range(3)]
+    solutions = [solution for tiles, solution in sets]
+    solutions[1] = solutions[1][:-1]
+    result = verify_each([tiles for tiles, solution in sets], solutions)
+    assert [bool(ok) for ok in result] == [True, False, True]
+
+
+def test_no_candidates():
+    tiles, solution = solved_set(0)
+    assert len(verify_many(tiles, [])) == 0
+    assert len(verify_each([], [])) == 0
@@ -0,0 +1,36 @@
+import os
+import random
+from calibrate import CALIBRATION_FILE, build_levels, load_levels, _follows
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setting(low, high, length, hardness):
+    return {"squares": [low, high], "lengths": [length, length], "hardness": hardness}
+
+
+def rises(levels):
+    return all(_follows(level, previous) for previous, level in zip(levels, levels[1:]))
+
+
+def test_levels_do_not_alternate_square_ranges():
+    # the wider range is a little harder at every length, so picking by hardness alone
+    # would swap between the two ranges from one level to the next
+    summaries = [setting(2, 3, length, length / 2) for length in range(2, 8)]
+    summaries += [setting(1, 3, length, length / 2 + 0.2) for length in range(2, 8)]
+    levels = build_levels(summaries, 6)
+    assert rises(levels)
+    assert [entry["level"] for entry in levels] == list(range(6))
+
+
+def test_levels_rise_for_random_settings():
+    rng = random.Random(3)
+    # longer solutions and smaller dominoes are harder on the whole, with noise on top
+    summaries = [setting(low, high, length, length / 2 - (low + high) / 10 + rng.uniform(-0.3, 0.3))
+                 for low in range(1, 6) for high in range(low + 1, 7) for length in range(2, 8)]
+    assert rises(build_levels(summaries, 12))
+
+
+def test_shipped_table_rises():
+    levels = load_levels(os.path.join(ROOT, CALIBRATION_FILE))
+    assert rises([levels[level] for level in sorted(levels)])
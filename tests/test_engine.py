@@ -0,0 +1,140 @@
+import threading
+import time
+import pytest
+from domino import Domino
+from engine import GameEngine, SimulatedClock, MOUSE_DOWN, MOUSE_MOTION, MOUSE_UP
+
+
+@pytest.fixture
+def make_engine():
+    """Makes GameEngines (seed 5, simulated clock, jobs inline unless overridden); all are closed afterwards
+
+    Domino.difficulty is class-wide, so it is reset before and after too.
+    """
+    Domino.difficulty = (0, 0)
+    engines = []
+
+    def make(**kwargs):
+        engines.append(GameEngine(**dict({"seed": 5, "clock": SimulatedClock(), "background_jobs": False}, **kwargs)))
+        return engines[-1]
+    yield make
+    for engine in engines:
+        engine.close()
+    Domino.difficulty = (0, 0)
+
+
+@pytest.fixture
+def engine(make_engine):
+    return make_engine()
+
+
+@pytest.fixture
+def daily_tiles(make_engine):
+    # another seed's set, so a daily puzzle can be told apart from the local one
+    return make_engine(seed=9).tiles
+
+
+def drop_into_working_area(engine, index):
+    domino = engine.dominos[index]
+    engine.handle_input(MOUSE_DOWN, (domino.x + 5, domino.y + 5))
+    target = (1200, engine.working_area_y + 50)
+    engine.handle_input(MOUSE_MOTION, target)
+    engine.handle_input(MOUSE_UP, target)
+    engine.tick()
+
+
+def test_headless_classic_win_levels_up(engine):
+    assert engine.game_mode == "classic"
+    for index in engine.known_solution:
+        drop_into_working_area(engine, index)
+    # nothing draws a frame here: the drop itself has to record the win
+    assert engine.frameDone
+    assert engine.check_win_condition()
+    engine.new_game()
+    assert Domino.difficulty == (1, 1)
+
+
+def test_new_game_without_win_keeps_level(engine):
+    drop_into_working_area(engine, engine.known_solution[0])
+    engine.new_game()
+    assert Domino.difficulty == (0, 0)
+
+
+class StubServer:
+    """Stands in for a PuzzleClient; fails with OSError while down and ValueError past max_level"""
+
+    def __init__(self, tiles, down=False, max_level=None):
+        self.tiles = tiles
+        self.down = down
+        self.max_level = max_level
+        self.requests = 0
+
+    def puzzle(self, level):
+        self.requests += 1
+        if self.down:
+            raise ConnectionRefusedError("server down")
+        if self.max_level is not None and level > self.max_level:
+            raise ValueError(f"level must be 0-{self.max_level}")
+        return "2026-01-31", self.tiles
+
+    def close(self):
+        pass
+
+
+def test_daily_puzzle_from_server(make_engine, daily_tiles):
+    server = StubServer(daily_tiles)
+    engine = make_engine(server=server)
+    assert engine.daily == ("2026-01-31", 0)
+    assert engine.tiles == daily_tiles
+    engine.new_game()
+    # fetched once per level and kept for the day
+    assert server.requests == 2
+
+
+def test_down_server_backs_off(make_engine):
+    server = StubServer([], down=True)
+    clock = SimulatedClock()
+    engine = make_engine(clock=clock, server=server)
+    assert engine.daily is None and engine.known_solution
+    engine.new_game()
+    engine.new_game()
+    assert server.requests == 1
+    clock.advance(60)
+    engine.new_game()
+    assert server.requests == 2
+
+
+def test_refused_level_is_not_asked_again(make_engine, daily_tiles):
+    server = StubServer(daily_tiles, max_level=0)
+    engine = make_engine(server=server)
+    engine.new_game()
+    engine.new_game()
+    # levels 0 and 1 once each: 0 is kept and 1 was refused
+    assert server.requests == 2
+    assert engine.refused_levels == {1}
+
+
+def test_slow_server_does_not_hold_up_new_game(make_engine, daily_tiles):
+    release = threading.Event()
+
+    class SlowServer(StubServer):
+        def puzzle(self, level):
+            release.wait(10)
+            return super().puzzle(level)
+
+    server = SlowServer(daily_tiles)
+    start = time.perf_counter()
+    engine = make_engine(server=server, background_jobs=True)
+    try:
+        # a local set straight away, today's puzzle once it has arrived
+        assert time.perf_counter() - start < 5
+        assert engine.daily is None
+        release.set()
+        deadline = time.monotonic() + 10
+        while 0 not in engine.daily_sets and time.monotonic() < deadline:
+            time.sleep(0.01)
+        engine.new_game()
+        assert engine.daily == ("2026-01-31", 0)
+    finally:
+        # the worker may still be waiting on the server when the engine is closed
+        release.set()
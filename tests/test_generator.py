@@ -0,0 +1,54 @@
+import time
+from generator import PuzzleGenerator
+
+EASY, NEXT = (0, 0), (1, 1)
+
+
+def take(generator, order):
+    return [generator.next_set(difficulty) for difficulty in order]
+
+
+def test_seeded_sets_do_not_depend_on_prefetch():
+    order = [EASY, EASY, NEXT, EASY, NEXT, NEXT]
+    expected = take(PuzzleGenerator(seed=5), order)
+
+    generator = PuzzleGenerator(seed=5, prefetch_count=2)
+    generator.prefetch(EASY, NEXT)
+    deadline = time.monotonic() + 30
+    while len(generator.ready.get(NEXT, ())) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    try:
+        assert take(generator, order) == expected
+    finally:
+        generator.stop()
+
+
+def test_sets_valid_and_distinct_per_number():
+    generator = PuzzleGenerator(seed=1)
+    (first, solution), (second, other) = take(generator, [EASY, EASY])
+    assert first != second
+    low, high = generator.target_for(EASY)
+    assert low <= len(solution) <= high
+
+
+class BrokenGenerator(PuzzleGenerator):
+    """Can't make sets for NEXT"""
+
+    def generate(self, difficulty, rng=None):
+        if difficulty == NEXT:
+            raise RuntimeError("no sets for this difficulty")
+        return super().generate(difficulty, rng)
+
+
+def test_failed_prefetch_keeps_thread_running():
+    generator = BrokenGenerator(seed=5, prefetch_count=2)
+    generator.prefetch(NEXT, EASY)
+    deadline = time.monotonic() + 30
+    while (NEXT in generator.wanted or len(generator.ready.get(EASY, ())) < 2) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    try:
+        assert len(generator.ready[EASY]) == 2 and not generator.ready[NEXT]
+        assert generator.wanted == {EASY} and generator.thread.is_alive()
+        assert generator.next_set(EASY) == PuzzleGenerator(seed=5).next_set(EASY)
+    finally:
+        generator.stop()
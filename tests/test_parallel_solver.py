@@ -0,0 +1,23 @@
+from generator import PuzzleGenerator
+from parallel_solver import ParallelSolver
+from solver import Solver
+
+
+def test_zero_depth_is_unknown():
+    tiles, solution = PuzzleGenerator(seed=2).generate((0, 0))
+    solver = ParallelSolver(workers=2, max_depth=0)
+    assert solver.budget is None
+    with solver:
+        result = solver.solve(tiles)
+    assert result.status == "unknown"
+
+
+def test_matches_serial_solver():
+    tiles, solution = PuzzleGenerator(seed=2).generate((0, 0))
+    expected = Solver(max_depth=10, prefilter=False).solve(tiles)
+    with ParallelSolver(workers=2, max_depth=10) as solver:
+        result = solver.solve(tiles)
+    assert result.status == "solved"
+    assert len(result.solution) == len(expected.solution)
+    top = b''.join(tiles[i].top for i in result.solution)
+    assert top == b''.join(tiles[i].bottom for i in result.solution)
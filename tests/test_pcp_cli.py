@@ -0,0 +1,67 @@
+import json
+import os
+from calibrate import load_levels, CALIBRATION_FILE
+from pcp_cli import generate_sets, parse_tiles, read_lines, resume, run_pipeline
+
+LEVELS = load_levels(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), CALIBRATION_FILE))
+
+
+def write_input(path, count):
+    # every third line blank, plus trailing blank lines
+    with open(path, "w") as f:
+        for puzzle in generate_sets(count, 0, seed=1):
+            f.write(json.dumps(puzzle) + "\n\n")
+        f.write("\n  \n")
+
+
+def results(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_blank_lines_get_results(tmp_path):
+    source, output = tmp_path / "sets.jsonl", tmp_path / "out.jsonl"
+    write_input(source, 4)
+    with open(output, "w") as out:
+        run_pipeline(read_lines([str(source)]), out, workers=1, batch_size=3)
+    by_line = {result["line"]: result for result in results(output)}
+    assert sorted(by_line) == list(range(1, 11))
+    assert [n for n, result in by_line.items() if result["status"] == "skipped"] == [2, 4, 6, 8, 9, 10]
+    assert all(by_line[n]["status"] == "solved" for n in (1, 3, 5, 7))
+
+
+def test_resume_over_blank_lines(tmp_path):
+    source, output = tmp_path / "sets.jsonl", tmp_path / "out.jsonl"
+    write_input(source, 6)
+    lines = list(read_lines([str(source)]))
+    # a first run cut off after the first five lines
+    with open(output, "w") as out:
+        run_pipeline(lines[:5], out, workers=1, batch_size=2)
+    done = resume(str(output))
+    assert done.watermark == 5 and not done.ahead
+    with open(output, "a") as out:
+        run_pipeline([(n, line) for n, line in lines if n not in done], out, workers=1)
+    done = resume(str(output))
+    assert done.watermark == len(lines) and not done.ahead
+    assert sorted(result["line"] for result in results(output)) == list(range(1, len(lines) + 1))
+
+
+def test_undecodable_line_gets_error_result(tmp_path):
+    source, output = tmp_path / "sets.jsonl", tmp_path / "out.jsonl"
+    write_input(source, 2)
+    with open(source, "rb") as f:
+        data = f.read()
+    # a Latin-1 line between the two sets
+    with open(source, "wb") as f:
+        f.write(data.replace(b"\n\n", b'\n{"id": "caf\xe9"}\n', 1))
+    with open(output, "w") as out:
+        run_pipeline(read_lines([str(source)]), out, workers=1)
+    by_line = {result["line"]: result for result in results(output)}
+    assert by_line[2]["status"] == "error" and "decode" in by_line[2]["error"]
+    assert by_line[1]["status"] == by_line[3]["status"] == "solved"
+
+
+def test_generated_sets_use_calibrated_levels():
+    for puzzle in generate_sets(3, 2, seed=1, levels=LEVELS):
+        low, high = LEVELS[2]["squares"]
+        assert all(low <= len(side) <= high for tile in parse_tiles(puzzle) for side in tile)
@@ -0,0 +1,69 @@
+import os
+import pytest
+from calibrate import levels_id, load_levels, CALIBRATION_FILE
+from canonical import canonical_form
+from engine import GameEngine, SimulatedClock
+from puzzle_bank import (BankFormat, PuzzleBank, append_puzzles, bank_ids, build_index, create_bank, generate_puzzles,
+                         verify_bank)
+
+LEVELS = load_levels(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), CALIBRATION_FILE))
+
+
+def make_bank(tmp_path, count=4):
+    path = str(tmp_path / "test.bank")
+    create_bank(path, BankFormat())
+    puzzles = list(generate_puzzles([0], count, seed=3))
+    append_puzzles(path, puzzles)
+    build_index(path)
+    return path, puzzles
+
+
+def test_bank_ids_match_canonical_ids(tmp_path):
+    path, puzzles = make_bank(tmp_path)
+    assert bank_ids(path) == {canonical_form(tiles).id for tiles, solution, level, states in puzzles}
+
+
+def test_bank_ids_of_empty_bank(tmp_path):
+    path = str(tmp_path / "empty.bank")
+    create_bank(path, BankFormat())
+    assert bank_ids(path) == set()
+
+
+def test_verify_bank_finds_no_bad_records(tmp_path):
+    path, puzzles = make_bank(tmp_path)
+    assert verify_bank(path) == []
+
+
+def test_verify_bank_in_chunks_reports_bad_records(tmp_path):
+    path, puzzles = make_bank(tmp_path, count=5)
+    tiles, solution, level, states = puzzles[0]
+    # a record whose stored solution is cut short
+    append_puzzles(path, [(tiles, solution[:-1], level, states)])
+    build_index(path)
+    assert verify_bank(path, chunk=2) == [5]
+
+
+def test_calibrated_bank_is_filed_by_calibrated_level(tmp_path):
+    path = str(tmp_path / "calibrated.bank")
+    create_bank(path, BankFormat(), levels_id(LEVELS))
+    append_puzzles(path, generate_puzzles([2], 3, seed=3, levels=LEVELS), levels_id(LEVELS))
+    build_index(path)
+    bank = PuzzleBank(path, levels_id(LEVELS))
+    low, high = LEVELS[2]["squares"]
+    puzzle = bank.sample(2)
+    assert all(low <= len(side) <= high for tile in puzzle.tiles for side in tile)
+    bank.close()
+    # a game on the built-in levels must not use it
+    with pytest.raises(ValueError):
+        PuzzleBank(path, levels_id(None))
+    with pytest.raises(ValueError):
+        append_puzzles(path, [], levels_id(None))
+
+
+def test_engine_close_closes_bank(tmp_path):
+    path, puzzles = make_bank(tmp_path)
+    engine = GameEngine(seed=5, clock=SimulatedClock(), background_jobs=False)
+    bank = engine.puzzle_bank = PuzzleBank(path)
+    engine.close()
+    assert engine.puzzle_bank is None
+    assert bank.bank_file.closed and bank.index_file.closed
@@ -0,0 +1,78 @@
+import pytest
+from domino import Domino
+from engine import GameEngine, SimulatedClock, MOUSE_DOWN, MOUSE_MOTION, MOUSE_UP
+from recorder import SessionRecorder, read_records, OUTCOME, SET, TICK
+from replay import replay
+
+
+@pytest.fixture(autouse=True)
+def level():
+    Domino.difficulty = (0, 0)
+    yield
+    Domino.difficulty = (0, 0)
+
+
+def click(engine, button):
+    center = (button.x + button.width // 2, button.y + button.height // 2)
+    engine.handle_input(MOUSE_DOWN, center)
+    engine.handle_input(MOUSE_UP, center)
+    engine.tick()
+
+
+def play_solution(engine):
+    for index in engine.known_solution:
+        domino = engine.dominos[index]
+        engine.handle_input(MOUSE_DOWN, (domino.x + 5, domino.y + 5))
+        for i in range(7):
+            engine.handle_input(MOUSE_MOTION, (300 + 40 * i, 200 + 30 * i))
+            engine.tick()
+        engine.handle_input(MOUSE_MOTION, (1200, engine.working_area_y + 50))
+        engine.handle_input(MOUSE_UP, (1200, engine.working_area_y + 50))
+        engine.tick()
+
+
+def record_session(path):
+    # the default simulated frame is 1000/60 ms, not a whole number of ms or us
+    engine = GameEngine(seed=5, clock=SimulatedClock(start=1.7e9), background_jobs=False,
+                        recorder=SessionRecorder(path))
+    play_solution(engine)
+    click(engine, engine.new_game_button_rect)
+    click(engine, engine.game_mode_button_rect)
+    play_solution(engine)
+    click(engine, engine.new_game_button_rect)
+    # one domino down, then let the countdown run out
+    domino = engine.dominos[0]
+    engine.handle_input(MOUSE_DOWN, (domino.x + 5, domino.y + 5))
+    engine.handle_input(MOUSE_MOTION, (1200, engine.working_area_y + 50))
+    engine.handle_input(MOUSE_UP, (1200, engine.working_area_y + 50))
+    for i in range(8000):
+        engine.tick()
+    engine.close()
+
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / "session.pcprec")
+    record_session(path)
+    with open(path, "rb") as f:
+        records = list(read_records(f.read()))
+    kinds = [kind for kind, fields in records]
+    assert kinds.count(SET) == 3
+    assert [fields[0] for kind, fields in records if kind == OUTCOME] == ["win", "win", "timeout"]
+    assert all(fields[0] == 1000 / 60 for kind, fields in records if kind == TICK)
+
+    result = replay(path)
+    assert result.outcomes == result.expected
+    assert result.expected_end == result.end
+    assert result.matched
+
+
+def test_cut_off_recording_replays_up_to_the_cut(tmp_path):
+    path = str(tmp_path / "session.pcprec")
+    record_session(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:len(data) // 2])
+    result = replay(path)
+    assert result.expected_end is None
+    assert result.outcomes[:len(result.expected)] == result.expected
@@ -0,0 +1,76 @@
+import threading
+from scores import Score, ScoreStore, ScoreWriter
+from tiles import Tile
+
+
+class Gate(list):
+    """A tile set whose puzzle ID can't be worked out until the gate opens"""
+
+    def __init__(self, tiles):
+        super().__init__(tiles)
+        self.entered = threading.Event()
+        self.open = threading.Event()
+
+    def __iter__(self):
+        self.entered.set()
+        self.open.wait(10)
+        return super().__iter__()
+
+
+def flushed(writer):
+    """flush() on a thread, so a writer that hangs fails the test instead of stalling it"""
+    thread = threading.Thread(target=writer.flush, daemon=True)
+    thread.start()
+    thread.join(10)
+    return not thread.is_alive()
+
+
+def test_queued_scores_are_written_in_batches(tmp_path):
+    writer = ScoreWriter(str(tmp_path / "scores.db"), batch_size=10)
+    gate = Gate([Tile(b"\0", b"\0\1")])
+    try:
+        writer.submit("classic", 0, gate, 1.0)
+        # the writer is held up on the first score while 25 more queue behind it
+        assert gate.entered.wait(10)
+        for i in range(25):
+            writer.submit("classic", 0, "p", 2.0 + i)
+        gate.open.set()
+        assert flushed(writer)
+        assert writer.written == 26 and writer.batches == 1 + 3
+    finally:
+        gate.open.set()
+        writer.close()
+
+
+def test_top_filters(tmp_path):
+    store = ScoreStore(str(tmp_path / "scores.db"))
+    store.add_many([Score("classic", 0, "a", 9.0, 0.0), Score("classic", 1, "b", 3.0, 0.0),
+                    Score("easy", 1, "a", 5.0, 0.0), Score("easy", 0, "a", 1.0, 0.0)])
+    try:
+        assert [s.seconds for s in store.top()] == [1.0, 3.0, 5.0, 9.0]
+        assert [s.seconds for s in store.top(mode="classic")] == [3.0, 9.0]
+        assert [s.seconds for s in store.top(level=1)] == [3.0, 5.0]
+        assert [s.seconds for s in store.top(puzzle="a")] == [1.0, 5.0, 9.0]
+        assert [s.seconds for s in store.top(mode="easy", level=1, puzzle="a")] == [5.0]
+        assert [s.seconds for s in store.top(limit=2)] == [1.0, 3.0]
+        assert store.count() == 4
+    finally:
+        store.close()
+
+
+def test_failed_batch_is_recorded_and_writer_carries_on(tmp_path):
+    path = str(tmp_path / "scores.db")
+    writer = ScoreWriter(path)
+    try:
+        # not a tile set: working out its puzzle ID fails
+        writer.submit("classic", 0, 42, 1.0)
+        assert flushed(writer)
+        assert isinstance(writer.error, TypeError) and writer.written == 0
+        writer.submit("classic", 0, "p", 2.0)
+        assert flushed(writer)
+        assert writer.written == 1
+    finally:
+        writer.close()
+    store = ScoreStore(path)
+    assert [s.seconds for s in store.top()] == [2.0]
+    store.close()
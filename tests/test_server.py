@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+import batch_verify
+from calibrate import load_levels, CALIBRATION_FILE
+from server import PuzzleServer, MAX_LEVEL, encode
+
+DATE = "2026-01-31"
+LEVELS = load_levels(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), CALIBRATION_FILE))
+
+
+async def ask(server, message):
+    return json.loads(await server.respond(encode(message)))
+
+
+def run(server, session):
+    """Run session(server) with the submission verifier going, as serve() would"""
+    async def main():
+        server.pending = asyncio.Queue()
+        verifier = asyncio.create_task(server._verify_batches())
+        try:
+            return await session(server)
+        finally:
+            verifier.cancel()
+    return asyncio.run(main())
+
+
+def test_submit_ranks_valid_times():
+    async def session(server):
+        puzzle = await server.puzzle(DATE, 0)
+        submit = {"op": "submit", "date": DATE, "level": 0, "solution": puzzle.solution}
+        first = await ask(server, dict(submit, player="ann", seconds=12.5))
+        second = await ask(server, dict(submit, player="bob", seconds=3.0))
+        return first, second
+    first, second = run(PuzzleServer(date=DATE), session)
+    assert first["valid"] and first["rank"] == 1
+    assert second["valid"] and second["rank"] == 1 and second["players"] == 2
+
+
+def test_submit_rejects_bad_seconds():
+    async def session(server):
+        puzzle = await server.puzzle(DATE, 0)
+        replies = []
+        for seconds in (float("nan"), float("inf"), -1.0, "nan"):
+            replies.append(await ask(server, {"op": "submit", "date": DATE, "level": 0, "player": "ann",
+                                              "solution": puzzle.solution, "seconds": seconds}))
+        return replies, len(puzzle.leaderboard.best)
+    replies, players = run(PuzzleServer(date=DATE), session)
+    assert all(not reply["ok"] and "seconds" in reply["error"] for reply in replies)
+    assert players == 0
+
+
+class FlakyServer(PuzzleServer):
+    """Fails to generate the first puzzle it is asked for"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.attempts = 0
+
+    def _generate(self, date, level):
+        self.attempts += 1
+        if self.attempts == 1:
+            raise RuntimeError("generation failed")
+        return super()._generate(date, level)
+
+
+def test_failed_generation_is_retried():
+    async def session(server):
+        first = await ask(server, {"op": "puzzle", "level": 0})
+        second = await ask(server, {"op": "puzzle", "level": 0})
+        return first, second
+    server = FlakyServer(date=DATE)
+    first, second = run(server, session)
+    assert not first["ok"]
+    assert second["ok"] and second["date"] == DATE
+    assert server.attempts == 2
+
+
+def test_puzzles_use_calibrated_levels():
+    puzzle = PuzzleServer(date=DATE, levels=LEVELS)._generate(DATE, 3)
+    low, high = LEVELS[3]["squares"]
+    assert all(low <= len(side) <= high for tile in puzzle.tiles for side in tile)
+
+
+def test_level_limit_follows_level_table():
+    def served(server, top):
+        async def session(server):
+            return [(await ask(server, {"op": "puzzle", "level": level}))["ok"] for level in (top, top + 1)]
+        return run(server, session)
+    assert served(PuzzleServer(date=DATE, levels=LEVELS), max(LEVELS)) == [True, False]
+    assert served(PuzzleServer(date=DATE), MAX_LEVEL) == [True, False]
+
+
+def test_failed_verification_answers_with_error(monkeypatch):
+    def broken(tiles, solutions):
+        raise IndexError("broken verifier")
+
+    async def session(server):
+        puzzle = await server.puzzle(DATE, 0)
+        submit = {"op": "submit", "date": DATE, "level": 0, "player": "ann", "solution": puzzle.solution,
+                  "seconds": 5.0}
+        monkeypatch.setattr(batch_verify, "verify_many", broken)
+        failed = await asyncio.wait_for(ask(server, submit), 10)
+        monkeypatch.undo()
+        # the verifier is still running
+        return failed, await asyncio.wait_for(ask(server, submit), 10)
+    failed, passed = run(PuzzleServer(date=DATE), session)
+    assert not failed["ok"] and "broken verifier" in failed["error"]
+    assert passed["valid"] and passed["rank"] == 1
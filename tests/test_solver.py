@@ -0,0 +1,28 @@
+from solver import Solver, START_STATE, encode_pairs, step
+from tiles import Tile
+
+# the first tile leaves the bottom one square ahead, the second closes the gap exactly
+BOTTOM_AHEAD = [Tile(b'\x00', b'\x00\x01'), Tile(b'\x01\x00', b'\x00')]
+# the same with the top ahead
+TOP_AHEAD = [Tile(b'\x00\x01', b'\x00'), Tile(b'\x00', b'\x01\x00')]
+
+
+def test_step_exact_match_is_start_state():
+    for tiles, ahead in ((BOTTOM_AHEAD, False), (TOP_AHEAD, True)):
+        pairs = encode_pairs(tiles)
+        state = step(START_STATE, *pairs[0])
+        assert state == (ahead, b'\x01')
+        assert step(state, *pairs[1]) == START_STATE
+
+
+def test_step_mismatch_and_overhang():
+    assert step(START_STATE, b'\x00', b'\x01') is None
+    assert step(START_STATE, b'\x00', b'\x00\x02') == (False, b'\x02')
+    assert step((False, b'\x02'), b'\x02\x01', b'') == (True, b'\x01')
+
+
+def test_solver_finds_match_from_either_side_ahead():
+    for tiles in (BOTTOM_AHEAD, TOP_AHEAD):
+        outcome = Solver(max_depth=4).solve(tiles)
+        assert outcome.status == "solved"
+        assert outcome.solution == [0, 1]
@@ -0,0 +1,47 @@
+import random
+from domino import Domino
+from solver import START_STATE
+from tiles import Tile
+from working_area import WorkingArea
+
+# the first tile leaves the bottom one square ahead, the second closes the gap exactly
+BOTTOM_AHEAD = [Tile(b'\x00', b'\x00\x01'), Tile(b'\x01\x00', b'\x00')]
+
+
+def test_working_area_wins_from_bottom_ahead():
+    area = WorkingArea(BOTTOM_AHEAD)
+    area.append(Domino(BOTTOM_AHEAD[0], 0))
+    assert area.state == (False, b'\x01')
+    assert not area.matched
+    area.append(Domino(BOTTOM_AHEAD[1], 1))
+    assert area.state == START_STATE
+    assert area.matched
+
+
+def test_sequences_follow_edits():
+    rng = random.Random(0)
+    tiles = [Tile(bytes(rng.randrange(3) for i in range(rng.randint(1, 4))),
+                  bytes(rng.randrange(3) for i in range(rng.randint(1, 4)))) for i in range(5)]
+    area = WorkingArea(tiles)
+    placed = []
+    for i in range(200):
+        action = rng.random()
+        if placed and action < 0.3:
+            domino = placed.pop(rng.randrange(len(placed)))
+            area.remove(domino)
+        elif placed and action < 0.5:
+            domino = placed.pop(rng.randrange(len(placed)))
+            position = rng.randint(0, len(placed))
+            placed.insert(position, domino)
+            area.move(domino, position)
+        else:
+            index = rng.randrange(len(tiles))
+            domino = Domino(tiles[index], index)
+            position = rng.randint(0, len(placed))
+            placed.insert(position, domino)
+            area.insert(position, domino)
+        top = b''.join(d.tile.top for d in placed)
+        bottom = b''.join(d.tile.bottom for d in placed)
+        assert area.sequences == (top, bottom)
+        assert area.squares(5) == (top[:5], bottom[:5])
+        assert area.lengths() == (len(top), len(bottom))
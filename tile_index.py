@@ -0,0 +1,74 @@
+from solver import step, START_STATE
+
+
+class _Node:
+    __slots__ = ('children', 'ends', 'deeper')
+
+    def __init__(self):
+        self.children = {}
+        # tiles whose key ends exactly here
+        self.ends = []
+        # tiles whose key continues past here
+        self.deeper = []
+
+
+def _build(keys):
+    root = _Node()
+    for i, key in enumerate(keys):
+        node = root
+        for code in key:
+            node.deeper.append(i)
+            node = node.children.setdefault(code, _Node())
+        node.ends.append(i)
+    return root
+
+
+class TileTrie:
+    """Prefix tries over tile tops and bottoms for finding valid next moves
+
+    With the bottom ahead by overhang s, a tile fits if its top is a prefix
+    of s (found by walking s down the top trie), or if its top starts with s
+    and the rest of its top lines up with its own bottom (the tiles below the
+    node s ends at). Either way the walk costs O(len(s)) plus the tiles
+    found, not the size of the set. The top-ahead case uses the bottom trie.
+    """
+
+    def __init__(self, tiles):
+        self.tiles = list(tiles)
+        self.tops = _build([tile.top for tile in self.tiles])
+        self.bottoms = _build([tile.bottom for tile in self.tiles])
+        # tiles that can be played on an empty overhang
+        self.starters = frozenset(i for i, tile in enumerate(self.tiles)
+                                  if step(START_STATE, tile.top, tile.bottom) is not None)
+
+    def compatible(self, state):
+        """Indices of tiles that keep top and bottom matchable from this overhang state"""
+        if state is None:
+            return frozenset()
+        top_ahead, overhang = state
+        if not overhang:
+            return self.starters
+        if top_ahead:
+            # the bottom has to catch up: walk the bottoms, the tile's top continues the top
+            root, side, other = self.bottoms, 1, 0
+        else:
+            root, side, other = self.tops, 0, 1
+
+        found = []
+        node = root
+        for code in overhang:
+            # keys that end inside the overhang are prefixes of it
+            found.extend(node.ends)
+            node = node.children.get(code)
+            if node is None:
+                return frozenset(found)
+        found.extend(node.ends)
+
+        # keys longer than the overhang: their tail must line up with the tile's other side
+        depth = len(overhang)
+        for i in node.deeper:
+            tail = self.tiles[i][side][depth:]
+            rest = self.tiles[i][other]
+            if tail.startswith(rest) or rest.startswith(tail):
+                found.append(i)
+        return frozenset(found)
@@ -0,0 +1,104 @@
+from collections import namedtuple
+
+# colour codes are indexes into this tuple (same order as Domino.colors)
+COLOR_NAMES = ('RED', 'GREEN', 'BLUE')
+COLOR_CODES = {name: code for code, name in enumerate(COLOR_NAMES)}
+
+
+def encode_colors(names):
+    """Colour names -> bytes of colour codes"""
+    return bytes(COLOR_CODES[name] for name in names)
+
+
+def decode_colors(codes):
+    """Bytes of colour codes -> list of colour names"""
+    return [COLOR_NAMES[code] for code in codes]
+
+
+class Tile(namedtuple('Tile', ['top', 'bottom'])):
+    """Immutable, hashable domino: top and bottom are bytes of colour codes
+
+    Concatenating and comparing sequences of tiles is plain bytes work, and a
+    Tile unpacks as a (top, bottom) pair so it can go straight to the solver.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_names(cls, top, bottom):
+        return cls(encode_colors(top), encode_colors(bottom))
+
+    def names(self):
+        return decode_colors(self.top), decode_colors(self.bottom)
+
+    def __repr__(self):
+        top, bottom = self.names()
+        return f"Tile(top={top}, bottom={bottom})"
+
+
+def encode_tiles(tiles):
+    """Tiles in the Domino top/bottom format: colour names per side"""
+    return [dict(zip(("top", "bottom"), tile.names())) for tile in tiles]
+
+
+def decode_tiles(data):
+    return [Tile.from_names(tile["top"], tile["bottom"]) for tile in data]
+
+
+class TileSampler:
+    """Maps integer ranks to tiles so distinct tiles can be drawn without rejection
+
+    Sequences of length low..high over the colour alphabet are numbered
+    shortest first, and a tile's rank is top_rank * count + bottom_rank
+    (skipping bottom == top when distinct_halves is set). Distinct ranks are
+    drawn with Floyd's algorithm, O(count) however large the space is.
+    """
+
+    def __init__(self, low, high, color_count=len(COLOR_NAMES), distinct_halves=False):
+        if low < 1 or high < low:
+            raise ValueError(f"invalid square count range {low}..{high}")
+        self.low = low
+        self.high = high
+        self.color_count = color_count
+        self.distinct_halves = distinct_halves
+        self.sequences = sum(color_count ** length for length in range(low, high + 1))
+        if distinct_halves:
+            self.size = self.sequences * (self.sequences - 1)
+        else:
+            self.size = self.sequences * self.sequences
+
+    def sequence(self, rank):
+        for length in range(self.low, self.high + 1):
+            block = self.color_count ** length
+            if rank < block:
+                codes = bytearray(length)
+                for i in range(length - 1, -1, -1):
+                    rank, codes[i] = divmod(rank, self.color_count)
+                return bytes(codes)
+            rank -= block
+        raise IndexError("sequence rank out of range")
+
+    def tile(self, rank):
+        if self.distinct_halves:
+            top, bottom = divmod(rank, self.sequences - 1)
+            if bottom >= top:
+                bottom += 1
+        else:
+            top, bottom = divmod(rank, self.sequences)
+        return Tile(self.sequence(top), self.sequence(bottom))
+
+    def sample(self, count, rng, exclude=()):
+        """count distinct tiles not in exclude, raises ValueError if there aren't enough"""
+        exclude = set(exclude)
+        wanted = min(self.size, count + len(exclude))
+        # Floyd's algorithm: wanted distinct ranks from exactly wanted draws
+        ranks = set()
+        for j in range(self.size - wanted, self.size):
+            rank = rng.randrange(j + 1)
+            ranks.add(j if rank in ranks else rank)
+        ranks = sorted(ranks)
+        rng.shuffle(ranks)
+        tiles = [tile for tile in map(self.tile, ranks) if tile not in exclude]
+        if len(tiles) < count:
+            raise ValueError(f"only {len(tiles)} distinct dominoes with {self.low}-{self.high} squares "
+                             f"per side are available, {count} were requested")
+        return tiles[:count]
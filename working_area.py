@@ -0,0 +1,139 @@
+from seqtree import SequenceTree, TOP, BOTTOM
+from solver import START_STATE
+from tile_index import TileTrie
+
+
+class WorkingArea:
+    """The dominoes in the working area plus everything derived from them
+
+    The concatenations live in a SequenceTree, so inserting, removing or
+    moving a domino anywhere costs O(log n), and so does telling whether
+    the top and bottom match or one is a prefix of the other (by hash; a
+    win is confirmed by comparing the squares). The overhang state, match
+    status and highlights are worked out at most once per change, so
+    drawing a frame just reads them.
+    """
+
+    def __init__(self, tiles=()):
+        self.tiles = list(tiles)
+        self.index = TileTrie(self.tiles)
+        self.dominos = []
+        self.tree = SequenceTree()
+        # bumped on every change so callers can tell when to refresh
+        self.version = 0
+        self._state = START_STATE
+        self._matched = False
+        self._derived_version = 0
+        self._highlights = None
+
+    def __iter__(self):
+        return iter(self.dominos)
+
+    def __len__(self):
+        return len(self.dominos)
+
+    def __bool__(self):
+        return bool(self.dominos)
+
+    def __contains__(self, domino):
+        return domino in self.dominos
+
+    def __getitem__(self, i):
+        return self.dominos[i]
+
+    def set_tiles(self, tiles):
+        """Use a new tile set (empties the working area)"""
+        self.tiles = list(tiles)
+        self.index = TileTrie(self.tiles)
+        self.clear()
+
+    def append(self, domino):
+        self.insert(len(self.dominos), domino)
+
+    def insert(self, i, domino):
+        self.dominos.insert(i, domino)
+        self.tree.insert(i, domino.tile.top, domino.tile.bottom)
+        self._changed()
+
+    def remove(self, domino):
+        i = self.dominos.index(domino)
+        self.dominos.pop(i)
+        self.tree.remove(i)
+        self._changed()
+
+    def move(self, domino, i):
+        old = self.dominos.index(domino)
+        self.dominos.insert(i, self.dominos.pop(old))
+        self.tree.move(old, i)
+        self._changed()
+
+    def clear(self):
+        self.dominos = []
+        self.tree.clear()
+        self._changed()
+
+    def _changed(self):
+        self.version += 1
+        self._highlights = None
+
+    def lengths(self):
+        """(top, bottom) square counts"""
+        return self.tree.length(TOP), self.tree.length(BOTTOM)
+
+    def squares(self, end=None):
+        """(top, bottom) concatenations as bytes, only the first end squares of each if given
+
+        A prefix is read off the tree, so showing the start of a long
+        sequence never builds the whole of it.
+        """
+        if end is None:
+            return (b''.join([d.tile.top for d in self.dominos]),
+                    b''.join([d.tile.bottom for d in self.dominos]))
+        return self.tree.squares(TOP, 0, end), self.tree.squares(BOTTOM, 0, end)
+
+    @property
+    def sequences(self):
+        """(top, bottom) concatenations as bytes"""
+        return self.squares()
+
+    def _derive(self):
+        # overhang state and match status for the current version
+        if self._derived_version == self.version:
+            return
+        self._derived_version = self.version
+        tree = self.tree
+        top_length, bottom_length = tree.length(TOP), tree.length(BOTTOM)
+        self._matched = False
+        if top_length == bottom_length:
+            # equal hashes are confirmed against the squares themselves
+            if tree.hashes_match() and self.sequences[0] == self.sequences[1]:
+                self._state = START_STATE
+                self._matched = bool(self.dominos)
+            else:
+                self._state = None
+        else:
+            # the shorter side has to be a prefix of the longer one
+            ahead, behind = (TOP, BOTTOM) if top_length > bottom_length else (BOTTOM, TOP)
+            short = min(top_length, bottom_length)
+            if tree.prefix_hash(ahead, short) == tree.hash(behind):
+                self._state = (ahead == TOP, tree.squares(ahead, short))
+            else:
+                self._state = None
+
+    @property
+    def state(self):
+        """Overhang state after the last domino, None if top and bottom already disagree"""
+        self._derive()
+        return self._state
+
+    @property
+    def matched(self):
+        self._derive()
+        return self._matched
+
+    def highlights(self):
+        """Indices of tiles that are valid next moves, worked out once per change"""
+        if self._highlights is None:
+            # tiles that keep the top and bottom able to match from the current overhang
+            self._highlights = self.index.compatible(self.state)
+        return self._highlights